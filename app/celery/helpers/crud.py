@@ -2,15 +2,8 @@ import logging
 
 import requests
 
-from app.config.base import (
-    DISH_LINK,
-    DISHES_LINK,
-    MENU_LINK,
-    MENUS_LINK,
-    SERVER_URL,
-    SUBMENU_LINK,
-    SUBMENUS_LINK,
-)
+from app.celery.helpers.parser import ExcelSheetParser, JsonParser
+from app.config.base import BATCH_LINK, SERVER_URL
 
 
 def compare_models_data(excel_data: dict, db_data: dict) -> tuple[set, set, set]:
@@ -25,93 +18,33 @@ def compare_models_data(excel_data: dict, db_data: dict) -> tuple[set, set, set]
     return (ids_to_create, ids_to_update, ids_to_delete)
 
 
-def crud_menus(excel_data: dict, db_data: dict) -> None:
+def sync_catalog(excel_parser: ExcelSheetParser, db_parser: JsonParser) -> None:
     """
-    Takes result of `compare_models_data` function and performs necessary tasks for menu model and its instances.
-    Prioritizing the excel as the main source for CREATE, UPDATE and DELETE operations.
+    Takes result of `compare_models_data` function for menus, submenus and dishes
+    and applies all of them with one request to the batch endpoint, in one transaction.
+    Prioritizing the excel as the main source for CREATE, UPDATE and DELETE operations,
+    rows that are created or updated are sent as upserts of the batch.
+    Raises `requests.HTTPError` if the batch is rejected.
     """
 
-    logging.info('Compare and update menus.')
-    ids_to_create, ids_to_update, ids_to_delete = compare_models_data(excel_data, db_data)
-
-    logging.info(f'Menu ids to create: {ids_to_create}.')
-    for menu_id in ids_to_create:
-        url = SERVER_URL + MENUS_LINK
-        requests.post(url, json=excel_data[menu_id])
-
-    logging.info(f'Menu ids to update: {ids_to_update}.')
-    for menu_id in ids_to_update:
-        url = SERVER_URL + MENU_LINK.format(target_menu_id=menu_id)
-        requests.patch(url, json=excel_data[menu_id])
-
-    logging.info(f'Menu ids to delete: {ids_to_delete}.')
-    for menu_id in ids_to_delete:
-        url = SERVER_URL + MENU_LINK.format(target_menu_id=menu_id)
-        requests.delete(url)
-
-
-def crud_submenus(excel_data: dict, db_data: dict) -> None:
-    """
-    Takes result of `compare_models_data` function and performs necessary tasks for submenu model and its instances.
-    Prioritizing the excel as the main source for CREATE, UPDATE and DELETE operations.
-    """
-
-    logging.info('Compare and update submenus.')
-    ids_to_create, ids_to_update, ids_to_delete = compare_models_data(excel_data, db_data)
-
-    logging.info(f'Submenu ids to create: {ids_to_create}.')
-    for submenu_id in ids_to_create:
-        url = SERVER_URL + SUBMENUS_LINK.format(target_menu_id=excel_data[submenu_id]['menu_id'])
-        requests.post(url, json=excel_data[submenu_id])
-
-    logging.info(f'Submenu ids to update: {ids_to_update}.')
-    for submenu_id in ids_to_update:
-        url = SERVER_URL + SUBMENU_LINK.format(
-            target_menu_id=excel_data[submenu_id]['menu_id'],
-            target_submenu_id=submenu_id,
-        )
-        requests.patch(url, json=excel_data[submenu_id])
-
-    logging.info(f'Submenu ids to delete: {ids_to_delete}.')
-    for submenu_id in ids_to_delete:
-        url = SERVER_URL + SUBMENU_LINK.format(
-            target_menu_id=excel_data[submenu_id]['menu_id'],
-            target_submenu_id=submenu_id,
-        )
-        requests.delete(url)
-
-
-def crud_dishes(excel_data: dict, db_data: dict) -> None:
-    """
-    Takes result of `compare_models_data` function and performs necessary tasks for dish model and its instances.
-    Prioritizing the excel as the main source for CREATE, UPDATE and DELETE operations.
-    """
-
-    logging.info('Compare and update dishes.')
-    ids_to_create, ids_to_update, ids_to_delete = compare_models_data(excel_data, db_data)
-
-    logging.info(f'Dish ids to create: {ids_to_create}.')
-    for dish_id in ids_to_create:
-        url = SERVER_URL + DISHES_LINK.format(
-            target_menu_id=excel_data[dish_id]['menu_id'],
-            target_submenu_id=excel_data[dish_id]['submenu_id']
-        )
-        requests.post(url, json=excel_data[dish_id])
-
-    logging.info(f'Dish ids to update: {ids_to_update}.')
-    for dish_id in ids_to_update:
-        url = SERVER_URL + DISH_LINK.format(
-            target_menu_id=excel_data[dish_id]['menu_id'],
-            target_submenu_id=excel_data[dish_id]['submenu_id'],
-            target_dish_id=dish_id
-        )
-        requests.patch(url, json=excel_data[dish_id])
-
-    logging.info(f'Dish ids to delete: {ids_to_delete}.')
-    for dish_id in ids_to_delete:
-        url = SERVER_URL + DISH_LINK.format(
-            target_menu_id=excel_data[dish_id]['menu_id'],
-            target_submenu_id=excel_data[dish_id]['submenu_id'],
-            target_dish_id=dish_id
-        )
-        requests.delete(url)
+    batch: dict = {'delete': {}}
+    for name in ('menus', 'submenus', 'dishes'):
+        logging.info(f'Compare and update {name}.')
+        excel_data, db_data = getattr(excel_parser, name), getattr(db_parser, name)
+        ids_to_create, ids_to_update, ids_to_delete = compare_models_data(excel_data, db_data)
+
+        logging.info(f'{name.capitalize()} ids to create: {ids_to_create}.')
+        logging.info(f'{name.capitalize()} ids to update: {ids_to_update}.')
+        logging.info(f'{name.capitalize()} ids to delete: {ids_to_delete}.')
+        batch[name] = [excel_data[row_id] for row_id in ids_to_create | ids_to_update]
+        batch['delete'][name] = list(ids_to_delete)
+
+    response = requests.post(SERVER_URL + BATCH_LINK, json=batch)
+    if not response.ok:
+        # rejected batch is not applied at all, its body tells why instead of per item results
+        logging.error(f'Batch sync failed with status {response.status_code}: {response.text}.')
+    response.raise_for_status()
+    for name, items in response.json().items():
+        for item in items:
+            if item['status'] == 'not found':
+                logging.warning(f'{name.capitalize()} id {item["id"]} not synced: {item["detail"]}.')
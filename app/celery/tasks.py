@@ -3,7 +3,7 @@ import logging
 import requests
 from celery import Celery
 
-from app.celery.helpers.crud import crud_dishes, crud_menus, crud_submenus
+from app.celery.helpers.crud import sync_catalog
 from app.celery.helpers.parser import ExcelSheetParser, JsonParser
 from app.config.base import (
     ALL_MENUS,
@@ -12,6 +12,7 @@ from app.config.base import (
     RABBITMQ_DEFAULT_PORT,
     RABBITMQ_DEFAULT_USER,
     RABBITMQ_HOST,
+    RECOUNT_LINK,
     SERVER_URL,
     SHEET_NAME,
 )
@@ -42,21 +43,21 @@ def update_db_menu() -> None:
         db_parser = JsonParser(menu_preview_json)
         db_parser.parse()
 
-        # crud data in db from excel
-        crud_menus(
-            excel_data=excel_parser.menus,
-            db_data=db_parser.menus
-        )
-        crud_submenus(
-            excel_data=excel_parser.submenus,
-            db_data=db_parser.submenus
-        )
-        crud_dishes(
-            excel_data=excel_parser.dishes,
-            db_data=db_parser.dishes
+        # crud data in db from excel in one batch
+        sync_catalog(
+            excel_parser=excel_parser,
+            db_parser=db_parser
         )
 
     except Exception as error:
         logging.error(error)
     finally:
         update_db_menu.retry()
+
+
+@app.task
+def recount_counters() -> None:
+    """Celery task for admins that repairs stored counters of menus and submenus through `recount_counters` endpoint."""
+
+    response = requests.post(SERVER_URL + RECOUNT_LINK)
+    logging.info(f'Recounted counters of menus: {response.json()["menus"]}.')
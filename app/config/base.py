@@ -2,6 +2,8 @@ import os
 
 from dotenv import load_dotenv
 
+from app.utils.generators import CacheKey
+
 load_dotenv()
 
 SERVER_URL = os.getenv('SERVER_URL', 'http://web:8000')
@@ -12,6 +14,26 @@ SUBMENUS_LINK = '/api/v1/menus/{target_menu_id}/submenus'
 SUBMENU_LINK = '/api/v1/menus/{target_menu_id}/submenus/{target_submenu_id}'
 DISHES_LINK = '/api/v1/menus/{target_menu_id}/submenus/{target_submenu_id}/dishes'
 DISH_LINK = '/api/v1/menus/{target_menu_id}/submenus/{target_submenu_id}/dishes/{target_dish_id}'
+CACHE_STATS_LINK = '/api/v1/stats/cache'
+DATABASE_STATS_LINK = '/api/v1/stats/database'
+RECOUNT_LINK = '/api/v1/admin/recount'
+BATCH_LINK = '/api/v1/batch'
+
+MENUS_PREVIEW_KEY = 'menus_preview'
+MENUS_KEY = 'all_menus'
+MENU_KEY = CacheKey('menu_id_{menu_id}')
+SUBMENUS_KEY = CacheKey('all_submenus_{menu_id}')
+SUBMENU_KEY = CacheKey('submenu_id_{submenu_id}')
+DISHES_KEY = CacheKey('all_dishes_{submenu_id}')
+DISH_KEY = CacheKey('dish_id_{dish_id}')
+MENU_TAG = CacheKey('menu:{menu_id}')
+SUBMENU_TAG = CacheKey('submenu:{submenu_id}')
+LEASE_KEY = 'lease:{key}'
+STALE_KEY = 'stale:{key}'
+VERSION_KEY = 'version:{key}'
+VERSION_SEQUENCE_KEY = 'version_sequence'
+NOT_FOUND_KEY = 'not_found:{key}'
+PAGE_KEY = '{key}:page:{version}:{page}'
 
 
 POSTGRES_USER = os.getenv('POSTGRES_USER')
@@ -22,6 +44,44 @@ POSTGRES_DB = os.getenv('POSTGRES_DB')
 
 REDIS_HOST = os.getenv('REDIS_HOST')
 REDIS_PORT = os.getenv('REDIS_PORT')
+REDIS_POOL_MAX_CONNECTIONS = int(os.getenv('REDIS_POOL_MAX_CONNECTIONS', '50'))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', '5'))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '5'))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv('REDIS_SOCKET_CONNECT_TIMEOUT', '2'))
+
+CACHE_LOCAL_ENABLED = os.getenv('CACHE_LOCAL_ENABLED', 'false').lower() == 'true'
+CACHE_LOCAL_MAX_SIZE = int(os.getenv('CACHE_LOCAL_MAX_SIZE', '1024'))
+CACHE_LOCAL_TTL = float(os.getenv('CACHE_LOCAL_TTL', '5'))
+CACHE_LOCAL_ADMISSION_HITS = int(os.getenv('CACHE_LOCAL_ADMISSION_HITS', '2'))
+CACHE_INVALIDATION_CHANNEL = 'cache_invalidation'
+SINGLE_FLIGHT_LEASE_MS = int(os.getenv('SINGLE_FLIGHT_LEASE_MS', '5000'))
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv('SINGLE_FLIGHT_POLL_INTERVAL', '0.05'))
+XFETCH_BETA = float(os.getenv('XFETCH_BETA', '1.0'))
+VERSION_TTL = int(os.getenv('VERSION_TTL', '86400'))
+CACHE_PREVIEW_TTL = int(os.getenv('CACHE_PREVIEW_TTL', '600'))
+CACHE_PREVIEW_SOFT_TTL = int(os.getenv('CACHE_PREVIEW_SOFT_TTL', '60'))
+CACHE_PREVIEW_JITTER = float(os.getenv('CACHE_PREVIEW_JITTER', '0.1'))
+CACHE_PREVIEW_ADAPTIVE = os.getenv('CACHE_PREVIEW_ADAPTIVE', 'false').lower() == 'true'
+CACHE_LIST_TTL = int(os.getenv('CACHE_LIST_TTL', '600'))
+CACHE_LIST_SOFT_TTL = int(os.getenv('CACHE_LIST_SOFT_TTL', '60'))
+CACHE_LIST_JITTER = float(os.getenv('CACHE_LIST_JITTER', '0.1'))
+CACHE_LIST_ADAPTIVE = os.getenv('CACHE_LIST_ADAPTIVE', 'false').lower() == 'true'
+CACHE_ENTITY_TTL = int(os.getenv('CACHE_ENTITY_TTL', '3600'))
+CACHE_ENTITY_JITTER = float(os.getenv('CACHE_ENTITY_JITTER', '0.1'))
+CACHE_ENTITY_ADAPTIVE = os.getenv('CACHE_ENTITY_ADAPTIVE', 'false').lower() == 'true'
+CACHE_NOT_FOUND_TTL = int(os.getenv('CACHE_NOT_FOUND_TTL', '30'))
+CACHE_NOT_FOUND_JITTER = float(os.getenv('CACHE_NOT_FOUND_JITTER', '0.0'))
+CACHE_ADAPTIVE_MIN_TTL = int(os.getenv('CACHE_ADAPTIVE_MIN_TTL', '30'))
+CACHE_ADAPTIVE_FACTOR = float(os.getenv('CACHE_ADAPTIVE_FACTOR', '2.0'))
+CACHE_ADAPTIVE_TRACKED_KEYS = int(os.getenv('CACHE_ADAPTIVE_TRACKED_KEYS', '10000'))
+CACHE_COMPRESSION = os.getenv('CACHE_COMPRESSION', 'zlib')
+CACHE_COMPRESSION_THRESHOLD = int(os.getenv('CACHE_COMPRESSION_THRESHOLD', '1024'))
+CACHE_SYNC_WRITE_ROUTES = {
+    route for route in os.getenv(
+        'CACHE_SYNC_WRITE_ROUTES',
+        'update_menu,update_submenu,update_dish'
+    ).split(',') if route
+}
 
 RABBITMQ_HOST = os.getenv('RABBITMQ_HOST')
 RABBITMQ_DEFAULT_PASS = os.getenv('RABBITMQ_DEFAULT_PASS')
@@ -31,7 +91,44 @@ RABBITMQ_DEFAULT_USER = os.getenv('RABBITMQ_DEFAULT_USER')
 FILE_PATH = 'app/admin/Menu.xlsx'
 SHEET_NAME = 'Лист1'
 
+# largest `limit` of a page of list endpoints
+PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', '1000'))
+
+# engine building the menus preview, `database` asks Postgres for the finished JSON document,
+# `orm` loads the instances and renders them with pydantic
+PREVIEW_ENGINE = os.getenv('PREVIEW_ENGINE', 'database')
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+# prepared statements cached per connection, `0` behind poolers in transaction mode, e.g. pgbouncer
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))
+# server side limit of a single statement in milliseconds, `0` for no limit
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))
+
+# loading of relationships not requested by the query, `noload` leaves them empty, `raise` fails on access
+DB_RELATIONSHIP_LOADING = os.getenv('DB_RELATIONSHIP_LOADING', 'noload')
+
 db_url = (
     f'postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}'
     f'@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}'
 )
+
+# read replicas of the database as comma separated `host:port` or `host:port/db`, same user and database by default,
+# read only requests use them, none to read from the primary
+POSTGRES_REPLICAS = [replica.strip() for replica in os.getenv('POSTGRES_REPLICAS', '').split(',') if replica.strip()]
+# seconds after a client's own write its reads stay on the primary, also the replica lag tolerated in cache
+DB_READ_AFTER_WRITE_WINDOW = float(os.getenv('DB_READ_AFTER_WRITE_WINDOW', '5'))
+PRIMARY_READS_COOKIE = 'primary_reads_until'
+
+
+def replica_db_url(replica: str) -> str:
+    """Url of the read replica given as `host:port` or `host:port/db`."""
+
+    address, _, database = replica.partition('/')
+    return f'postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{address}/{database or POSTGRES_DB}'
+
+
+replica_db_urls = [replica_db_url(replica) for replica in POSTGRES_REPLICAS]
@@ -1,10 +1,93 @@
+import time
+
 import redis.asyncio as redis
+from fastapi import Request
+
+from app.config.base import (
+    CACHE_SYNC_WRITE_ROUTES,
+    REDIS_HOST,
+    REDIS_POOL_MAX_CONNECTIONS,
+    REDIS_POOL_TIMEOUT,
+    REDIS_PORT,
+    REDIS_SOCKET_CONNECT_TIMEOUT,
+    REDIS_SOCKET_TIMEOUT,
+)
+
+
+class RedisPool(redis.BlockingConnectionPool):
+    '''Connection pool that waits for a free connection when exhausted and measures the waiting'''
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.acquired = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.monotonic()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        finally:
+            waited = time.monotonic() - started
+            self.acquired += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+
+    def stats(self) -> dict:
+        '''Connections in use and idle, time requests waited for a connection'''
+
+        return {
+            'max_connections': self.max_connections,
+            'in_use': len(self._in_use_connections),
+            'idle': len(self._available_connections),
+            'acquired': self.acquired,
+            'wait_time_avg': round(self.wait_time / self.acquired, 6) if self.acquired else 0.0,
+            'wait_time_max': round(self.max_wait_time, 6),
+        }
+
+
+redis_pool: RedisPool | None = None
+
 
-from app.config.base import REDIS_HOST, REDIS_PORT
+def get_redis_pool() -> RedisPool:
+    '''Application wide connection pool, created on first use'''
+
+    global redis_pool
+    if redis_pool is None:
+        redis_pool = RedisPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=0,
+            max_connections=REDIS_POOL_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+        )
+    return redis_pool
+
+
+async def close_redis_pool() -> None:
+    '''Closes every connection of the pool, run on shutdown'''
+
+    global redis_pool
+    if redis_pool is not None:
+        await redis_pool.disconnect()
+        redis_pool = None
+
+
+def create_redis_client() -> redis.Redis:
+    '''Async Redis client with its own connections, for long lived subscriptions that should not hold pooled ones'''
+
+    return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
 
 
 async def create_redis():
-    '''Connect to async Redis database, using host and port variables from `.env`'''
+    '''Async Redis client borrowing connections from the application pool for every command'''
+
+    yield redis.Redis(connection_pool=get_redis_pool())
+
+
+def sync_cache_writes(request: Request) -> bool:
+    '''Whether the route applies its cache changes before responding, routes are listed in `CACHE_SYNC_WRITE_ROUTES`'''
 
-    async with redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0) as session:
-        yield session
+    return request.scope['route'].name in CACHE_SYNC_WRITE_ROUTES
@@ -1,30 +1,210 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import random
+import time
+from contextvars import ContextVar
+from math import ceil
+from pathlib import Path
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from fastapi import Request
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from app.config.base import db_url
+from app.config.base import (
+    DB_POOL_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_READ_AFTER_WRITE_WINDOW,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_STATEMENT_TIMEOUT_MS,
+    PRIMARY_READS_COOKIE,
+    db_url,
+    replica_db_urls,
+)
 
-async_engine = create_async_engine(db_url)
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
 
-AsyncSessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+
+class DatabasePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool of the engine measuring how long checkouts wait for a connection,
+    how often connections over `pool_size` are opened and how often waiting timed out,
+    to tell pool starvation from slow queries.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.acquired = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.monotonic()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.monotonic() - started
+            self.acquired += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+
+    def _inc_overflow(self) -> bool:
+        opened = super()._inc_overflow()
+        # overflow counts connections opened over `pool_size`, negative while under it
+        if opened and self._overflow > 0:
+            self.overflow_events += 1
+        return opened
+
+    def stats(self) -> dict:
+        """Connections checked out and idle, time checkouts waited for a connection, overflow and timeouts."""
+
+        return {
+            'pool_size': self.size(),
+            'max_overflow': self._max_overflow,
+            'checked_out': self.checkedout(),
+            'idle': self.checkedin(),
+            'overflow': max(self.overflow(), 0),
+            'acquired': self.acquired,
+            'wait_time_avg': round(self.wait_time / self.acquired, 6) if self.acquired else 0.0,
+            'wait_time_max': round(self.max_wait_time, 6),
+            'overflow_events': self.overflow_events,
+            'timeouts': self.timeouts,
+        }
+
+
+def create_engine(url: str) -> AsyncEngine:
+    """Async engine of the database at `url` with the pool and connection settings of the app."""
+
+    return create_async_engine(
+        url,
+        poolclass=DatabasePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_POOL_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={
+            'prepared_statement_cache_size': DB_STATEMENT_CACHE_SIZE,
+            'server_settings': {'statement_timeout': str(DB_STATEMENT_TIMEOUT_MS)},
+        },
+    )
+
+
+def create_sessionmaker(engine: AsyncEngine, **info) -> sessionmaker:
+    """Factory of async sessions bound to the engine, `info` is set on every session it creates."""
+
+    return sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        info=info,
+    )
+
+
+async_engine = create_engine(db_url)
+replica_engines = [create_engine(url) for url in replica_db_urls]
+
+AsyncSessionLocal = create_sessionmaker(async_engine)
+ReplicaSessionsLocal = [create_sessionmaker(engine, replica=True) for engine in replica_engines]
+
+# whether the current request reads from a replica, so entries cached from its reads expire within the replica lag
+reading_replica: ContextVar[bool] = ContextVar('reading_replica', default=False)
 
 Base = declarative_base()
 
 
-async def init_db() -> None:
-    """The asyncronous way of initializing database."""
+MIGRATIONS_PATH = Path(__file__).parents[1] / 'migrations'
 
-    async with async_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
 
+def migrations_config() -> Config:
+    """Alembic configuration of the migrations shipped with the app, independent of `alembic.ini` location."""
 
-async def get_async_db():
-    """Creates async database session."""
+    config = Config()
+    config.set_main_option('script_location', str(MIGRATIONS_PATH))
+    return config
 
-    async with AsyncSessionLocal() as session:
+
+async def check_schema_version() -> None:
+    """
+    Verifies the database schema is at the newest migration, run on startup of every worker.
+    Migrations are applied once before workers start with `alembic upgrade head`.
+    """
+
+    head = ScriptDirectory.from_config(migrations_config()).get_current_head()
+    async with async_engine.connect() as conn:
+        current = await conn.run_sync(
+            lambda sync_conn: MigrationContext.configure(sync_conn).get_current_revision()
+        )
+
+    if current != head:
+        raise RuntimeError(f'database schema is at revision {current}, expected {head}, run `alembic upgrade head`')
+
+
+def reads_primary(request: Request) -> bool:
+    """
+    Whether the request is served by the primary: every request but a read,
+    and reads of a client within `DB_READ_AFTER_WRITE_WINDOW` after its own write,
+    as marked by `PrimaryReadsMiddleware`, so the client reads what it wrote while replicas catch up.
+    """
+
+    if request.method not in SAFE_METHODS:
+        return True
+    try:
+        return float(request.cookies.get(PRIMARY_READS_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def session_local(replica: bool) -> sessionmaker:
+    """Session factory of a random read replica with `replica` set, of the primary otherwise."""
+
+    return random.choice(ReplicaSessionsLocal) if replica else AsyncSessionLocal
+
+
+async def get_async_db(request: Request):
+    """Creates async database session, of a random read replica for reads, see `reads_primary`, else of the primary."""
+
+    replica = bool(ReplicaSessionsLocal) and not reads_primary(request)
+    # set for every request, background tasks of the request run in its context after the session is closed
+    reading_replica.set(replica)
+    async with session_local(replica)() as session:
         yield session
+
+
+class PrimaryReadsMiddleware:
+    """
+    ASGI middleware marking clients after their successful writes with a cookie
+    holding the time until which their reads are served by the primary, see `reads_primary`.
+    Only used with read replicas configured.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http' or scope['method'] in SAFE_METHODS or not ReplicaSessionsLocal:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message) -> None:
+            if message['type'] == 'http.response.start' and message['status'] < 400:
+                cookie = (
+                    f'{PRIMARY_READS_COOKIE}={time.time() + DB_READ_AFTER_WRITE_WINDOW:.3f}; '
+                    f'Max-Age={ceil(DB_READ_AFTER_WRITE_WINDOW)}; Path=/; HttpOnly; SameSite=Lax'
+                )
+                message = {**message, 'headers': [*message.get('headers', []), (b'set-cookie', cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
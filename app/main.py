@@ -1,8 +1,17 @@
+import asyncio
+from contextlib import suppress
+
 from fastapi import Depends, FastAPI
 
 from app.celery.tasks import update_db_menu
-from app.config.database import get_async_db, init_db
-from app.routers import dish, menu, submenu
+from app.config.cache import close_redis_pool, create_redis_client, get_redis_pool
+from app.config.database import (
+    PrimaryReadsMiddleware,
+    check_schema_version,
+    get_async_db,
+)
+from app.routers import admin, batch, dish, menu, stats, submenu
+from app.services.cache.local import listen_invalidations, local_cache
 
 description = """
 # Menu management applications API
@@ -15,6 +24,8 @@ You can `GET` list of menus, `POST` a menu, `GET`, `PATCH` or `DELETE` specific
 You can `GET` list of submenus in a menu, `POST` a submenu in a menu, `GET`, `PATCH` or `DELETE` specific submenu in a menu.
 ## Dishes
 You can `GET` list of dishes in submenu, `POST` a dish in submenu, `GET`, `PATCH` or `DELETE` specific dish in submenu.
+## Batch
+Path `api/v1/batch` creates, updates and deletes menus, submenus and dishes at once through `POST` method.
 """
 
 
@@ -35,20 +46,55 @@ app = FastAPI(
         {
             'name': 'Dishes',
             'description': 'Operations for dishes'
+        },
+        {
+            'name': 'Batch',
+            'description': 'Changes of many objects at once'
+        },
+        {
+            'name': 'Stats',
+            'description': 'Monitoring of current worker'
+        },
+        {
+            'name': 'Admin',
+            'description': 'Maintenance operations'
         }
     ],
 )
 
+app.add_middleware(PrimaryReadsMiddleware)
+
 
 @app.on_event('startup')
 async def on_startup() -> None:
-    """Function that is being run on startup to access database and start celery background tasks."""
+    """Function that is being run on startup to verify database schema and start celery background tasks."""
 
-    await init_db()
+    await check_schema_version()
+    get_redis_pool()
+
+    if local_cache is not None:
+        app.state.invalidation_listener = asyncio.create_task(
+            listen_invalidations(create_redis_client())
+        )
 
     update_db_menu.delay()
 
 
+@app.on_event('shutdown')
+async def on_shutdown() -> None:
+    """Function that is being run on shutdown to stop background listeners and close connections of the worker."""
+
+    if listener := getattr(app.state, 'invalidation_listener', None):
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
+
+    await close_redis_pool()
+
+
 app.include_router(menu.menu_router)
 app.include_router(submenu.submenu_router)
 app.include_router(dish.dish_router)
+app.include_router(batch.batch_router)
+app.include_router(stats.stats_router)
+app.include_router(admin.admin_router)
@@ -0,0 +1,47 @@
+import asyncio
+
+from alembic import context
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config.base import db_url
+from app.config.database import Base
+from app.models import dish, menu, submenu  # noqa: registers tables in metadata
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Renders migrations as SQL script without connecting to the database."""
+
+    context.configure(url=db_url, target_metadata=target_metadata, literal_binds=True)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    """Runs migrations on given connection in one transaction."""
+
+    context.configure(connection=connection, target_metadata=target_metadata)
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
+    """Runs migrations on the database."""
+
+    engine = create_async_engine(db_url)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif (connection := context.config.attributes.get('connection')) is not None:
+    # connection of a caller that already runs an event loop, e.g. `run_sync` of async connection
+    do_run_migrations(connection)
+else:
+    asyncio.run(run_migrations_online())
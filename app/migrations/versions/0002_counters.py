@@ -0,0 +1,85 @@
+"""counters of menus and submenus kept by triggers
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('menus', sa.Column('submenus_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('menus', sa.Column('dishes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('submenus', sa.Column('dishes_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute("""
+    CREATE OR REPLACE FUNCTION count_submenus() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND NEW.menu_id IS NOT DISTINCT FROM OLD.menu_id THEN
+            UPDATE menus SET dishes_count = dishes_count + NEW.dishes_count - OLD.dishes_count
+            WHERE id = NEW.menu_id;
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE menus SET submenus_count = submenus_count + 1, dishes_count = dishes_count + NEW.dishes_count
+            WHERE id = NEW.menu_id;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            UPDATE menus SET submenus_count = submenus_count - 1, dishes_count = dishes_count - OLD.dishes_count
+            WHERE id = OLD.menu_id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+    CREATE TRIGGER count_submenus AFTER INSERT OR DELETE OR UPDATE OF menu_id, dishes_count ON submenus
+    FOR EACH ROW EXECUTE FUNCTION count_submenus()
+    """)
+    op.execute("""
+    CREATE OR REPLACE FUNCTION count_dishes() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND NEW.submenu_id IS NOT DISTINCT FROM OLD.submenu_id THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE submenus SET dishes_count = dishes_count + 1 WHERE id = NEW.submenu_id;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            UPDATE submenus SET dishes_count = dishes_count - 1 WHERE id = OLD.submenu_id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+    CREATE TRIGGER count_dishes AFTER INSERT OR DELETE OR UPDATE OF submenu_id ON dishes
+    FOR EACH ROW EXECUTE FUNCTION count_dishes()
+    """)
+
+    # counters of existing rows, submenus first as the trigger carries their changes to menus
+    op.execute("""
+    UPDATE submenus SET dishes_count = (SELECT count(*) FROM dishes WHERE dishes.submenu_id = submenus.id)
+    """)
+    op.execute("""
+    UPDATE menus SET
+        submenus_count = (SELECT count(*) FROM submenus WHERE submenus.menu_id = menus.id),
+        dishes_count = (SELECT coalesce(sum(dishes_count), 0) FROM submenus WHERE submenus.menu_id = menus.id)
+    """)
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER count_dishes ON dishes')
+    op.execute('DROP FUNCTION count_dishes')
+    op.execute('DROP TRIGGER count_submenus ON submenus')
+    op.execute('DROP FUNCTION count_submenus')
+    op.drop_column('submenus', 'dishes_count')
+    op.drop_column('menus', 'dishes_count')
+    op.drop_column('menus', 'submenus_count')
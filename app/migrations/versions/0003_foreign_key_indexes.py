@@ -0,0 +1,26 @@
+"""indexes of foreign keys
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00
+
+Lists, counters and cascade deletes filter children by their parent,
+without these indexes each of them scans the whole table.
+"""
+
+from alembic import op
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_submenus_menu_id', 'submenus', ['menu_id'])
+    op.create_index('ix_dishes_submenu_id', 'dishes', ['submenu_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dishes_submenu_id', table_name='dishes')
+    op.drop_index('ix_submenus_menu_id', table_name='submenus')
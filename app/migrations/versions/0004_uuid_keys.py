@@ -0,0 +1,51 @@
+"""native uuid primary and foreign keys
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00
+
+Keys are 16 bytes instead of 36 characters of text, which shrinks every index that holds them.
+Triggers depend on the foreign key columns, so they are recreated around the change.
+"""
+
+from alembic import op
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def change_key_types(key_type: str) -> None:
+    op.execute('DROP TRIGGER count_dishes ON dishes')
+    op.execute('DROP TRIGGER count_submenus ON submenus')
+    op.drop_constraint('dishes_submenu_id_fkey', 'dishes', type_='foreignkey')
+    op.drop_constraint('submenus_menu_id_fkey', 'submenus', type_='foreignkey')
+
+    for table, column in (
+        ('menus', 'id'),
+        ('submenus', 'id'),
+        ('submenus', 'menu_id'),
+        ('dishes', 'id'),
+        ('dishes', 'submenu_id'),
+    ):
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} TYPE {key_type} USING {column}::{key_type}')
+
+    op.create_foreign_key('submenus_menu_id_fkey', 'submenus', 'menus', ['menu_id'], ['id'], ondelete='CASCADE')
+    op.create_foreign_key('dishes_submenu_id_fkey', 'dishes', 'submenus', ['submenu_id'], ['id'], ondelete='CASCADE')
+    op.execute("""
+    CREATE TRIGGER count_submenus AFTER INSERT OR DELETE OR UPDATE OF menu_id, dishes_count ON submenus
+    FOR EACH ROW EXECUTE FUNCTION count_submenus()
+    """)
+    op.execute("""
+    CREATE TRIGGER count_dishes AFTER INSERT OR DELETE OR UPDATE OF submenu_id ON dishes
+    FOR EACH ROW EXECUTE FUNCTION count_dishes()
+    """)
+
+
+def upgrade() -> None:
+    change_key_types('uuid')
+
+
+def downgrade() -> None:
+    change_key_types('varchar')
@@ -0,0 +1,30 @@
+"""indexes of lists ordered by id
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00
+
+Lists of children are filtered by their parent and ordered by id for keyset pagination,
+indexes on both columns replace the ones on foreign keys alone, serving their lookups as well.
+"""
+
+from alembic import op
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_submenus_menu_id_id', 'submenus', ['menu_id', 'id'])
+    op.create_index('ix_dishes_submenu_id_id', 'dishes', ['submenu_id', 'id'])
+    op.drop_index('ix_submenus_menu_id', table_name='submenus')
+    op.drop_index('ix_dishes_submenu_id', table_name='dishes')
+
+
+def downgrade() -> None:
+    op.create_index('ix_dishes_submenu_id', 'dishes', ['submenu_id'])
+    op.create_index('ix_submenus_menu_id', 'submenus', ['menu_id'])
+    op.drop_index('ix_dishes_submenu_id_id', table_name='dishes')
+    op.drop_index('ix_submenus_menu_id_id', table_name='submenus')
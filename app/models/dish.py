@@ -1,7 +1,9 @@
-from sqlalchemy import DECIMAL, Column, ForeignKey, Integer, String
+from sqlalchemy import DDL, DECIMAL, Column, ForeignKey, Index, Integer, String, event
 from sqlalchemy.orm import Mapped, relationship
 
+from app.config.base import DB_RELATIONSHIP_LOADING
 from app.config.database import Base
+from app.models.types import UUIDString
 from app.utils.generators import generate_uuid
 
 
@@ -9,18 +11,20 @@ class Dish(Base):
     """
     SQLAlchemy model for `dishes` table in database\n
     ## Attributes:
-        id -> (autogenerated) `str`\n
+        id -> (autogenerated, time ordered) `UUID`\n
         title -> `str`\n
         description -> `str`\n
         price -> `Decimal`\n
         discount -> `Integer`\n
-        submenu_id -> FK to 'submenus' through `submenus.id`\n
+        submenu_id -> `UUID` FK to 'submenus' through `submenus.id`\n
         submenu related to SubMenu model backpopulates dishes
     """
     __tablename__ = 'dishes'
+    # lists of a submenu are ordered by id, the index serves them and lookups of the foreign key
+    __table_args__ = (Index('ix_dishes_submenu_id_id', 'submenu_id', 'id'),)
 
     id = Column(
-        String,
+        UUIDString,
         primary_key=True,
         default=generate_uuid
     )
@@ -30,7 +34,7 @@ class Dish(Base):
     discount = Column(Integer, default=0)
 
     submenu_id = Column(
-        String,
+        UUIDString,
         ForeignKey(
             'submenus.id',
             ondelete='CASCADE'
@@ -38,5 +42,28 @@ class Dish(Base):
     )
     submenu: Mapped['SubMenu'] = relationship(
         back_populates='dishes',
-        lazy='selectin'
+        lazy=DB_RELATIONSHIP_LOADING
     )
+
+
+# keeps dishes counter of the submenu in the same transaction as changes of its dishes, cascades included
+event.listen(Dish.__table__, 'after_create', DDL("""
+CREATE OR REPLACE FUNCTION count_dishes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.submenu_id IS NOT DISTINCT FROM OLD.submenu_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE submenus SET dishes_count = dishes_count + 1 WHERE id = NEW.submenu_id;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE submenus SET dishes_count = dishes_count - 1 WHERE id = OLD.submenu_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""))
+event.listen(Dish.__table__, 'after_create', DDL("""
+CREATE TRIGGER count_dishes AFTER INSERT OR DELETE OR UPDATE OF submenu_id ON dishes
+FOR EACH ROW EXECUTE FUNCTION count_dishes()
+"""))
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, String
+from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import Mapped, relationship
 
+from app.config.base import DB_RELATIONSHIP_LOADING
 from app.config.database import Base
+from app.models.types import UUIDString
 from app.utils.generators import generate_uuid
 
 
@@ -9,23 +11,28 @@ class Menu(Base):
     """
     SQLAlchemy model for `menus` table in database\n
     ## Attributes:
-        id -> (autogenerated) `str`\n
+        id -> (autogenerated, time ordered) `UUID`\n
         title -> `str`\n
         description -> `str`\n
+        submenus_count -> `Integer`, maintained by `submenus` trigger\n
+        dishes_count -> `Integer`, maintained by `submenus` trigger\n
         submenus related to SubMenu model that backpopulates with menu
     """
     __tablename__ = 'menus'
 
     id = Column(
-        String,
+        UUIDString,
         primary_key=True,
         default=generate_uuid
     )
     title = Column(String)
     description = Column(String)
+    submenus_count = Column(Integer, nullable=False, default=0, server_default='0')
+    dishes_count = Column(Integer, nullable=False, default=0, server_default='0')
 
     submenus: Mapped[list['SubMenu']] = relationship(
         back_populates='menu',
         cascade='all, delete-orphan',
-        lazy='selectin'
+        passive_deletes=True,
+        lazy=DB_RELATIONSHIP_LOADING
     )
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, ForeignKey, String
+from sqlalchemy import DDL, Column, ForeignKey, Index, Integer, String, event
 from sqlalchemy.orm import Mapped, relationship
 
+from app.config.base import DB_RELATIONSHIP_LOADING
 from app.config.database import Base
+from app.models.types import UUIDString
 from app.utils.generators import generate_uuid
 
 
@@ -9,25 +11,29 @@ class SubMenu(Base):
     """
     SQLAlchemy model for `submenus` table in database\n
     ## Attributes:
-        id -> (autogenerated) `str`\n
+        id -> (autogenerated, time ordered) `UUID`\n
         title -> `str`\n
         description -> `str`\n
-        menu_id -> FK to 'menus' through `menus.id`\n
+        dishes_count -> `Integer`, maintained by `dishes` trigger\n
+        menu_id -> `UUID` FK to 'menus' through `menus.id`\n
         menu related to Menu model and backpopulates submenus\n
         dishes related to Dish model and backpopulates submenu
     """
     __tablename__ = 'submenus'
+    # lists of a menu are ordered by id, the index serves them and lookups of the foreign key
+    __table_args__ = (Index('ix_submenus_menu_id_id', 'menu_id', 'id'),)
 
     id = Column(
-        String,
+        UUIDString,
         primary_key=True,
         default=generate_uuid
     )
     title = Column(String)
     description = Column(String)
+    dishes_count = Column(Integer, nullable=False, default=0, server_default='0')
 
     menu_id = Column(
-        String,
+        UUIDString,
         ForeignKey(
             'menus.id',
             ondelete='CASCADE'
@@ -35,11 +41,40 @@ class SubMenu(Base):
     )
     menu: Mapped['Menu'] = relationship(
         back_populates='submenus',
-        lazy='selectin'
+        lazy=DB_RELATIONSHIP_LOADING
     )
 
     dishes: Mapped[list['Dish']] = relationship(
         back_populates='submenu',
         cascade='all, delete-orphan',
-        lazy='selectin'
+        passive_deletes=True,
+        lazy=DB_RELATIONSHIP_LOADING
     )
+
+
+# keeps counters of the menu in the same transaction as changes of its submenus,
+# including changes of submenu's own dishes counter made by `dishes` trigger
+event.listen(SubMenu.__table__, 'after_create', DDL("""
+CREATE OR REPLACE FUNCTION count_submenus() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.menu_id IS NOT DISTINCT FROM OLD.menu_id THEN
+        UPDATE menus SET dishes_count = dishes_count + NEW.dishes_count - OLD.dishes_count
+        WHERE id = NEW.menu_id;
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE menus SET submenus_count = submenus_count + 1, dishes_count = dishes_count + NEW.dishes_count
+        WHERE id = NEW.menu_id;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE menus SET submenus_count = submenus_count - 1, dishes_count = dishes_count - OLD.dishes_count
+        WHERE id = OLD.menu_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""))
+event.listen(SubMenu.__table__, 'after_create', DDL("""
+CREATE TRIGGER count_submenus AFTER INSERT OR DELETE OR UPDATE OF menu_id, dishes_count ON submenus
+FOR EACH ROW EXECUTE FUNCTION count_submenus()
+"""))
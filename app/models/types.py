@@ -0,0 +1,21 @@
+import uuid
+
+from sqlalchemy import TypeDecorator, Uuid
+
+
+class UUIDString(TypeDecorator):
+    """
+    Native `uuid` column with values as strings on Python side.
+    Values that are not uuids match no rows, so lookups of malformed ids end up as not found.
+    """
+
+    impl = Uuid(as_uuid=False)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect) -> str | None:
+        if value is None:
+            return None
+        try:
+            return str(uuid.UUID(str(value)))
+        except ValueError:
+            return None
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, BackgroundTasks, Depends
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.base import RECOUNT_LINK
+from app.config.cache import create_redis as redis
+from app.config.database import get_async_db
+from app.services.api.menu import MenuService
+
+admin_router = APIRouter()
+
+
+@admin_router.post(
+    RECOUNT_LINK,
+    tags=['Admin'],
+    summary='Recount stored counters of menus and submenus'
+)
+async def recount_counters(
+    tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    cache: Redis = Depends(redis),
+) -> dict:
+    """POST endpoint repairing counters that drifted from the rows, returns ids of menus that were repaired."""
+
+    result = await MenuService(db, cache, tasks, True).recount_counters()
+    return result
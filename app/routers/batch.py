@@ -0,0 +1,35 @@
+from fastapi import APIRouter, BackgroundTasks, Depends
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.base import BATCH_LINK
+from app.config.cache import create_redis as redis
+from app.config.cache import sync_cache_writes
+from app.config.database import get_async_db
+from app.schemas.batch import Batch, BatchResult
+from app.services.api.batch import BatchService
+
+batch_router = APIRouter()
+
+
+@batch_router.post(
+    BATCH_LINK,
+    response_model=BatchResult,
+    tags=['Batch'],
+    summary='Create, update and delete many objects at once'
+)
+async def apply_batch(
+    tasks: BackgroundTasks,
+    batch: Batch,
+    db: AsyncSession = Depends(get_async_db),
+    cache: Redis = Depends(redis),
+    sync_cache: bool = Depends(sync_cache_writes),
+) -> BatchResult:
+    """
+    POST endpoint applying menus, submenus and dishes of the batch in one transaction.\n
+    Rows with ids of existing ones replace them, others are created, rows of `delete` are deleted after that.
+    Returns result of every row: `created`, `updated`, `deleted` or `not found` with the row that was not found.
+    """
+
+    result = await BatchService(db, cache, tasks, sync_cache).apply_batch(batch)
+    return result
@@ -1,15 +1,17 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Response
 from fastapi.responses import JSONResponse
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.base import DISH_LINK, DISHES_LINK
 from app.config.cache import create_redis as redis
+from app.config.cache import sync_cache_writes
 from app.config.database import get_async_db
 from app.models.dish import Dish
 from app.schemas.dish import Dish as DishSchema
 from app.schemas.dish import DishCreate as DishCreateSchema
 from app.schemas.dish import DishUpdate as DishUpdateSchema
+from app.schemas.page import DishPage, dish_page_query
 from app.services.api.dish import DishService
 
 dish_router = APIRouter()
@@ -17,7 +19,7 @@ dish_router = APIRouter()
 
 @dish_router.get(
     DISHES_LINK,
-    response_model=list[DishSchema],
+    responses={200: {'model': list[DishSchema], 'description': 'Dishes, or dishes of the page'}},
     tags=['Dishes'],
     summary='Get all dishes'
 )
@@ -25,20 +27,28 @@ async def get_dishes(
     tasks: BackgroundTasks,
     target_menu_id: str,
     target_submenu_id: str,
+    page: DishPage = Depends(dish_page_query),
     db: AsyncSession = Depends(get_async_db),
-    cache: Redis = Depends(redis)
-) -> list[Dish]:
-    """GET operation for retrieving list of dishes related to a specific submenu."""
-
-    result = await DishService(db, cache, tasks).get_dishes(
-        submenu_id=target_submenu_id
+    cache: Redis = Depends(redis),
+    if_none_match: str | None = Header(None),
+) -> Response:
+    """
+    GET operation for retrieving list of dishes related to a specific submenu.\n
+    With `limit` and `after` retrieves a page of dishes ordered by id,
+    `min_price`, `max_price`, `min_discount` and `max_discount` filter them, prices after the discount.
+    """
+
+    result = await DishService(db, cache, tasks, if_none_match=if_none_match).get_dishes(
+        menu_id=target_menu_id,
+        submenu_id=target_submenu_id,
+        page=page
     )
     return result
 
 
 @dish_router.get(
     DISH_LINK,
-    response_model=DishSchema,
+    responses={200: {'model': DishSchema, 'description': 'Dish with its discounted price'}},
     tags=['Dishes'],
     summary='Get specific dish'
 )
@@ -48,11 +58,12 @@ async def get_dish(
     target_submenu_id: str,
     target_dish_id: str,
     db: AsyncSession = Depends(get_async_db),
-    cache: Redis = Depends(redis)
-) -> Dish | HTTPException:
+    cache: Redis = Depends(redis),
+    if_none_match: str | None = Header(None),
+) -> Response:
     """GET operation for retrieving a specific dish of a specific submenu."""
 
-    result = await DishService(db, cache, tasks).get_dish(
+    result = await DishService(db, cache, tasks, if_none_match=if_none_match).get_dish(
         menu_id=target_menu_id,
         submenu_id=target_submenu_id,
         dish_id=target_dish_id
@@ -73,11 +84,12 @@ async def create_dish(
     target_submenu_id: str,
     dish_create_schema: DishCreateSchema,
     db: AsyncSession = Depends(get_async_db),
-    cache: Redis = Depends(redis)
+    cache: Redis = Depends(redis),
+    sync_cache: bool = Depends(sync_cache_writes),
 ) -> Dish:
     """POST operation for creating a new dish under a specific submenu."""
 
-    result = await DishService(db, cache, tasks).create_dish(
+    result = await DishService(db, cache, tasks, sync_cache).create_dish(
         menu_id=target_menu_id,
         submenu_id=target_submenu_id,
         dish_schema=dish_create_schema
@@ -98,11 +110,12 @@ async def update_dish(
     target_dish_id: str,
     dish_update_schema: DishUpdateSchema,
     db: AsyncSession = Depends(get_async_db),
-    cache: Redis = Depends(redis)
+    cache: Redis = Depends(redis),
+    sync_cache: bool = Depends(sync_cache_writes),
 ) -> Dish | HTTPException:
     """PATCH operation for updating a specific dish of a specific submenu."""
 
-    result = await DishService(db, cache, tasks).update_dish(
+    result = await DishService(db, cache, tasks, sync_cache).update_dish(
         menu_id=target_menu_id,
         submenu_id=target_submenu_id,
         dish_id=target_dish_id,
@@ -124,11 +137,12 @@ async def delete_dish(
     target_submenu_id: str,
     target_dish_id: str,
     db: AsyncSession = Depends(get_async_db),
-    cache: Redis = Depends(redis)
+    cache: Redis = Depends(redis),
+    sync_cache: bool = Depends(sync_cache_writes),
 ) -> JSONResponse:
     """DELETE operation for deleting a specific dish of a specific submenu."""
 
-    result = await DishService(db, cache, tasks).delete_dish(
+    result = await DishService(db, cache, tasks, sync_cache).delete_dish(
         menu_id=target_menu_id,
         submenu_id=target_submenu_id,
         dish_id=target_dish_id
@@ -1,16 +1,18 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Response
 from fastapi.responses import JSONResponse
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.base import ALL_MENUS, MENU_LINK, MENUS_LINK
 from app.config.cache import create_redis as redis
+from app.config.cache import sync_cache_writes
 from app.config.database import get_async_db
 from app.models.menu import Menu
 from app.schemas.menu import Menu as MenuSchema
 from app.schemas.menu import MenuCreate as MenuCreateSchema
 from app.schemas.menu import MenuUpdate as MenuUpdateSchema
-from app.schemas.menu_preview import MenuPreview
+from app.schemas.page import Page, page_query
+from app.schemas.projection import MenuProjection, Projection, menu_projection_query
 from app.services.api.menu import MenuService
 
 menu_router = APIRouter()
@@ -18,53 +20,93 @@ menu_router = APIRouter()
 
 @menu_router.get(
     ALL_MENUS,
-    response_model=list[MenuPreview],
+    responses={200: {
+        'model': list[MenuProjection],
+        'description': 'Menus with all their objects, or the fields and objects of the projection',
+    }},
     tags=['Menus'],
     summary='Get all objects without counters'
 )
 async def get_menus_preview(
     tasks: BackgroundTasks,
+    page: Page = Depends(page_query),
+    projection: Projection = Depends(menu_projection_query),
     db: AsyncSession = Depends(get_async_db),
     cache: Redis = Depends(redis),
-):
-    """GET endpoint to show all objects that are stored in database."""
-
-    result = await MenuService(db, cache, tasks).get_preview()
+    if_none_match: str | None = Header(None),
+) -> Response:
+    """
+    GET endpoint to show all objects that are stored in database.\n
+    With `limit` and `after` shows a page of menus ordered by id, each with all its objects.\n
+    `fields[menu]`, `fields[submenu]` and `fields[dish]` list the fields shown,
+    `include` the nested objects, e.g. `include=submenus&fields[menu]=id,title`.
+    """
+
+    result = await MenuService(db, cache, tasks, if_none_match=if_none_match).get_preview(
+        page=page,
+        projection=projection
+    )
     return result
 
 
 @menu_router.get(
     MENUS_LINK,
-    response_model=list[MenuSchema],
+    responses={200: {
+        'model': list[MenuProjection],
+        'description': 'Menus with their counters, or the fields and objects of the projection',
+    }},
     tags=['Menus'],
     summary='Get all menus'
 )
 async def get_menus(
     tasks: BackgroundTasks,
+    page: Page = Depends(page_query),
+    projection: Projection = Depends(menu_projection_query),
     db: AsyncSession = Depends(get_async_db),
     cache: Redis = Depends(redis),
-) -> list[Menu] | list[dict]:
-    """GET endpoint for list of menus, and a count of related items in it."""
-
-    result = await MenuService(db, cache, tasks).get_menus()
+    if_none_match: str | None = Header(None),
+) -> Response:
+    """
+    GET endpoint for list of menus, and a count of related items in it.\n
+    With `limit` and `after` shows a page of menus ordered by id.\n
+    `fields[menu]`, `fields[submenu]` and `fields[dish]` list the fields shown,
+    `include` the nested objects, `submenus` or `submenus.dishes`.
+    """
+
+    result = await MenuService(db, cache, tasks, if_none_match=if_none_match).get_menus(
+        page=page,
+        projection=projection
+    )
     return result
 
 
 @menu_router.get(
     MENU_LINK,
-    response_model=MenuSchema,
+    responses={200: {
+        'model': MenuProjection,
+        'description': 'Menu with its counters, or the fields and objects of the projection',
+    }},
     tags=['Menus'],
     summary='Get specific menu'
 )
 async def get_menu(
     tasks: BackgroundTasks,
     target_menu_id: str,
+    projection: Projection = Depends(menu_projection_query),
     db: AsyncSession = Depends(get_async_db),
     cache: Redis = Depends(redis),
-) -> Menu | HTTPException:
-    """GET operation for specific menu"""
-
-    result = await MenuService(db, cache, tasks).get_menu(menu_id=target_menu_id)
+    if_none_match: str | None = Header(None),
+) -> Response:
+    """
+    GET operation for specific menu\n
+    `fields[menu]`, `fields[submenu]` and `fields[dish]` list the fields shown,
+    `include` the nested objects, `submenus` or `submenus.dishes`.
+    """
+
+    result = await MenuService(db, cache, tasks, if_none_match=if_none_match).get_menu(
+        menu_id=target_menu_id,
+        projection=projection
+    )
     return result
 
 
@@ -80,10 +122,11 @@ async def create_menu(
     menu_create_schema: MenuCreateSchema,
     db: AsyncSession = Depends(get_async_db),
     cache: Redis = Depends(redis),
+    sync_cache: bool = Depends(sync_cache_writes),
 ) -> Menu:
     """POST operation for creating menu."""
 
-    result = await MenuService(db, cache, tasks).create_menu(menu_schema=menu_create_schema)
+    result = await MenuService(db, cache, tasks, sync_cache).create_menu(menu_schema=menu_create_schema)
     return result
 
 
@@ -99,10 +142,11 @@ async def update_menu(
     menu_update_schema: MenuUpdateSchema,
     db: AsyncSession = Depends(get_async_db),
     cache: Redis = Depends(redis),
+    sync_cache: bool = Depends(sync_cache_writes),
 ) -> Menu | HTTPException:
     """PATCH operation for specific menu."""
 
-    result = await MenuService(db, cache, tasks).update_menu(
+    result = await MenuService(db, cache, tasks, sync_cache).update_menu(
         menu_id=target_menu_id,
         menu_schema=menu_update_schema
     )
@@ -120,8 +164,9 @@ async def delete_menu(
     target_menu_id: str,
     db: AsyncSession = Depends(get_async_db),
     cache: Redis = Depends(redis),
+    sync_cache: bool = Depends(sync_cache_writes),
 ) -> JSONResponse:
     """DELETE operation for specific menu."""
 
-    result = await MenuService(db, cache, tasks).delete_menu(menu_id=target_menu_id)
+    result = await MenuService(db, cache, tasks, sync_cache).delete_menu(menu_id=target_menu_id)
     return result
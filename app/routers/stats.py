@@ -0,0 +1,50 @@
+from fastapi import APIRouter
+
+from app.config.base import CACHE_STATS_LINK, DATABASE_STATS_LINK
+from app.config.cache import get_redis_pool
+from app.config.database import async_engine, replica_engines
+from app.services.cache.local import local_cache
+from app.services.cache.stats import cache_stats, compression_stats
+
+stats_router = APIRouter()
+
+
+@stats_router.get(
+    CACHE_STATS_LINK,
+    tags=['Stats'],
+    summary='Get cache statistics of current worker'
+)
+async def get_cache_stats() -> dict:
+    """
+    GET operation for hit and miss counters of every cache tier in the worker that serves the request
+    usage of its Redis connection pool and compression of cached entries.
+    """
+
+    return {
+        'local': {
+            'enabled': local_cache is not None,
+            'size': len(local_cache.entries) if local_cache is not None else 0,
+            **cache_stats['local'].as_dict(),
+        },
+        'redis': cache_stats['redis'].as_dict(),
+        'redis_pool': get_redis_pool().stats(),
+        'compression': compression_stats.as_dict(),
+    }
+
+
+@stats_router.get(
+    DATABASE_STATS_LINK,
+    tags=['Stats'],
+    summary='Get database statistics of current worker'
+)
+async def get_database_stats() -> dict:
+    """
+    GET operation for usage of the database connection pool in the worker that serves the request,
+    how long checkouts waited for a connection, connections opened over the pool size and timed out checkouts,
+    of the primary and of every read replica.
+    """
+
+    return {
+        'pool': async_engine.pool.stats(),
+        'replicas': [engine.pool.stats() for engine in replica_engines],
+    }
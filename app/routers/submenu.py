@@ -1,12 +1,19 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Response
 from fastapi.responses import JSONResponse
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.base import SUBMENU_LINK, SUBMENUS_LINK
 from app.config.cache import create_redis as redis
+from app.config.cache import sync_cache_writes
 from app.config.database import get_async_db
 from app.models.submenu import SubMenu
+from app.schemas.page import Page, page_query
+from app.schemas.projection import (
+    Projection,
+    SubMenuProjection,
+    submenu_projection_query,
+)
 from app.schemas.submenu import SubMenu as SubMenuSchema
 from app.schemas.submenu import SubMenuCreate as SubMenuCreateSchema
 from app.schemas.submenu import SubMenuUpdate as SubMenuUpdateSchema
@@ -17,25 +24,42 @@ submenu_router = APIRouter()
 
 @submenu_router.get(
     SUBMENUS_LINK,
-    response_model=list[SubMenuSchema],
+    responses={200: {
+        'model': list[SubMenuProjection],
+        'description': 'Submenus with their counters, or the fields and objects of the projection',
+    }},
     tags=['Submenus'],
     summary='Get all submenus'
 )
 async def get_submenus(
     tasks: BackgroundTasks,
     target_menu_id: str,
+    page: Page = Depends(page_query),
+    projection: Projection = Depends(submenu_projection_query),
     db: AsyncSession = Depends(get_async_db),
-    cache: Redis = Depends(redis)
-) -> list[SubMenu] | list[dict]:
-    """GET operation for retrieving submenus related to a specific menu."""
-
-    result = await SubMenuService(db, cache, tasks).get_submenus(menu_id=target_menu_id)
+    cache: Redis = Depends(redis),
+    if_none_match: str | None = Header(None),
+) -> Response:
+    """
+    GET operation for retrieving submenus related to a specific menu.\n
+    With `limit` and `after` retrieves a page of submenus ordered by id.\n
+    `fields[submenu]` and `fields[dish]` list the fields shown, `include=dishes` nests dishes.
+    """
+
+    result = await SubMenuService(db, cache, tasks, if_none_match=if_none_match).get_submenus(
+        menu_id=target_menu_id,
+        page=page,
+        projection=projection
+    )
     return result
 
 
 @submenu_router.get(
     SUBMENU_LINK,
-    response_model=SubMenuSchema,
+    responses={200: {
+        'model': SubMenuProjection,
+        'description': 'Submenu with its counters, or the fields and objects of the projection',
+    }},
     tags=['Submenus'],
     summary='Get specific submenu'
 )
@@ -43,14 +67,20 @@ async def get_submenu(
     tasks: BackgroundTasks,
     target_menu_id: str,
     target_submenu_id: str,
+    projection: Projection = Depends(submenu_projection_query),
     db: AsyncSession = Depends(get_async_db),
-    cache: Redis = Depends(redis)
-) -> SubMenu | HTTPException:
-    """GET operation for retrieving a specific submenu of a specific menu."""
-
-    result = await SubMenuService(db, cache, tasks).get_submenu(
+    cache: Redis = Depends(redis),
+    if_none_match: str | None = Header(None),
+) -> Response:
+    """
+    GET operation for retrieving a specific submenu of a specific menu.\n
+    `fields[submenu]` and `fields[dish]` list the fields shown, `include=dishes` nests dishes.
+    """
+
+    result = await SubMenuService(db, cache, tasks, if_none_match=if_none_match).get_submenu(
         menu_id=target_menu_id,
-        submenu_id=target_submenu_id
+        submenu_id=target_submenu_id,
+        projection=projection
     )
 
     return result
@@ -68,11 +98,12 @@ async def create_submenu(
     target_menu_id: str,
     submenu_create_schema: SubMenuCreateSchema,
     db: AsyncSession = Depends(get_async_db),
-    cache: Redis = Depends(redis)
+    cache: Redis = Depends(redis),
+    sync_cache: bool = Depends(sync_cache_writes),
 ) -> SubMenu | HTTPException:
     """POST operation for creating a new submenu for a specific menu."""
 
-    result = await SubMenuService(db, cache, tasks).create_submenu(
+    result = await SubMenuService(db, cache, tasks, sync_cache).create_submenu(
         menu_id=target_menu_id,
         submenu_schema=submenu_create_schema
     )
@@ -92,11 +123,12 @@ async def update_submenu(
     target_submenu_id: str,
     submenu_update_schema: SubMenuUpdateSchema,
     db: AsyncSession = Depends(get_async_db),
-    cache: Redis = Depends(redis)
+    cache: Redis = Depends(redis),
+    sync_cache: bool = Depends(sync_cache_writes),
 ) -> SubMenu | HTTPException:
     """PATCH operation for updating a specific submenu of a specific menu."""
 
-    result = await SubMenuService(db, cache, tasks).update_submenu(
+    result = await SubMenuService(db, cache, tasks, sync_cache).update_submenu(
         menu_id=target_menu_id,
         submenu_id=target_submenu_id,
         submenu_schema=submenu_update_schema,
@@ -116,11 +148,12 @@ async def delete_submenu(
     target_menu_id: str,
     target_submenu_id: str,
     db: AsyncSession = Depends(get_async_db),
-    cache: Redis = Depends(redis)
+    cache: Redis = Depends(redis),
+    sync_cache: bool = Depends(sync_cache_writes),
 ) -> JSONResponse:
     """DELETE operation for deleting a specific submenu of a specific menu."""
 
-    result = await SubMenuService(db, cache, tasks).delete_submenu(
+    result = await SubMenuService(db, cache, tasks, sync_cache).delete_submenu(
         menu_id=target_menu_id,
         submenu_id=target_submenu_id
     )
@@ -0,0 +1,120 @@
+from typing import Literal
+from uuid import UUID
+
+from pydantic import BaseModel, model_validator
+
+from app.schemas.dish import DishCreate
+from app.schemas.menu import MenuCreate
+from app.schemas.submenu import SubMenuCreate
+
+
+class MenuUpsert(MenuCreate):
+    """
+    Menu upsert schema of a batch, inherits `MenuCreate`\n
+    Created if there is no menu with given id, replaced otherwise, created with a new id if it is not given.\n
+    Attributes:
+        title: str | None
+        description: str | None
+        id: UUID | None
+    """
+
+
+class SubMenuUpsert(SubMenuCreate):
+    """
+    SubMenu upsert schema of a batch, inherits `SubMenuCreate`\n
+    Attributes:
+        title: str | None
+        description: str | None
+        id: UUID | None
+        ---adding to the model---
+        menu_id: UUID
+    """
+
+    menu_id: UUID
+
+
+class DishUpsert(DishCreate):
+    """
+    Dish upsert schema of a batch, inherits `DishCreate`\n
+    Attributes:
+        title: str | None
+        description: str | None
+        price: Decimal | None
+        discount: int | 0
+        id: UUID | None
+        ---adding to the model---
+        submenu_id: UUID
+    """
+
+    submenu_id: UUID
+
+
+class BatchDelete(BaseModel):
+    """
+    Ids of rows deleted by a batch, inherits `BaseModel` from `pydantic`\n
+    Attributes:
+        menus: list[UUID]
+        submenus: list[UUID]
+        dishes: list[UUID]
+    """
+
+    menus: list[UUID] = []
+    submenus: list[UUID] = []
+    dishes: list[UUID] = []
+
+
+class Batch(BaseModel):
+    """
+    Batch schema, inherits `BaseModel` from `pydantic`\n
+    Rows created or replaced and rows deleted in one transaction,
+    parents are changed before their children and deletes follow all upserts.\n
+    Attributes:
+        menus: list[MenuUpsert]
+        submenus: list[SubMenuUpsert]
+        dishes: list[DishUpsert]
+        delete: BatchDelete
+    """
+
+    menus: list[MenuUpsert] = []
+    submenus: list[SubMenuUpsert] = []
+    dishes: list[DishUpsert] = []
+    delete: BatchDelete = BatchDelete()
+
+    @model_validator(mode='after')
+    def validate_unique_ids(self) -> 'Batch':
+        """Validates that every row is upserted once, a second upsert of the same row would be ambiguous."""
+
+        for name in ('menus', 'submenus', 'dishes'):
+            ids = [item.id for item in getattr(self, name) if item.id is not None]
+            if len(ids) != len(set(ids)):
+                raise ValueError(f'{name} are upserted more than once')
+        return self
+
+
+class BatchItem(BaseModel):
+    """
+    Result of one row of a batch, inherits `BaseModel` from `pydantic`\n
+    Attributes:
+        id: str
+        status: 'created', 'updated', 'deleted' or 'not found'
+        detail: str | None, which row was not found, the row itself or its parent
+    """
+
+    id: str
+    status: Literal['created', 'updated', 'deleted', 'not found']
+    detail: str | None = None
+
+
+class BatchResult(BaseModel):
+    """
+    Batch result schema, inherits `BaseModel` from `pydantic`\n
+    Results of rows of every type, upserts followed by deletes, in order of the batch.\n
+    Attributes:
+        menus: list[BatchItem]
+        submenus: list[BatchItem]
+        dishes: list[BatchItem]
+    """
+
+    menus: list[BatchItem] = []
+    submenus: list[BatchItem] = []
+    dishes: list[BatchItem] = []
@@ -1,9 +1,19 @@
 from decimal import ROUND_HALF_UP, Decimal
-from typing import Any
+from uuid import UUID
 
 from pydantic import BaseModel, Field, model_validator
 
 
+def apply_discount(price: Decimal, discount: int) -> Decimal:
+    """
+    Price with the discount applied, rounded half up to cents.
+    Exact decimal math, the same as `round(price * (1 - discount::numeric / 100), 2)` of Postgres,
+    see `discounted_price` of database projections, so prices built by Postgres and by the schema never differ.
+    """
+
+    return (price * (1 - Decimal(discount) / 100)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
 class DishBase(BaseModel):
     """
     Dish base schema, inherits `BaseModel` from `pydantic`\n
@@ -29,10 +39,10 @@ class DishCreate(DishBase):
         price: Decimal | None = None
         discount: int | 0 = 0
         ---adding to the model---
-        id: str | None
+        id: UUID | None
     """
 
-    id: str | None = None
+    id: UUID | None = None
 
 
 class DishUpdate(DishBase):
@@ -66,18 +76,17 @@ class Dish(DishBase):
 
     id: str
 
-    @model_validator(mode='before')
-    @classmethod
-    def validate_atts(cls, data: Any) -> Any:
-        """Validates if the discount is in range from 0 to 100 and sets price according to the discount."""
-
-        if 0 < data.discount <= 100:
-            discounted_price = Decimal(
-                data.price * (1 - Decimal(round(data.discount / 100, 2)))
-            ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-            data.price = discounted_price
-        return data
+    @model_validator(mode='after')
+    def validate_atts(self) -> 'Dish':
+        """
+        Validates if the discount is in range from 0 to 100 and sets price according to the discount.
+        Works on the validated schema so the source SQLAlchemy instance is never changed
+        and repeated validation does not apply the discount twice.
+        """
+
+        if 0 < self.discount <= 100:
+            self.price = apply_discount(self.price, self.discount)
+        return self
 
     class Config:
         from_attributes = True
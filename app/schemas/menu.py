@@ -1,3 +1,5 @@
+from uuid import UUID
+
 from pydantic import BaseModel
 
 
@@ -15,10 +17,10 @@ class MenuCreate(MenuBase):
         title: str | None
         description: str | None
         --adding to the model---
-        id: str | None
+        id: UUID | None
     """
 
-    id: str | None = None
+    id: UUID | None = None
 
 
 class MenuUpdate(MenuBase):
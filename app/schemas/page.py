@@ -0,0 +1,81 @@
+from decimal import Decimal
+from urllib.parse import urlencode
+from uuid import UUID
+
+from fastapi import Depends, Query
+from pydantic import BaseModel
+
+from app.config.base import PAGE_MAX_LIMIT
+
+
+class Page(BaseModel):
+    """
+    Page schema of list endpoints, inherits `BaseModel` from `pydantic`\n
+    Rows are ordered by their time ordered ids, a page is `limit` rows following the row with id `after`,
+    so the next page is requested with id of the last row of the current one.\n
+    Attributes:
+        limit: int | None
+        after: UUID | None
+    """
+
+    limit: int | None = None
+    after: UUID | None = None
+
+    @property
+    def paged(self) -> bool:
+        """Whether any parameter is given, otherwise the whole list is requested."""
+
+        return bool(self.model_dump(exclude_none=True))
+
+    @property
+    def key(self) -> str:
+        """Parameters of the page in a stable order, part of its cache key."""
+
+        return urlencode(sorted(self.model_dump(exclude_none=True, mode='json').items()))
+
+
+class DishPage(Page):
+    """
+    Page schema of dishes, inherits `Page`\n
+    Attributes:
+        limit: int | None
+        after: UUID | None
+        ---adding filters---
+        min_price: Decimal | None
+        max_price: Decimal | None
+        min_discount: int | None
+        max_discount: int | None
+        prices are compared after the discount, as they are shown
+    """
+
+    min_price: Decimal | None = None
+    max_price: Decimal | None = None
+    min_discount: int | None = None
+    max_discount: int | None = None
+
+
+def page_query(
+    limit: int | None = Query(None, ge=1, le=PAGE_MAX_LIMIT, description='Number of rows of the page'),
+    after: UUID | None = Query(None, description='Id of the last row of the previous page'),
+) -> Page:
+    """Query parameters of a page of list endpoints."""
+
+    return Page(limit=limit, after=after)
+
+
+def dish_page_query(
+    page: Page = Depends(page_query),
+    min_price: Decimal | None = Query(None, ge=0, description='Lowest price after discount'),
+    max_price: Decimal | None = Query(None, ge=0, description='Highest price after discount'),
+    min_discount: int | None = Query(None, ge=0, le=100, description='Lowest discount'),
+    max_discount: int | None = Query(None, ge=0, le=100, description='Highest discount'),
+) -> DishPage:
+    """Query parameters of a page of dishes with its filters."""
+
+    return DishPage(
+        **page.model_dump(),
+        min_price=min_price,
+        max_price=max_price,
+        min_discount=min_discount,
+        max_discount=max_discount
+    )
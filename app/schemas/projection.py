@@ -0,0 +1,189 @@
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+from app.schemas.dish import Dish
+from app.schemas.menu import Menu
+from app.schemas.menu_preview import MenuPreview, SubmenuPreview
+from app.schemas.submenu import SubMenu
+
+MENU_FIELDS = tuple(Menu.model_fields)
+SUBMENU_FIELDS = tuple(SubMenu.model_fields)
+DISH_FIELDS = tuple(Dish.model_fields)
+PREVIEW_MENU_FIELDS = tuple(field for field in MenuPreview.model_fields if field != 'submenus')
+PREVIEW_SUBMENU_FIELDS = tuple(field for field in SubmenuPreview.model_fields if field != 'dishes')
+
+
+class Projection(BaseModel):
+    """
+    Projection schema of menu and submenu routes, inherits `BaseModel` from `pydantic`\n
+    Fields shown of every resource, in order of its schema, `None` for the ones of the route's schema,
+    and nested resources included, as dotted paths from the resource of the route.\n
+    Attributes:
+        menu: tuple[str, ...] | None
+        submenu: tuple[str, ...] | None
+        dish: tuple[str, ...] | None
+        include: tuple[str, ...] | None
+    """
+
+    menu: tuple[str, ...] | None = None
+    submenu: tuple[str, ...] | None = None
+    dish: tuple[str, ...] | None = None
+    include: tuple[str, ...] | None = None
+
+    @property
+    def projected(self) -> bool:
+        """Whether any parameter is given, otherwise the response of the route's schema is requested."""
+
+        return bool(self.model_dump(exclude_none=True))
+
+    @property
+    def key(self) -> str:
+        """Parameters of the projection, part of its cache key."""
+
+        return urlencode({
+            name: ','.join(value)
+            for name, value in self.model_dump(exclude_none=True).items()
+        })
+
+    def includes(self, path: str) -> bool:
+        """Whether the nested resource of the path is included, directly or by one of its children."""
+
+        return any(
+            included == path or included.startswith(f'{path}.')
+            for included in self.include or ()
+        )
+
+    def with_defaults(
+        self,
+        menu: tuple[str, ...] = MENU_FIELDS,
+        submenu: tuple[str, ...] = SUBMENU_FIELDS,
+        include: tuple[str, ...] = (),
+    ) -> 'Projection':
+        """Projection with fields and includes not given taken from the route's schema."""
+
+        return Projection(
+            menu=self.menu if self.menu is not None else menu,
+            submenu=self.submenu if self.submenu is not None else submenu,
+            dish=self.dish if self.dish is not None else DISH_FIELDS,
+            include=self.include if self.include is not None else include,
+        )
+
+
+class DishProjection(BaseModel):
+    """
+    Projected dish schema, inherits `BaseModel` from `pydantic`\n
+    Documents responses of routes with projections, only the fields listed in `fields[dish]` are present.\n
+    Attributes:
+        id: str | None
+        title: str | None
+        description: str | None
+        price: Decimal | None
+        discount: int | None
+    """
+
+    id: str | None = None
+    title: str | None = None
+    description: str | None = None
+    price: Decimal | None = None
+    discount: int | None = None
+
+
+class SubMenuProjection(BaseModel):
+    """
+    Projected submenu schema, inherits `BaseModel` from `pydantic`\n
+    Documents responses of routes with projections, only the fields listed in `fields[submenu]`
+    and the nested resources of `include` are present.\n
+    Attributes:
+        id: str | None
+        title: str | None
+        description: str | None
+        dishes_count: int | None
+        dishes: list[DishProjection] | None
+    """
+
+    id: str | None = None
+    title: str | None = None
+    description: str | None = None
+    dishes_count: int | None = None
+    dishes: list[DishProjection] | None = None
+
+
+class MenuProjection(BaseModel):
+    """
+    Projected menu schema, inherits `BaseModel` from `pydantic`\n
+    Documents responses of routes with projections, only the fields listed in `fields[menu]`
+    and the nested resources of `include` are present.\n
+    Attributes:
+        id: str | None
+        title: str | None
+        description: str | None
+        submenus_count: int | None
+        dishes_count: int | None
+        submenus: list[SubMenuProjection] | None
+    """
+
+    id: str | None = None
+    title: str | None = None
+    description: str | None = None
+    submenus_count: int | None = None
+    dishes_count: int | None = None
+    submenus: list[SubMenuProjection] | None = None
+
+
+def parse_fields(value: str | None, resource: str, allowed: tuple[str, ...]) -> tuple[str, ...] | None:
+    """Fields listed in `fields[resource]` parameter ordered as in the schema, unknown ones are rejected."""
+
+    if value is None:
+        return None
+    fields = {field.strip() for field in value.split(',') if field.strip()}
+    if unknown := fields.difference(allowed):
+        raise HTTPException(status_code=422, detail=f'unknown fields of {resource}: {", ".join(sorted(unknown))}')
+    return tuple(field for field in allowed if field in fields)
+
+
+def parse_include(value: str | None, allowed: tuple[str, ...]) -> tuple[str, ...] | None:
+    """Nested resources listed in `include` parameter, unknown ones are rejected."""
+
+    if value is None:
+        return None
+    include = {path.strip() for path in value.split(',') if path.strip()}
+    if unknown := include.difference(allowed):
+        raise HTTPException(status_code=422, detail=f'unknown includes: {", ".join(sorted(unknown))}')
+    return tuple(path for path in allowed if path in include)
+
+
+def menu_projection_query(
+    fields_menu: str | None = Query(None, alias='fields[menu]', description=f'Fields of menus, of {MENU_FIELDS}'),
+    fields_submenu: str | None = Query(
+        None, alias='fields[submenu]', description=f'Fields of submenus, of {SUBMENU_FIELDS}'
+    ),
+    fields_dish: str | None = Query(None, alias='fields[dish]', description=f'Fields of dishes, of {DISH_FIELDS}'),
+    include: str | None = Query(None, description='Nested resources, `submenus` or `submenus.dishes`'),
+) -> Projection:
+    """Query parameters of projection of menu routes."""
+
+    return Projection(
+        menu=parse_fields(fields_menu, 'menu', MENU_FIELDS),
+        submenu=parse_fields(fields_submenu, 'submenu', SUBMENU_FIELDS),
+        dish=parse_fields(fields_dish, 'dish', DISH_FIELDS),
+        include=parse_include(include, ('submenus', 'submenus.dishes')),
+    )
+
+
+def submenu_projection_query(
+    fields_submenu: str | None = Query(
+        None, alias='fields[submenu]', description=f'Fields of submenus, of {SUBMENU_FIELDS}'
+    ),
+    fields_dish: str | None = Query(None, alias='fields[dish]', description=f'Fields of dishes, of {DISH_FIELDS}'),
+    include: str | None = Query(None, description='Nested resources, `dishes`'),
+) -> Projection:
+    """Query parameters of projection of submenu routes."""
+
+    return Projection(
+        submenu=parse_fields(fields_submenu, 'submenu', SUBMENU_FIELDS),
+        dish=parse_fields(fields_dish, 'dish', DISH_FIELDS),
+        include=parse_include(include, ('dishes',)),
+    )
@@ -0,0 +1,34 @@
+from functools import partial
+
+from app.config.base import DISH_KEY, MENU_KEY, NOT_FOUND_KEY, SUBMENU_KEY
+from app.schemas.batch import Batch, BatchResult
+from app.services.cache.menu import MenuCacheCRUD
+from app.services.database.batch import BatchCRUD
+from app.services.main import AppService
+
+
+class BatchService(AppService):
+    """Service for applying batches of changes of menus, submenus and dishes to database and cache."""
+
+    async def apply_batch(self, batch: Batch) -> BatchResult:
+        """
+        POST operation applying the batch in one transaction, see `BatchCRUD.apply_batch`,
+        followed by one cache invalidation of everything the batch changed.
+        Entries of changed rows are deleted together with their not found entries, as created rows exist now.
+        """
+
+        result, menu_ids = await BatchCRUD(self.db).apply_batch(batch)
+
+        row_keys = [
+            *(MENU_KEY.format(menu_id=item.id) for item in result.menus),
+            *(SUBMENU_KEY.format(submenu_id=item.id) for item in result.submenus),
+            *(DISH_KEY.format(dish_id=item.id) for item in result.dishes),
+        ]
+        if row_keys:
+            cache = MenuCacheCRUD(self.cache)
+            await self.write_cache(
+                cache,
+                partial(cache.invalidate_batch, menu_ids, [*row_keys, *(NOT_FOUND_KEY.format(key=key) for key in row_keys)]),
+            )
+
+        return result
@@ -1,10 +1,16 @@
-from fastapi import HTTPException
+from functools import partial
+
+from fastapi import HTTPException, Response
 from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config.base import DISH_KEY, DISHES_KEY, MENU_TAG, SUBMENU_TAG
 from app.models.dish import Dish
 from app.schemas.dish import DishCreate as DishCreateSchema
 from app.schemas.dish import DishUpdate as DishUpdateSchema
+from app.schemas.page import DishPage
 from app.services.cache.dish import DishCacheCRUD
+from app.services.cache.policy import LIST_POLICY
 from app.services.database.dish import DishCRUD
 from app.services.main import AppService
 
@@ -14,42 +20,63 @@ class DishService(AppService):
 
     async def get_dishes(
         self,
+        menu_id: str,
         submenu_id: str,
-    ) -> list[Dish]:
-        """GET operation for retrieving list of dishes related to a specific submenu."""
-
-        if all_dishes := await DishCacheCRUD(self.cache).get_dishes():
-            return all_dishes
-
-        result = await DishCRUD(self.db).get_dishes(
-            submenu_id=submenu_id
+        page: DishPage = DishPage(),
+    ) -> Response:
+        """GET operation for retrieving list of dishes related to a specific submenu, or dishes of the page."""
+
+        cache = DishCacheCRUD(self.cache)
+
+        async def build(db: AsyncSession) -> bytes:
+            result = await DishCRUD(db).get_dishes(
+                submenu_id=submenu_id,
+                page=page
+            )
+            return DishCacheCRUD.render_dishes(result)
+
+        if page.paged:
+            # pages are plain entries, writes of a dish move the list to a new version instead of editing them
+            return await self.cached_page(
+                DISHES_KEY.format(submenu_id=submenu_id),
+                page.key,
+                build,
+                LIST_POLICY,
+                tags=(MENU_TAG.format(menu_id=menu_id), SUBMENU_TAG.format(submenu_id=submenu_id))
+            )
+        return await self.cached(
+            DISHES_KEY.format(submenu_id=submenu_id),
+            read=partial(cache.get_dishes, submenu_id=submenu_id),
+            build=build,
+            write=partial(cache.set_dishes, menu_id, submenu_id),
         )
 
-        self.tasks.add_task(DishCacheCRUD(self.cache).set_dishes, result)
-
-        return result
-
     async def get_dish(
         self,
         menu_id: str,
         submenu_id: str,
         dish_id: str,
-    ) -> Dish | HTTPException:
+    ) -> Response:
         """GET operation for retrieving a specific dish of a specific submenu."""
 
-        if target_dish := await DishCacheCRUD(self.cache).get_dish(dish_id=dish_id):
-            return target_dish
-
-        result = await DishCRUD(self.db).get_dish(
-            menu_id=menu_id,
-            submenu_id=submenu_id,
-            dish_id=dish_id
+        cache = DishCacheCRUD(self.cache)
+
+        async def build(db: AsyncSession) -> bytes:
+            result = await DishCRUD(db).get_dish(
+                menu_id=menu_id,
+                submenu_id=submenu_id,
+                dish_id=dish_id
+            )
+            return DishCacheCRUD.render_dish(result)
+
+        return await self.cached(
+            DISH_KEY.format(dish_id=dish_id),
+            read=partial(cache.get_dish, dish_id=dish_id),
+            build=build,
+            write=partial(cache.set_dish, menu_id, submenu_id, dish_id),
+            path=DishCacheCRUD.lookup_keys(menu_id, submenu_id, dish_id),
         )
 
-        self.tasks.add_task(DishCacheCRUD(self.cache).set_dish, result)
-
-        return result
-
     async def create_dish(
         self,
         menu_id: str,
@@ -64,8 +91,15 @@ class DishService(AppService):
             dish_schema=dish_schema
         )
 
-        self.tasks.add_task(DishCacheCRUD(self.cache).set_dish, result)
-        self.tasks.add_task(DishCacheCRUD(self.cache).invalidate_dishes, menu_id, submenu_id)
+        body = DishCacheCRUD.render_dish(result)
+        cache = DishCacheCRUD(self.cache)
+        version, new_version = await cache.reserve_version(DISH_KEY.format(dish_id=result.id))
+        await self.write_cache(
+            cache,
+            partial(cache.set_listed_dish, submenu_id, result.id, body, version),
+            partial(cache.set_dish, menu_id, submenu_id, result.id, body, version, new_version=new_version),
+            partial(cache.invalidate_dishes, menu_id, submenu_id),
+        )
 
         return result
 
@@ -78,6 +112,8 @@ class DishService(AppService):
     ) -> Dish | HTTPException:
         """PATCH operation for updating a specific dish of a specific submenu."""
 
+        cache = DishCacheCRUD(self.cache)
+        version, new_version = await cache.reserve_version(DISH_KEY.format(dish_id=dish_id))
         result = await DishCRUD(self.db).update_dish(
             menu_id=menu_id,
             submenu_id=submenu_id,
@@ -85,8 +121,13 @@ class DishService(AppService):
             dish_schema=dish_schema
         )
 
-        self.tasks.add_task(DishCacheCRUD(self.cache).set_dish, result)
-        self.tasks.add_task(DishCacheCRUD(self.cache).invalidate_dishes, menu_id, submenu_id)
+        body = DishCacheCRUD.render_dish(result)
+        await self.write_cache(
+            cache,
+            partial(cache.set_listed_dish, submenu_id, result.id, body, version),
+            partial(cache.set_dish, menu_id, submenu_id, result.id, body, version, new_version=new_version),
+            partial(cache.invalidate_dishes, menu_id, submenu_id, False),
+        )
 
         return result
 
@@ -104,7 +145,12 @@ class DishService(AppService):
             submenu_id=submenu_id,
             dish_id=dish_id
         )
-        self.tasks.add_task(DishCacheCRUD(self.cache).delete, dish_id)
-        self.tasks.add_task(DishCacheCRUD(self.cache).invalidate_dishes, menu_id, submenu_id)
+        cache = DishCacheCRUD(self.cache)
+        await self.write_cache(
+            cache,
+            partial(cache.delete_listed_dish, submenu_id, dish_id),
+            partial(cache.delete, dish_id),
+            partial(cache.invalidate_dishes, menu_id, submenu_id),
+        )
 
         return JSONResponse(status_code=200, content='dish deleted')
@@ -1,10 +1,23 @@
-from fastapi import HTTPException
-from fastapi.responses import JSONResponse
+from functools import partial
 
+from fastapi import HTTPException, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.base import (
+    MENU_KEY,
+    MENU_TAG,
+    MENUS_KEY,
+    MENUS_PREVIEW_KEY,
+    PREVIEW_ENGINE,
+)
 from app.models.menu import Menu
 from app.schemas.menu import MenuCreate as MenuCreateSchema
 from app.schemas.menu import MenuUpdate as MenuUpdateSchema
+from app.schemas.page import Page
+from app.schemas.projection import Projection
 from app.services.cache.menu import MenuCacheCRUD
+from app.services.cache.policy import ENTITY_POLICY, LIST_POLICY, PREVIEW_POLICY
 from app.services.database.menu import MenuCRUD
 from app.services.main import AppService
 
@@ -12,38 +25,91 @@ from app.services.main import AppService
 class MenuService(AppService):
     """Service for querying the menu data from database and cache."""
 
-    async def get_preview(self) -> list[Menu]:
-        """Query to get menus preview with all instances of database."""
-
-        if everything := await MenuCacheCRUD(self.cache).get_preview():
-            return everything
-
-        result = await MenuCRUD(self.db).get_preview()
-
-        self.tasks.add_task(MenuCacheCRUD(self.cache).set_preview, result)
-
-        return result
-
-    async def get_menus(self) -> list[Menu] | list[dict]:
-        """Query to get list of all menus."""
-
-        if all_menus := await MenuCacheCRUD(self.cache).get_menus():
-            return all_menus
-
-        result = await MenuCRUD(self.db).get_menus()
-        self.tasks.add_task(MenuCacheCRUD(self.cache).set_menus, result)
-
-        return result
-
-    async def get_menu(self, menu_id: str) -> Menu:
-        """GET operation for specific menu."""
-        if target_menu := await MenuCacheCRUD(self.cache).get_menu(menu_id=menu_id):
-            return target_menu
+    async def get_preview(self, page: Page = Page(), projection: Projection = Projection()) -> Response:
+        """
+        Query to get menus preview with all instances of database, or menus of the page with all their instances.
+        Built by the engine set with `PREVIEW_ENGINE`, by default Postgres returns the finished document.
+        Projections are always built by Postgres, selecting only their fields.
+        """
+
+        cache = MenuCacheCRUD(self.cache)
+
+        async def build(db: AsyncSession) -> bytes:
+            if PREVIEW_ENGINE == 'database' or projection.projected:
+                return await MenuCRUD(db).get_preview_document(page, projection)
+            result = await MenuCRUD(db).get_preview(page)
+            return MenuCacheCRUD.render_preview(result)
+
+        if page.paged or projection.projected:
+            return await self.cached_page(
+                MENUS_PREVIEW_KEY,
+                '&'.join(filter(None, (page.key, projection.key))),
+                build,
+                PREVIEW_POLICY
+            )
+        return await self.cached(
+            MENUS_PREVIEW_KEY,
+            read=cache.get_preview,
+            build=build,
+            write=cache.set_preview,
+        )
 
-        result = await MenuCRUD(self.db).get_menu(menu_id=menu_id)
-        self.tasks.add_task(MenuCacheCRUD(self.cache).set_menu, result)
+    async def get_menus(self, page: Page = Page(), projection: Projection = Projection()) -> Response:
+        """
+        Query to get list of all menus, or menus of the page.
+        Projections are built by Postgres, selecting only their fields, see `MenuCRUD.get_menus_document`.
+        """
+
+        cache = MenuCacheCRUD(self.cache)
+
+        async def build(db: AsyncSession) -> bytes:
+            if projection.projected:
+                return await MenuCRUD(db).get_menus_document(page, projection.with_defaults())
+            result = await MenuCRUD(db).get_menus(page)
+            return MenuCacheCRUD.render_menus(result)
+
+        if page.paged or projection.projected:
+            return await self.cached_page(
+                MENUS_KEY,
+                '&'.join(filter(None, (page.key, projection.key))),
+                build,
+                LIST_POLICY,
+                nested=projection.includes('submenus')
+            )
+        return await self.cached(
+            MENUS_KEY,
+            read=cache.get_menus,
+            build=build,
+            write=cache.set_menus,
+        )
 
-        return result
+    async def get_menu(self, menu_id: str, projection: Projection = Projection()) -> Response:
+        """GET operation for specific menu, projections are built by Postgres selecting only their fields."""
+        cache = MenuCacheCRUD(self.cache)
+
+        async def build(db: AsyncSession) -> bytes:
+            if projection.projected:
+                return await MenuCRUD(db).get_menu_document(menu_id, projection.with_defaults())
+            result = await MenuCRUD(db).get_menu(menu_id=menu_id)
+            return MenuCacheCRUD.render_menu(result)
+
+        if projection.projected:
+            return await self.cached_page(
+                MENU_KEY.format(menu_id=menu_id),
+                projection.key,
+                build,
+                ENTITY_POLICY,
+                tags=(MENU_TAG.format(menu_id=menu_id),),
+                nested=projection.includes('submenus'),
+                path=MenuCacheCRUD.lookup_keys(menu_id),
+            )
+        return await self.cached(
+            MENU_KEY.format(menu_id=menu_id),
+            read=partial(cache.get_menu, menu_id=menu_id),
+            build=build,
+            write=partial(cache.set_menu, menu_id),
+            path=MenuCacheCRUD.lookup_keys(menu_id),
+        )
 
     async def create_menu(
         self,
@@ -52,8 +118,14 @@ class MenuService(AppService):
         """POST operation for creating menu."""
 
         result = await MenuCRUD(self.db).create_menu(menu_schema=menu_schema)
-        self.tasks.add_task(MenuCacheCRUD(self.cache).set_menu, result)
-        self.tasks.add_task(MenuCacheCRUD(self.cache).invalidate_menus)
+        body = MenuCacheCRUD.render_menu(result)
+        cache = MenuCacheCRUD(self.cache)
+        version, new_version = await cache.reserve_version(MENU_KEY.format(menu_id=result.id))
+        await self.write_cache(
+            cache,
+            partial(cache.set_menu, result.id, body, version, new_version=new_version),
+            cache.invalidate_menus,
+        )
 
         return result
 
@@ -64,12 +136,18 @@ class MenuService(AppService):
     ) -> Menu | HTTPException:
         """PATCH operation for specific menu."""
 
+        cache = MenuCacheCRUD(self.cache)
+        version, new_version = await cache.reserve_version(MENU_KEY.format(menu_id=menu_id))
         result = await MenuCRUD(self.db).update_menu(
             menu_id=menu_id,
             menu_schema=menu_schema
         )
-        self.tasks.add_task(MenuCacheCRUD(self.cache).set_menu, result)
-        self.tasks.add_task(MenuCacheCRUD(self.cache).invalidate_menus)
+        body = MenuCacheCRUD.render_menu(result)
+        await self.write_cache(
+            cache,
+            partial(cache.set_menu, menu_id, body, version, new_version=new_version),
+            cache.invalidate_menus,
+        )
 
         return result
 
@@ -80,7 +158,21 @@ class MenuService(AppService):
         """DELETE operation for specific menu."""
 
         await MenuCRUD(self.db).delete_menu(menu_id=menu_id)
-        self.tasks.add_task(MenuCacheCRUD(self.cache).delete, menu_id)
-        self.tasks.add_task(MenuCacheCRUD(self.cache).invalidate_menus)
+        cache = MenuCacheCRUD(self.cache)
+        await self.write_cache(
+            cache,
+            partial(cache.delete, menu_id),
+            cache.invalidate_menus,
+        )
 
         return JSONResponse(status_code=200, content='menu deleted')
+
+    async def recount_counters(self) -> dict:
+        """POST operation for repairing stored counters of menus and submenus, see `MenuCRUD.recount_counters`."""
+
+        menu_ids = await MenuCRUD(self.db).recount_counters()
+        if menu_ids:
+            cache = MenuCacheCRUD(self.cache)
+            await self.write_cache(cache, partial(cache.invalidate_counters, *menu_ids))
+
+        return {'menus': menu_ids}
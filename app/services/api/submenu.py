@@ -1,9 +1,16 @@
-from fastapi import HTTPException
+from functools import partial
+
+from fastapi import HTTPException, Response
 from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config.base import MENU_TAG, SUBMENU_KEY, SUBMENU_TAG, SUBMENUS_KEY
 from app.models.submenu import SubMenu
+from app.schemas.page import Page
+from app.schemas.projection import Projection
 from app.schemas.submenu import SubMenuCreate as SubMenuCreateSchema
 from app.schemas.submenu import SubMenuUpdate as SubMenuUpdateSchema
+from app.services.cache.policy import ENTITY_POLICY, LIST_POLICY
 from app.services.cache.submenu import SubMenuCacheCRUD
 from app.services.database.submenu import SubMenuCRUD
 from app.services.main import AppService
@@ -12,34 +19,79 @@ from app.services.main import AppService
 class SubMenuService(AppService):
     """Service for querying the submenu data from database and cache."""
 
-    async def get_submenus(self, menu_id: str) -> list[SubMenu] | list[dict]:
-        """Query to get list of all submenus."""
-
-        if all_submenus := await SubMenuCacheCRUD(self.cache).get_submenus():
-            return all_submenus
-
-        result = await SubMenuCRUD(self.db).get_submenus(menu_id=menu_id)
-        self.tasks.add_task(SubMenuCacheCRUD(self.cache).set_submenus, result)
-
-        return result
+    async def get_submenus(self, menu_id: str, page: Page = Page(), projection: Projection = Projection()) -> Response:
+        """
+        Query to get list of all submenus, or submenus of the page.
+        Projections are built by Postgres, selecting only their fields, see `SubMenuCRUD.get_submenus_document`.
+        """
+
+        cache = SubMenuCacheCRUD(self.cache)
+
+        async def build(db: AsyncSession) -> bytes:
+            if projection.projected:
+                return await SubMenuCRUD(db).get_submenus_document(menu_id, page, projection.with_defaults())
+            result = await SubMenuCRUD(db).get_submenus(menu_id=menu_id, page=page)
+            return SubMenuCacheCRUD.render_submenus(result)
+
+        if page.paged or projection.projected:
+            return await self.cached_page(
+                SUBMENUS_KEY.format(menu_id=menu_id),
+                '&'.join(filter(None, (page.key, projection.key))),
+                build,
+                LIST_POLICY,
+                tags=(MENU_TAG.format(menu_id=menu_id),),
+                nested=projection.includes('dishes')
+            )
+        return await self.cached(
+            SUBMENUS_KEY.format(menu_id=menu_id),
+            read=partial(cache.get_submenus, menu_id=menu_id),
+            build=build,
+            write=partial(cache.set_submenus, menu_id),
+        )
 
     async def get_submenu(
         self,
         menu_id: str,
         submenu_id: str,
-    ) -> SubMenu | HTTPException:
-        """GET operation for retrieving a specific submenu of a specific menu."""
-
-        if target_submenu := await SubMenuCacheCRUD(self.cache).get_submenu(submenu_id=submenu_id):
-            return target_submenu
-
-        result = await SubMenuCRUD(self.db).get_submenu(
-            menu_id=menu_id,
-            submenu_id=submenu_id
+        projection: Projection = Projection(),
+    ) -> Response:
+        """
+        GET operation for retrieving a specific submenu of a specific menu,
+        projections are built by Postgres selecting only their fields.
+        """
+
+        cache = SubMenuCacheCRUD(self.cache)
+
+        async def build(db: AsyncSession) -> bytes:
+            if projection.projected:
+                return await SubMenuCRUD(db).get_submenu_document(
+                    menu_id,
+                    submenu_id,
+                    projection.with_defaults()
+                )
+            result = await SubMenuCRUD(db).get_submenu(
+                menu_id=menu_id,
+                submenu_id=submenu_id
+            )
+            return SubMenuCacheCRUD.render_submenu(result)
+
+        if projection.projected:
+            return await self.cached_page(
+                SUBMENU_KEY.format(submenu_id=submenu_id),
+                projection.key,
+                build,
+                ENTITY_POLICY,
+                tags=(MENU_TAG.format(menu_id=menu_id), SUBMENU_TAG.format(submenu_id=submenu_id)),
+                nested=projection.includes('dishes'),
+                path=SubMenuCacheCRUD.lookup_keys(menu_id, submenu_id),
+            )
+        return await self.cached(
+            SUBMENU_KEY.format(submenu_id=submenu_id),
+            read=partial(cache.get_submenu, submenu_id=submenu_id),
+            build=build,
+            write=partial(cache.set_submenu, menu_id, submenu_id),
+            path=SubMenuCacheCRUD.lookup_keys(menu_id, submenu_id),
         )
-        self.tasks.add_task(SubMenuCacheCRUD(self.cache).set_submenu, result)
-
-        return result
 
     async def create_submenu(
         self,
@@ -52,8 +104,14 @@ class SubMenuService(AppService):
             menu_id=menu_id,
             submenu_schema=submenu_schema,
         )
-        self.tasks.add_task(SubMenuCacheCRUD(self.cache).set_submenu, result)
-        self.tasks.add_task(SubMenuCacheCRUD(self.cache).invalidate_submenus, menu_id)
+        body = SubMenuCacheCRUD.render_submenu(result)
+        cache = SubMenuCacheCRUD(self.cache)
+        version, new_version = await cache.reserve_version(SUBMENU_KEY.format(submenu_id=result.id))
+        await self.write_cache(
+            cache,
+            partial(cache.set_submenu, menu_id, result.id, body, version, new_version=new_version),
+            partial(cache.invalidate_submenus, menu_id),
+        )
 
         return result
 
@@ -65,13 +123,19 @@ class SubMenuService(AppService):
     ) -> SubMenu | HTTPException:
         """PATCH operation for updating a specific submenu of a specific menu."""
 
+        cache = SubMenuCacheCRUD(self.cache)
+        version, new_version = await cache.reserve_version(SUBMENU_KEY.format(submenu_id=submenu_id))
         result = await SubMenuCRUD(self.db).update_submenu(
             submenu_schema=submenu_schema,
             submenu_id=submenu_id,
             menu_id=menu_id
         )
-        self.tasks.add_task(SubMenuCacheCRUD(self.cache).set_submenu, result)
-        self.tasks.add_task(SubMenuCacheCRUD(self.cache).invalidate_submenus, menu_id)
+        body = SubMenuCacheCRUD.render_submenu(result)
+        await self.write_cache(
+            cache,
+            partial(cache.set_submenu, menu_id, result.id, body, version, new_version=new_version),
+            partial(cache.invalidate_submenus, menu_id, False),
+        )
 
         return result
 
@@ -86,7 +150,11 @@ class SubMenuService(AppService):
             menu_id=menu_id,
             submenu_id=submenu_id
         )
-        self.tasks.add_task(SubMenuCacheCRUD(self.cache).delete, submenu_id)
-        self.tasks.add_task(SubMenuCacheCRUD(self.cache).invalidate_submenus, menu_id)
+        cache = SubMenuCacheCRUD(self.cache)
+        await self.write_cache(
+            cache,
+            partial(cache.delete, submenu_id),
+            partial(cache.invalidate_submenus, menu_id),
+        )
 
         return JSONResponse(status_code=200, content='submenu deleted')
@@ -1,58 +1,164 @@
-import pickle
+import json
 
+from pydantic import TypeAdapter
+
+from app.config.base import (
+    DISH_KEY,
+    DISHES_KEY,
+    MENU_KEY,
+    MENU_TAG,
+    MENUS_KEY,
+    MENUS_PREVIEW_KEY,
+    SUBMENU_KEY,
+    SUBMENU_TAG,
+    SUBMENUS_KEY,
+)
 from app.models.dish import Dish
 from app.schemas.dish import Dish as DishSchema
+from app.services.cache.entry import CacheEntry
+from app.services.cache.policy import ENTITY_POLICY, LIST_POLICY
+from app.services.cache.submenu import SubMenuCacheCRUD
 from app.services.main import CacheCRUD
+from app.utils.generators import compact_id
+
+dishes_adapter = TypeAdapter(list[DishSchema])
 
 
 class DishCacheCRUD(CacheCRUD):
     """
     Service for caching endpoints' CRUD operations.\n
-    Avaiable methods: `get_dish`, `set_dish`, `delete`.
+    Entries are stored as rendered JSON response bodies,
+    lists of dishes are stored as hashes, served stale while refreshed after the soft TTL of their policy,
+    expiry of every key family is set in `app.services.cache.policy`.\n
+    Avaiable methods: `get_dish`, `set_dish`, `set_listed_dish`, `delete_listed_dish`, `delete`.
     """
 
-    async def get_dishes(self) -> list[Dish] | None:
-        """Returns cached list of all dishes if available in cache."""
+    @staticmethod
+    def render_dishes(query_result: list[Dish]) -> bytes:
+        """Renders SQLAlchemy query result for list of dishes into JSON response body."""
+
+        return dishes_adapter.dump_json(
+            dishes_adapter.validate_python(query_result, from_attributes=True)
+        )
+
+    @staticmethod
+    def render_dish(query_result: Dish) -> bytes:
+        """Renders SQLAlchemy dish instance into JSON response body."""
+
+        return DishSchema.model_validate(query_result).model_dump_json().encode()
 
-        if all_dishes := await self.cache.get('all_dishes'):
-            return pickle.loads(all_dishes)
-        return None
+    @staticmethod
+    def lookup_keys(menu_id: str, submenu_id: str, dish_id: str) -> dict[str, str]:
+        """Keys of rows looked up for the dish by their not found details, for caching of missing ids."""
 
-    async def set_dishes(self, query_result: list[Dish]) -> None:
-        """Sets into cache memory SQLAlchemy query result for getting list of all dishes."""
+        return {
+            **SubMenuCacheCRUD.lookup_keys(menu_id, submenu_id),
+            'dish not found': DISH_KEY.format(dish_id=dish_id),
+        }
 
-        await self.cache.set('all_dishes', pickle.dumps(query_result))
+    async def get_dishes(self, submenu_id: str) -> CacheEntry | None:
+        """Returns cached list of dishes of a specific submenu if available in cache."""
+
+        return await self.get_key(DISHES_KEY.format(submenu_id=submenu_id))
+
+    async def set_dishes(
+        self,
+        menu_id: str,
+        submenu_id: str,
+        body: bytes,
+        version: int,
+        delta: float = 0.0,
+        since: int = 0,
+    ) -> None:
+        """
+        Sets into cache memory rendered list of dishes of a specific submenu,
+        stored as a hash with one field per dish so writes of a dish change only its field.
+        """
+
+        await self.set_collection(
+            DISHES_KEY.format(submenu_id=submenu_id),
+            # split as plain JSON, validating the rendered dishes again would apply their discount twice
+            {compact_id(dish['id']): json.dumps(dish, ensure_ascii=False, separators=(',', ':')).encode() for dish in json.loads(body)},
+            MENU_TAG.format(menu_id=menu_id),
+            SUBMENU_TAG.format(submenu_id=submenu_id),
+            policy=LIST_POLICY,
+            version=version,
+            delta=delta,
+            since=since
+        )
 
-    async def invalidate_dishes(self, menu_id: str, submenu_id: str) -> None:
+    async def set_listed_dish(self, submenu_id: str, dish_id: str, body: bytes, version: int) -> None:
+        """
+        Sets rendered dish instance in cached list of dishes of its submenu, for creating or updating it.
+        Queue before `set_dish` of the same write, see `CacheCRUD.set_item`.
+        """
+
+        await self.set_item(
+            DISHES_KEY.format(submenu_id=submenu_id),
+            compact_id(dish_id),
+            body,
+            DISH_KEY.format(dish_id=dish_id),
+            version
+        )
+
+    async def delete_listed_dish(self, submenu_id: str, dish_id: str) -> None:
+        """Deletes dish instance from cached list of dishes of its submenu."""
+
+        await self.delete_item(DISHES_KEY.format(submenu_id=submenu_id), compact_id(dish_id))
+
+    async def invalidate_dishes(self, menu_id: str, submenu_id: str, with_counters: bool = True) -> None:
         """
         Invalidation happens with deleting all related information in cache
-        that was anyhow related to all dishes, submenus and menus as well as specific submenu and menu.
+        that was anyhow related to dishes of a specific submenu and preview.
+        The list of dishes itself is kept, writes change its field with `set_listed_dish` or `delete_listed_dish`.
+        With `with_counters` set the submenu and menu instances and their lists are deleted as well
+        because their dishes counters changed.
         Made to correctly store valid information at the time PostgreSQL database changes are made.
         """
 
-        await self.cache.delete(
-            f'menu_id_{menu_id}',
-            f'submenu_id_{submenu_id}',
-            'all_submenus',
-            'all_menus',
-            'all_dishes',
-            'menus_preview'
-        )
+        if with_counters:
+            await self.invalidate(
+                SUBMENU_KEY.format(submenu_id=submenu_id),
+                MENU_KEY.format(menu_id=menu_id),
+                keep_stale=(MENUS_PREVIEW_KEY, SUBMENUS_KEY.format(menu_id=menu_id), MENUS_KEY)
+            )
+        else:
+            await self.invalidate(keep_stale=(MENUS_PREVIEW_KEY,))
 
-    async def get_dish(self, dish_id) -> Dish | None:
+    async def get_dish(self, dish_id: str) -> CacheEntry | None:
         """Returns cached dish instance if available."""
 
-        if target_dish := await self.cache.get(f'dish_id_{dish_id}'):
-            return pickle.loads(target_dish)
-        return None
+        return await self.get_key(DISH_KEY.format(dish_id=dish_id))
 
-    async def set_dish(self, query_result: Dish) -> None:
-        """Sets into cache memory SQLAlchemy query result for getting, creating or updating dish instance."""
+    async def set_dish(
+        self,
+        menu_id: str,
+        submenu_id: str,
+        dish_id: str,
+        body: bytes,
+        version: int,
+        delta: float = 0.0,
+        since: int = 0,
+        new_version: int = 0,
+    ) -> None:
+        """
+        Sets into cache memory rendered dish instance for getting, creating or updating it.
+        Builds pass `since`, writes of created or updated rows pass `new_version`, see `CacheCRUD.set_key`.
+        """
 
-        serialized_dish = DishSchema.model_validate(query_result)
-        await self.cache.set(f'dish_id_{query_result.id}', pickle.dumps(serialized_dish))
+        await self.set_key(
+            DISH_KEY.format(dish_id=dish_id),
+            body,
+            MENU_TAG.format(menu_id=menu_id),
+            SUBMENU_TAG.format(submenu_id=submenu_id),
+            policy=ENTITY_POLICY,
+            version=version,
+            delta=delta,
+            since=since,
+            new_version=new_version
+        )
 
     async def delete(self, dish_id: str) -> None:
         """Deletes from cache specific dish instance by its key."""
 
-        await self.cache.delete(f'dish_id_{dish_id}')
+        await self.invalidate(DISH_KEY.format(dish_id=dish_id))
@@ -0,0 +1,152 @@
+import logging
+import math
+import random
+import struct
+import time
+import zlib
+
+from app.config.base import CACHE_COMPRESSION, CACHE_COMPRESSION_THRESHOLD, XFETCH_BETA
+from app.services.cache.stats import compression_stats
+from app.utils.generators import expand_id
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+HEADER = struct.Struct('!BQddd')
+
+# format marker stored in the header, entries of every format can be read regardless of current setting
+RAW, ZLIB, LZ4, ZSTD = 0, 1, 2, 3
+CODECS = {ZLIB: (zlib.compress, zlib.decompress)}
+if lz4_frame is not None:
+    CODECS[LZ4] = (lz4_frame.compress, lz4_frame.decompress)
+if zstandard is not None:
+    CODECS[ZSTD] = (zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress)
+
+CODEC = {'none': RAW, 'zlib': ZLIB, 'lz4': LZ4, 'zstd': ZSTD}[CACHE_COMPRESSION]
+if CODEC != RAW and CODEC not in CODECS:
+    logging.warning(f'{CACHE_COMPRESSION} compression is not installed, falling back to zlib')
+    CODEC = ZLIB
+
+# set in the format marker of entries built from a read replica
+FROM_REPLICA = 0x80
+
+# fields of collection entries with their metadata, other fields are keyed by row ids that never start with ':'
+ENTRY_FIELD, VERSION_FIELD = b':entry', b':version'
+
+
+def etag(version: int, replica_built_at: float | None = None) -> str:
+    """
+    Strong ETag of the body built at given version of its cache key.
+    Bodies built from a read replica may miss changes the version already counts,
+    so their ETag carries the time they were built at as well, and differs from the one of the next build.
+    """
+
+    if replica_built_at is None:
+        return f'"{version}"'
+    return f'"{version}-{round(replica_built_at * 1000)}"'
+
+
+class CacheEntry:
+    """
+    Cached response body with metadata for stale-while-revalidate.
+    Bodies of `CACHE_COMPRESSION_THRESHOLD` bytes and more are stored compressed.\n
+    Attributes:
+        body: rendered JSON response body
+        version: version of the cache key the body was built at
+        built_at: unix time the body was built at
+        delta: seconds it took to build the body
+        stale_at: unix time the body becomes stale, `0` for entries that never do
+        replica: whether the body was built from a read replica
+    """
+
+    def __init__(
+        self,
+        body: bytes,
+        built_at: float,
+        delta: float = 0.0,
+        stale_at: float = 0.0,
+        version: int = 0,
+        replica: bool = False,
+    ) -> None:
+        self.body = body
+        self.version = version
+        self.built_at = built_at
+        self.delta = delta
+        self.stale_at = stale_at
+        self.replica = replica
+
+    @classmethod
+    def new(
+        cls,
+        body: bytes,
+        delta: float = 0.0,
+        soft_ttl: float | None = None,
+        version: int = 0,
+        replica: bool = False,
+    ) -> 'CacheEntry':
+        """Entry for a body built just now, becoming stale after `soft_ttl` seconds if given."""
+
+        now = time.time()
+        return cls(body, now, delta, now + soft_ttl if soft_ttl else 0.0, version, replica)
+
+    @classmethod
+    def unpack(cls, raw: bytes) -> 'CacheEntry':
+        """Reads entry stored in cache by `pack`."""
+
+        marker, version, built_at, delta, stale_at = HEADER.unpack_from(raw)
+        codec = marker & ~FROM_REPLICA
+        body = raw[HEADER.size:]
+        if codec != RAW:
+            body = CODECS[codec][1](body)
+        return cls(body, built_at, delta, stale_at, version, bool(marker & FROM_REPLICA))
+
+    @classmethod
+    def from_fields(cls, fields: list[bytes]) -> 'CacheEntry':
+        """
+        Reads collection entry stored in cache as a hash, see `CacheCRUD.set_collection`,
+        as given by `HGETALL`. Bodies of its items are joined into a JSON array ordered by id as the database orders them,
+        Redis returns fields of large hashes in no particular order.
+        """
+
+        items = dict(zip(fields[::2], fields[1::2]))
+        entry = cls.unpack(items.pop(ENTRY_FIELD))
+        entry.version = int(items.pop(VERSION_FIELD))
+        ordered = sorted(items.items(), key=lambda item: expand_id(item[0].decode()))
+        entry.body = b'[' + b','.join(body for _, body in ordered) + b']'
+        return entry
+
+    def pack(self) -> bytes:
+        """Metadata header followed by the body, compressed if it is large enough, as stored in cache."""
+
+        codec, body = RAW, self.body
+        if CODEC != RAW and len(body) >= CACHE_COMPRESSION_THRESHOLD:
+            compressed = CODECS[CODEC][0](body)
+            compression_stats.count(len(body), len(compressed))
+            if len(compressed) < len(body):
+                codec, body = CODEC, compressed
+        marker = codec | FROM_REPLICA if self.replica else codec
+        return HEADER.pack(marker, self.version, self.built_at, self.delta, self.stale_at) + body
+
+    @property
+    def etag(self) -> str:
+        """Strong ETag of the body, see `etag`."""
+
+        return etag(self.version, self.built_at if self.replica else None)
+
+    def should_refresh(self) -> bool:
+        """
+        Probabilistic early expiration (XFetch): the closer the entry is to `stale_at`
+        and the longer it took to build, the more likely a read picks it for refresh.
+        Always true once the entry is stale.
+        """
+
+        if not self.stale_at:
+            return False
+        return time.time() - self.delta * XFETCH_BETA * math.log(1.0 - random.random()) >= self.stale_at
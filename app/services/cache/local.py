@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.config.base import (
+    CACHE_INVALIDATION_CHANNEL,
+    CACHE_LOCAL_ADMISSION_HITS,
+    CACHE_LOCAL_ENABLED,
+    CACHE_LOCAL_MAX_SIZE,
+    CACHE_LOCAL_TTL,
+)
+from app.services.cache.entry import CacheEntry
+from app.services.cache.stats import cache_stats
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with TTL that sits in front of Redis.\n
+    A key is admitted only after it was requested `admission_hits` times,
+    so one-off reads of cold keys do not push hot keys out.
+    """
+
+    def __init__(self, max_size: int, ttl: float, admission_hits: int) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.admission_hits = admission_hits
+        self.entries: OrderedDict[str, tuple[float, CacheEntry]] = OrderedDict()
+        self.frequency: dict[str, int] = {}
+        self.version = 0
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Returns not expired value for the key and marks it as recently used."""
+
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self.entries[key]
+            entry = None
+
+        cache_stats['local'].count(entry is not None)
+        if entry is None:
+            self.frequency[key] = self.frequency.get(key, 0) + 1
+            if len(self.frequency) > self.max_size * 10:
+                # ageing of the admission counters, so old popularity does not stay forever
+                self.frequency = {k: v // 2 for k, v in self.frequency.items() if v > 1}
+            return None
+
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, entry: CacheEntry, version: int) -> None:
+        """
+        Stores entry read from Redis if the key passed admission.
+        Entries read before an invalidation message arrived (`version` changed) are dropped.
+        """
+
+        if version != self.version or self.frequency.get(key, 0) < self.admission_hits:
+            return
+
+        self.entries[key] = (time.monotonic() + self.ttl, entry)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        """Evicts given keys."""
+
+        self.version += 1
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Evicts everything, used when invalidation messages could have been missed."""
+
+        self.version += 1
+        self.entries.clear()
+
+
+local_cache = LocalCache(
+    max_size=CACHE_LOCAL_MAX_SIZE,
+    ttl=CACHE_LOCAL_TTL,
+    admission_hits=CACHE_LOCAL_ADMISSION_HITS,
+) if CACHE_LOCAL_ENABLED else None
+
+
+async def listen_invalidations(cache: Redis) -> None:
+    """
+    Evicts keys from in-process cache published by any worker on invalidation channel.
+    Runs until cancelled, resubscribing after connection errors.
+    """
+
+    while True:
+        try:
+            async with cache.pubsub() as pubsub:
+                await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+                local_cache.clear()
+
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        local_cache.delete(*message['data'].decode().split('\n'))
+
+        except RedisError as error:
+            logging.error(error)
+            local_cache.clear()
+            await asyncio.sleep(1)
@@ -1,46 +1,87 @@
-import pickle
+from pydantic import TypeAdapter
 
-from sqlalchemy import Row
-
-from app.models.dish import Dish
+from app.config.base import MENU_KEY, MENU_TAG, MENUS_KEY, MENUS_PREVIEW_KEY
 from app.models.menu import Menu
-from app.models.submenu import SubMenu
 from app.schemas.menu import Menu as MenuSchema
+from app.schemas.menu_preview import MenuPreview as MenuPreviewSchema
+from app.services.cache.entry import CacheEntry
+from app.services.cache.policy import ENTITY_POLICY, LIST_POLICY, PREVIEW_POLICY
 from app.services.main import CacheCRUD
 
+preview_adapter = TypeAdapter(list[MenuPreviewSchema])
+menus_adapter = TypeAdapter(list[MenuSchema])
+
 
 class MenuCacheCRUD(CacheCRUD):
     """
     Service for caching endpoints' CRUD operations.\n
+    Entries are stored as rendered JSON response bodies,
+    preview and list of menus are served stale while refreshed after the soft TTL of their policy,
+    expiry of every key family is set in `app.services.cache.policy`.\n
     Avaiable methods: `get_menu`, `set_menu`, `delete`.
     """
 
-    async def get_preview(self) -> list[Row[tuple[Menu, SubMenu, Dish]]] | None:
-        """Checks if the `everything` key is present/existent in cache db."""
+    @staticmethod
+    def render_preview(query_result: list[Menu]) -> bytes:
+        """Renders SQLAlchemy query result for menus preview into JSON response body."""
 
-        if everything := await self.cache.get('menus_preview'):
-            return pickle.loads(everything)
-        return None
+        return preview_adapter.dump_json(
+            preview_adapter.validate_python(query_result, from_attributes=True)
+        )
 
-    async def set_preview(
-        self,
-        query_result: list[Row[tuple[Menu, SubMenu, Dish]]]
-    ) -> None:
+    @staticmethod
+    def render_menus(query_result: list[Menu]) -> bytes:
+        """Renders SQLAlchemy query result for list of all menus into JSON response body."""
+
+        return menus_adapter.dump_json(
+            menus_adapter.validate_python(query_result, from_attributes=True)
+        )
+
+    @staticmethod
+    def render_menu(query_result: Menu) -> bytes:
+        """Renders SQLAlchemy menu instance into JSON response body."""
+
+        return MenuSchema.model_validate(query_result).model_dump_json().encode()
+
+    @staticmethod
+    def lookup_keys(menu_id: str) -> dict[str, str]:
+        """Keys of rows looked up for the menu by their not found details, for caching of missing ids."""
+
+        return {'menu not found': MENU_KEY.format(menu_id=menu_id)}
+
+    async def get_preview(self) -> CacheEntry | None:
+        """Checks if the `menus_preview` key is present/existent in cache db."""
+
+        return await self.get_key(MENUS_PREVIEW_KEY)
+
+    async def set_preview(self, body: bytes, version: int, delta: float = 0.0, since: int = 0) -> None:
         """Sets the key `menus_preview` in cache db."""
 
-        await self.cache.set('menus_preview', pickle.dumps(query_result))
+        await self.set_key(
+            MENUS_PREVIEW_KEY,
+            body,
+            policy=PREVIEW_POLICY,
+            version=version,
+            delta=delta,
+            since=since
+        )
 
-    async def get_menus(self) -> list[Menu] | None:
+    async def get_menus(self) -> CacheEntry | None:
         """Returns cached list of all menus if available in cache."""
 
-        if all_menus := await self.cache.get('all_menus'):
-            return pickle.loads(all_menus)
-        return None
+        return await self.get_key(MENUS_KEY)
 
-    async def set_menus(self, query_result: list[dict]) -> None:
-        """Sets into cache memory SQLAlchemy query result for getting list of all menus."""
+    async def set_menus(self, body: bytes, version: int, delta: float = 0.0, since: int = 0) -> None:
+        """Sets into cache memory rendered list of all menus."""
 
-        await self.cache.set('all_menus', pickle.dumps(query_result))
+        await self.set_key(
+            MENUS_KEY,
+            body,
+            policy=LIST_POLICY,
+            version=version,
+            delta=delta,
+            since=since
+        )
 
     async def invalidate_menus(self) -> None:
         """
@@ -48,25 +89,71 @@ class MenuCacheCRUD(CacheCRUD):
         Made to correctly store valid information at the time PostgreSQL database changes are made.
         """
 
-        await self.cache.delete(
-            'all_menus',
-            'menus_preview'
+        await self.invalidate(keep_stale=(MENUS_KEY, MENUS_PREVIEW_KEY))
+
+    async def invalidate_counters(self, *menu_ids: str) -> None:
+        """
+        Invalidation of given menus with every submenu entry cached under them and list of all menus,
+        after their counters were recounted.
+        The preview is changed as well, projections with nested submenus are scoped to its version.
+        """
+
+        await self.invalidate(
+            *(MENU_KEY.format(menu_id=menu_id) for menu_id in menu_ids),
+            tags=tuple(MENU_TAG.format(menu_id=menu_id) for menu_id in menu_ids),
+            keep_stale=(MENUS_KEY, MENUS_PREVIEW_KEY)
         )
 
-    async def get_menu(self, menu_id: str) -> Menu | None:
+    async def get_menu(self, menu_id: str) -> CacheEntry | None:
         """Returns cached menu instance if available."""
 
-        if target_menu := await self.cache.get(f'menu_id_{menu_id}'):
-            return pickle.loads(target_menu)
-        return None
+        return await self.get_key(MENU_KEY.format(menu_id=menu_id))
+
+    async def set_menu(
+        self,
+        menu_id: str,
+        body: bytes,
+        version: int,
+        delta: float = 0.0,
+        since: int = 0,
+        new_version: int = 0,
+    ) -> None:
+        """
+        Sets into cache memory rendered menu instance for getting, creating or updating it.
+        Builds pass `since`, writes of created or updated rows pass `new_version`, see `CacheCRUD.set_key`.
+        """
+
+        await self.set_key(
+            MENU_KEY.format(menu_id=menu_id),
+            body,
+            MENU_TAG.format(menu_id=menu_id),
+            policy=ENTITY_POLICY,
+            version=version,
+            delta=delta,
+            since=since,
+            new_version=new_version
+        )
 
-    async def set_menu(self, query_result: Menu) -> None:
-        """Sets into cache memory SQLAlchemy query result for getting, creating or updating menu instance."""
+    async def invalidate_batch(self, menu_ids: set[str], keys: list[str]) -> None:
+        """
+        Invalidation after a batch of changes, see `BatchCRUD.apply_batch`, at once for all its rows:
+        given menus with every entry cached under them, given keys of changed rows and the lists of all menus.
+        """
 
-        serialized_menu = MenuSchema.model_validate(query_result)
-        await self.cache.set(f'menu_id_{query_result.id}', pickle.dumps(serialized_menu))
+        await self.invalidate(
+            *(MENU_KEY.format(menu_id=menu_id) for menu_id in menu_ids),
+            *keys,
+            tags=tuple(MENU_TAG.format(menu_id=menu_id) for menu_id in menu_ids),
+            keep_stale=(MENUS_KEY, MENUS_PREVIEW_KEY)
+        )
 
     async def delete(self, menu_id: str) -> None:
-        """Deletes from cache specific menu instance by its key."""
+        """
+        Deletes from cache specific menu instance by its key
+        together with every submenu and dish entry cached under the menu.
+        """
 
-        await self.cache.delete(f'menu_id_{menu_id}')
+        await self.invalidate(
+            MENU_KEY.format(menu_id=menu_id),
+            tags=(MENU_TAG.format(menu_id=menu_id),)
+        )
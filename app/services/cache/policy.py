@@ -0,0 +1,108 @@
+import random
+import time
+from collections import OrderedDict
+
+from app.config.base import (
+    CACHE_ADAPTIVE_FACTOR,
+    CACHE_ADAPTIVE_MIN_TTL,
+    CACHE_ADAPTIVE_TRACKED_KEYS,
+    CACHE_ENTITY_ADAPTIVE,
+    CACHE_ENTITY_JITTER,
+    CACHE_ENTITY_TTL,
+    CACHE_LIST_ADAPTIVE,
+    CACHE_LIST_JITTER,
+    CACHE_LIST_SOFT_TTL,
+    CACHE_LIST_TTL,
+    CACHE_NOT_FOUND_JITTER,
+    CACHE_NOT_FOUND_TTL,
+    CACHE_PREVIEW_ADAPTIVE,
+    CACHE_PREVIEW_JITTER,
+    CACHE_PREVIEW_SOFT_TTL,
+    CACHE_PREVIEW_TTL,
+)
+
+
+class WriteFrequency:
+    """
+    Average interval between changes of recently changed keys in current worker process.\n
+    Intervals are averaged exponentially so the recent rate of writes counts most,
+    at most `max_size` keys are tracked, the least recently changed are forgotten first.
+    """
+
+    def __init__(self, max_size: int, weight: float = 0.3) -> None:
+        self.max_size = max_size
+        self.weight = weight
+        self.keys: OrderedDict[str, tuple[float, float | None]] = OrderedDict()
+
+    def observe(self, *keys: str) -> None:
+        """Records a change of given keys."""
+
+        now = time.monotonic()
+        for key in keys:
+            last, interval = self.keys.pop(key, (None, None))
+            if last is not None:
+                elapsed = now - last
+                interval = elapsed if interval is None else interval + self.weight * (elapsed - interval)
+            self.keys[key] = (now, interval)
+        while len(self.keys) > self.max_size:
+            self.keys.popitem(last=False)
+
+    def interval(self, key: str) -> float | None:
+        """Average seconds between changes of the key, `None` if it did not change twice yet."""
+
+        return self.keys.get(key, (None, None))[1]
+
+
+write_frequency = WriteFrequency(CACHE_ADAPTIVE_TRACKED_KEYS)
+
+
+class CachePolicy:
+    """
+    Expiry of one family of cache keys.\n
+    Entries expire after `ttl` seconds, `0` keeps them until invalidated,
+    and are picked for refresh after `soft_ttl`, if given.
+    With `jitter` every TTL is spread randomly by that fraction, so entries cached together do not expire together.
+    With `adaptive` keys changed often get shorter TTL, a few times their average interval between changes,
+    so they do not hold memory for entries that are replaced before being read.
+    """
+
+    def __init__(
+        self,
+        ttl: int,
+        soft_ttl: int | None = None,
+        jitter: float = 0.0,
+        adaptive: bool = False,
+    ) -> None:
+        self.ttl = ttl
+        self.soft_ttl = soft_ttl
+        self.jitter = jitter
+        self.adaptive = adaptive
+
+    @property
+    def max_ttl(self) -> int:
+        """Longest TTL the policy gives, `0` if entries do not expire."""
+
+        return int(self.ttl * (1 + self.jitter)) + 1 if self.ttl else 0
+
+    def ttl_for(self, key: str) -> int:
+        """Seconds the entry of the key is kept, `0` for no expiry."""
+
+        ttl = self.ttl
+        if not ttl:
+            return 0
+        if self.adaptive and (interval := write_frequency.interval(key)) is not None:
+            ttl = min(ttl, max(CACHE_ADAPTIVE_MIN_TTL, int(interval * CACHE_ADAPTIVE_FACTOR)))
+        if self.jitter:
+            ttl = round(ttl * (1 + random.uniform(-self.jitter, self.jitter)))
+        return max(ttl, 1)
+
+
+PREVIEW_POLICY = CachePolicy(CACHE_PREVIEW_TTL, CACHE_PREVIEW_SOFT_TTL, CACHE_PREVIEW_JITTER, CACHE_PREVIEW_ADAPTIVE)
+LIST_POLICY = CachePolicy(CACHE_LIST_TTL, CACHE_LIST_SOFT_TTL, CACHE_LIST_JITTER, CACHE_LIST_ADAPTIVE)
+ENTITY_POLICY = CachePolicy(CACHE_ENTITY_TTL, jitter=CACHE_ENTITY_JITTER, adaptive=CACHE_ENTITY_ADAPTIVE)
+NOT_FOUND_POLICY = CachePolicy(CACHE_NOT_FOUND_TTL, jitter=CACHE_NOT_FOUND_JITTER)
+
+# tag sets outlive every entry registered in them, unless some entries never expire
+TAG_TTL = 0 if not all(
+    policy.ttl for policy in (PREVIEW_POLICY, LIST_POLICY, ENTITY_POLICY)
+) else max(policy.max_ttl for policy in (PREVIEW_POLICY, LIST_POLICY, ENTITY_POLICY))
@@ -0,0 +1,57 @@
+class TierStats:
+    """Hit and miss counters of a single cache tier in current worker process."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def count(self, hit: bool) -> None:
+        """Counts a lookup as hit or miss."""
+
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def as_dict(self) -> dict:
+        """Counters with hit ratio for monitoring endpoint."""
+
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CompressionStats:
+    """Sizes of cache entries compressed by current worker process."""
+
+    def __init__(self) -> None:
+        self.compressed = 0
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+
+    def count(self, raw_size: int, compressed_size: int) -> None:
+        """Counts sizes of an entry before and after compression."""
+
+        self.compressed += 1
+        self.raw_bytes += raw_size
+        self.compressed_bytes += compressed_size
+
+    def as_dict(self) -> dict:
+        """Counters with compression ratio for monitoring endpoint."""
+
+        return {
+            'compressed': self.compressed,
+            'raw_bytes': self.raw_bytes,
+            'compressed_bytes': self.compressed_bytes,
+            'ratio': round(self.raw_bytes / self.compressed_bytes, 4) if self.compressed_bytes else 0.0,
+        }
+
+
+cache_stats = {
+    'local': TierStats(),
+    'redis': TierStats(),
+}
+compression_stats = CompressionStats()
@@ -1,56 +1,128 @@
-import pickle
+from pydantic import TypeAdapter
 
+from app.config.base import (
+    MENU_KEY,
+    MENU_TAG,
+    MENUS_KEY,
+    MENUS_PREVIEW_KEY,
+    SUBMENU_KEY,
+    SUBMENU_TAG,
+    SUBMENUS_KEY,
+)
 from app.models.submenu import SubMenu
 from app.schemas.submenu import SubMenu as SubMenuSchema
+from app.services.cache.entry import CacheEntry
+from app.services.cache.menu import MenuCacheCRUD
+from app.services.cache.policy import ENTITY_POLICY, LIST_POLICY
 from app.services.main import CacheCRUD
 
+submenus_adapter = TypeAdapter(list[SubMenuSchema])
+
 
 class SubMenuCacheCRUD(CacheCRUD):
     """
     Service for caching endpoints' CRUD operations.\n
+    Entries are stored as rendered JSON response bodies,
+    lists of submenus are served stale while refreshed after the soft TTL of their policy,
+    expiry of every key family is set in `app.services.cache.policy`.\n
     Avaiable methods: `get_submenu`, `set_submenu`, `delete`.
     """
 
-    async def get_submenus(self) -> list[SubMenu] | None:
-        """Returns cached list of all submenus if available in cache."""
+    @staticmethod
+    def render_submenus(query_result: list[SubMenu]) -> bytes:
+        """Renders SQLAlchemy query result for list of submenus into JSON response body."""
+
+        return submenus_adapter.dump_json(
+            submenus_adapter.validate_python(query_result, from_attributes=True)
+        )
+
+    @staticmethod
+    def render_submenu(query_result: SubMenu) -> bytes:
+        """Renders SQLAlchemy submenu instance into JSON response body."""
+
+        return SubMenuSchema.model_validate(query_result).model_dump_json().encode()
+
+    @staticmethod
+    def lookup_keys(menu_id: str, submenu_id: str) -> dict[str, str]:
+        """Keys of rows looked up for the submenu by their not found details, for caching of missing ids."""
+
+        return {
+            **MenuCacheCRUD.lookup_keys(menu_id),
+            'submenu not found': SUBMENU_KEY.format(submenu_id=submenu_id),
+        }
+
+    async def get_submenus(self, menu_id: str) -> CacheEntry | None:
+        """Returns cached list of submenus of a specific menu if available in cache."""
 
-        if all_submenus := await self.cache.get('all_submenus'):
-            return pickle.loads(all_submenus)
-        return None
+        return await self.get_key(SUBMENUS_KEY.format(menu_id=menu_id))
 
-    async def set_submenus(self, query_result: list[dict]) -> None:
-        """Sets into cache memory SQLAlchemy query result for getting list of all submenus."""
+    async def set_submenus(self, menu_id: str, body: bytes, version: int, delta: float = 0.0, since: int = 0) -> None:
+        """Sets into cache memory rendered list of submenus of a specific menu."""
 
-        await self.cache.set('all_submenus', pickle.dumps(query_result))
+        await self.set_key(
+            SUBMENUS_KEY.format(menu_id=menu_id),
+            body,
+            MENU_TAG.format(menu_id=menu_id),
+            policy=LIST_POLICY,
+            version=version,
+            delta=delta,
+            since=since
+        )
 
-    async def invalidate_submenus(self, menu_id: str) -> None:
+    async def invalidate_submenus(self, menu_id: str, with_counters: bool = True) -> None:
         """
         Invalidation happens with deleting all related information in cache
-        that was anyhow related to all submenus and menus as well as specific menu.
+        that was anyhow related to submenus of a specific menu and preview.
+        With `with_counters` set the menu instance and the list of all menus are deleted as well
+        because their submenus and dishes counters changed.
         Made to correctly store valid information at the time PostgreSQL database changes are made.
         """
 
-        await self.cache.delete(
-            f'menu_id_{menu_id}',
-            'all_submenus',
-            'all_menus',
-            'menus_preview'
-        )
+        lists = (SUBMENUS_KEY.format(menu_id=menu_id), MENUS_PREVIEW_KEY)
+        if with_counters:
+            await self.invalidate(MENU_KEY.format(menu_id=menu_id), keep_stale=(*lists, MENUS_KEY))
+        else:
+            await self.invalidate(keep_stale=lists)
 
-    async def get_submenu(self, submenu_id: str) -> SubMenu | None:
+    async def get_submenu(self, submenu_id: str) -> CacheEntry | None:
         """Returns cached submenu instance if available."""
 
-        if target_submenu := await self.cache.get(f'submenu_id_{submenu_id}'):
-            return pickle.loads(target_submenu)
-        return None
+        return await self.get_key(SUBMENU_KEY.format(submenu_id=submenu_id))
 
-    async def set_submenu(self, query_result: SubMenu) -> None:
-        """Sets into cache memory SQLAlchemy query result for getting, creating or updating submenu instance."""
+    async def set_submenu(
+        self,
+        menu_id: str,
+        submenu_id: str,
+        body: bytes,
+        version: int,
+        delta: float = 0.0,
+        since: int = 0,
+        new_version: int = 0,
+    ) -> None:
+        """
+        Sets into cache memory rendered submenu instance for getting, creating or updating it.
+        Builds pass `since`, writes of created or updated rows pass `new_version`, see `CacheCRUD.set_key`.
+        """
 
-        serialized_submenu = SubMenuSchema.model_validate(query_result)
-        await self.cache.set(f'submenu_id_{query_result.id}', pickle.dumps(serialized_submenu))
+        await self.set_key(
+            SUBMENU_KEY.format(submenu_id=submenu_id),
+            body,
+            MENU_TAG.format(menu_id=menu_id),
+            SUBMENU_TAG.format(submenu_id=submenu_id),
+            policy=ENTITY_POLICY,
+            version=version,
+            delta=delta,
+            since=since,
+            new_version=new_version
+        )
 
     async def delete(self, submenu_id: str) -> None:
-        """Deletes from cache specific submenu instance by its key."""
+        """
+        Deletes from cache specific submenu instance by its key
+        together with every dish entry cached under the submenu.
+        """
 
-        await self.cache.delete(f'submenu_id_{submenu_id}')
+        await self.invalidate(
+            SUBMENU_KEY.format(submenu_id=submenu_id),
+            tags=(SUBMENU_TAG.format(submenu_id=submenu_id),)
+        )
@@ -0,0 +1,219 @@
+from typing import Any
+
+from sqlalchemy import (
+    ColumnElement,
+    Delete,
+    Insert,
+    TableValuedAlias,
+    any_,
+    bindparam,
+    column,
+    delete,
+    func,
+    literal_column,
+    select,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+
+from app.models.dish import Dish as DishModel
+from app.models.menu import Menu as MenuModel
+from app.models.submenu import SubMenu as SubMenuModel
+from app.models.types import UUIDString
+from app.schemas.batch import Batch, BatchItem, BatchResult
+from app.services.main import DatabaseCRUD
+from app.utils.generators import generate_uuid
+
+
+def id_array(ids: list[str]) -> ColumnElement:
+    """Ids as a single array parameter, matched with `= ANY`, so any number of them is sent as one parameter."""
+
+    return bindparam(None, ids, type_=ARRAY(UUIDString()))
+
+
+def unnested(model: Any, rows: list[dict]) -> TableValuedAlias:
+    """
+    Rows as a table of `unnest` of one array parameter per column of the model,
+    so any number of rows is sent in one statement with a fixed number of parameters.
+    """
+
+    columns = [model.__table__.c[name] for name in rows[0]]
+    return (
+        func.unnest(*(
+            bindparam(None, [row[table_column.name] for row in rows], type_=ARRAY(table_column.type))
+            for table_column in columns
+        ))
+        .table_valued(*(column(table_column.name, table_column.type) for table_column in columns))
+        .render_derived()
+    )
+
+
+def upsert(model: Any, rows: list[dict], parent: Any = None, parent_id: str = '') -> Insert:
+    """
+    `INSERT ... ON CONFLICT DO UPDATE` of the rows replacing given columns of the existing ones, stored counters are kept.
+    With `parent` the rows are joined with their parents by `parent_id` column, rows of missing parents are skipped.
+    Returns ids of stored rows and whether each of them was created.
+    """
+
+    rows_table = unnested(model, rows)
+    query = select(*rows_table.c)
+    if parent is not None:
+        query = query.join(parent, parent.id == rows_table.c[parent_id])
+
+    statement = insert(model).from_select(list(rows[0]), query)
+    return (
+        statement
+        .on_conflict_do_update(
+            index_elements=[model.id],
+            set_={name: statement.excluded[name] for name in rows[0] if name != 'id'},
+        )
+        # `xmax` of a row is set when an existing row is updated by the conflict clause
+        .returning(model.id, literal_column('xmax = 0').label('created'))
+    )
+
+
+def delete_by_ids(model: Any, ids: list[str]) -> Delete:
+    """`DELETE ... WHERE id = ANY` of rows with given ids, returns ids of deleted rows."""
+
+    return (
+        delete(model)
+        .where(model.id == any_(id_array(ids)))
+        .returning(model.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def upsert_results(rows: list[dict], stored: dict[str, bool], parent: str) -> list[BatchItem]:
+    """Results of upserted rows in their order, rows skipped by `upsert` are the ones of missing parents."""
+
+    return [
+        BatchItem(id=row['id'], status='created' if stored[row['id']] else 'updated')
+        if row['id'] in stored else
+        BatchItem(id=row['id'], status='not found', detail=f'{parent} not found')
+        for row in rows
+    ]
+
+
+def delete_results(ids: list[str], deleted: set[str], entity: str) -> list[BatchItem]:
+    """Results of deleted rows in their order, rows not deleted did not exist."""
+
+    return [
+        BatchItem(id=row_id, status='deleted')
+        if row_id in deleted else
+        BatchItem(id=row_id, status='not found', detail=f'{entity} not found')
+        for row_id in ids
+    ]
+
+
+class BatchCRUD(DatabaseCRUD):
+    """Service applying batches of changes of menus, submenus and dishes."""
+
+    async def get_parent_menu_ids(self, submenu_ids: list[str], dish_ids: list[str]) -> set[str]:
+        """Ids of menus of given submenus and of submenus of given dishes before the batch changes them."""
+
+        if not submenu_ids and not dish_ids:
+            return set()
+
+        result = await self.db.execute(
+            select(SubMenuModel.menu_id)
+            .where(SubMenuModel.id == any_(id_array(submenu_ids)))
+            .union(
+                select(SubMenuModel.menu_id)
+                .join(DishModel, DishModel.submenu_id == SubMenuModel.id)
+                .where(DishModel.id == any_(id_array(dish_ids)))
+            )
+        )
+
+        return set(result.scalars().all())
+
+    async def upsert_rows(self, model: Any, rows: list[dict], *args) -> dict[str, bool]:
+        """Upserts rows in one statement, see `upsert` for its arguments, returns whether every stored row was created."""
+
+        if not rows:
+            return {}
+
+        result = await self.db.execute(upsert(model, rows, *args))
+
+        return dict(result.tuples().all())
+
+    async def delete_rows(self, model: Any, ids: list[str]) -> set[str]:
+        """Deletes rows in one statement, see `delete_by_ids`, returns ids of deleted rows."""
+
+        if not ids:
+            return set()
+
+        result = await self.db.execute(delete_by_ids(model, ids))
+
+        return set(result.scalars().all())
+
+    async def apply_batch(self, batch: Batch) -> tuple[BatchResult, set[str]]:
+        """
+        Applies the batch in one transaction with one statement per type of rows and change:
+        upserts of menus, submenus and dishes, followed by deletes of dishes, submenus and menus,
+        so children of deleted rows are reported deleted rather than not found.
+        Stored counters are kept by database triggers, moves of rows to other parents included.\n
+        Returns result of every row and ids of menus whose rows changed, the ones rows belonged to before
+        the batch, read in one statement first, and the ones they belong to after it.
+        """
+
+        menus = [
+            {'id': str(item.id or generate_uuid()), 'title': item.title, 'description': item.description}
+            for item in batch.menus
+        ]
+        submenus = [
+            {
+                'id': str(item.id or generate_uuid()),
+                'title': item.title,
+                'description': item.description,
+                'menu_id': str(item.menu_id),
+            }
+            for item in batch.submenus
+        ]
+        dishes = [
+            {
+                'id': str(item.id or generate_uuid()),
+                'title': item.title,
+                'description': item.description,
+                'price': item.price,
+                'discount': item.discount,
+                'submenu_id': str(item.submenu_id),
+            }
+            for item in batch.dishes
+        ]
+        deleted_menus = [str(menu_id) for menu_id in batch.delete.menus]
+        deleted_submenus = [str(submenu_id) for submenu_id in batch.delete.submenus]
+        deleted_dishes = [str(dish_id) for dish_id in batch.delete.dishes]
+
+        # submenus that dishes are moved to are looked up as well, the ones created by the batch are among `submenus`
+        menu_ids = await self.get_parent_menu_ids(
+            [row['id'] for row in submenus] + deleted_submenus + [row['submenu_id'] for row in dishes],
+            [row['id'] for row in dishes] + deleted_dishes,
+        )
+
+        stored_menus = await self.upsert_rows(MenuModel, menus)
+        stored_submenus = await self.upsert_rows(SubMenuModel, submenus, MenuModel, 'menu_id')
+        stored_dishes = await self.upsert_rows(DishModel, dishes, SubMenuModel, 'submenu_id')
+
+        removed_dishes = await self.delete_rows(DishModel, deleted_dishes)
+        removed_submenus = await self.delete_rows(SubMenuModel, deleted_submenus)
+        removed_menus = await self.delete_rows(MenuModel, deleted_menus)
+
+        await self.db.commit()
+
+        menu_ids.update(stored_menus, removed_menus)
+        menu_ids.update(row['menu_id'] for row in submenus if row['id'] in stored_submenus)
+        result = BatchResult(
+            menus=[
+                *upsert_results(menus, stored_menus, 'menu'),
+                *delete_results(deleted_menus, removed_menus, 'menu'),
+            ],
+            submenus=[
+                *upsert_results(submenus, stored_submenus, 'menu'),
+                *delete_results(deleted_submenus, removed_submenus, 'submenu'),
+            ],
+            dishes=[
+                *upsert_results(dishes, stored_dishes, 'submenu'),
+                *delete_results(deleted_dishes, removed_dishes, 'dish'),
+            ],
+        )
+
+        return result, menu_ids
@@ -1,11 +1,13 @@
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import func, select
 
 from app.models.dish import Dish as DishModel
 from app.models.menu import Menu as MenuModel
 from app.models.submenu import SubMenu as SubMenuModel
 from app.schemas.dish import DishCreate, DishUpdate
+from app.schemas.page import DishPage
 from app.services.database.menu import not_found_exception as no_menu
+from app.services.database.projection import discounted_price
 from app.services.database.submenu import not_found_exception as no_submenu
 from app.services.main import DatabaseCRUD
 
@@ -19,60 +21,75 @@ def not_found_exception() -> HTTPException:
 class DishCRUD(DatabaseCRUD):
     """Service for querying specific dish."""
 
-    async def check_menu_id(self, menu_id: str) -> HTTPException | None:
-        """Check if menu id given in endpoint is correct and exists."""
-
-        res = await self.db.execute(
-            select(
-                MenuModel
+    async def fetch_dish_path(self, menu_id: str, submenu_id: str, dish_id: str | None = None) -> DishModel | None:
+        """
+        Checks the menu and submenu given in endpoint exist and fetches the dish, if `dish_id` is given,
+        in one statement, raising not found of the first of them that does not exist.
+        The menu is outer joined first, as `counted_submenus` does, so a row without submenu or dish
+        tells which of them does not exist, no rows tell the menu does not exist.
+        Children are joined on their parents, so a submenu of another menu, or a dish of another submenu, is not found.
+        """
+
+        query = (
+            select(MenuModel.id, SubMenuModel.id)
+            .select_from(MenuModel)
+            .join(
+                SubMenuModel,
+                (SubMenuModel.menu_id == MenuModel.id) & (SubMenuModel.id == submenu_id),
+                isouter=True
             )
             .where(MenuModel.id == menu_id)
         )
+        if dish_id is not None:
+            query = query.add_columns(DishModel).join(
+                DishModel,
+                (DishModel.submenu_id == SubMenuModel.id) & (DishModel.id == dish_id),
+                isouter=True
+            )
 
-        res = res.scalar()
+        result = await self.db.execute(query)
 
-        if not res:
-            return no_menu()
-        return None
-
-    async def check_submenu_id(self, submenu_id: str) -> HTTPException | None:
-        """Check if submenu id given in endpoint is correct and exists."""
+        path = result.first()
 
-        res = await self.db.execute(
-            select(
-                SubMenuModel
-            )
-            .where(SubMenuModel.id == submenu_id)
-        )
+        if not path:
+            return no_menu()
 
-        res = res.scalar()
+        _, found_submenu_id, *dish = path
 
-        if not res:
-            return no_submenu()
-        return None
+        if found_submenu_id is None:
+            return await self.not_found_in_path(SubMenuModel, submenu_id, no_submenu)
+        if dish == [None]:
+            return await self.not_found_in_path(DishModel, dish_id, not_found_exception)
+        return dish[0] if dish else None
 
-    async def fetch_dish(self, dish_id: str) -> DishModel | None:
-        """Fetching specific dish by its id for furter operations."""
+    async def get_dishes(self, submenu_id: str, page: DishPage = DishPage()) -> list[DishModel]:
+        """
+        Query to get dishes of the page matching its filters.
+        Dishes are ordered by their time ordered ids, served by the index on submenu and id,
+        prices are filtered after the discount, as they are shown.
+        """
 
-        query = await self.db.execute(
+        query = (
             select(
                 DishModel
             )
-            .where(DishModel.id == dish_id)
+            .filter(DishModel.submenu_id == submenu_id)
         )
-
-        query = query.scalar()
-
-        return query
-
-    async def get_dishes(self, submenu_id: str) -> list[DishModel]:
-        """Query to get list of all dishes."""
+        if page.after is not None:
+            query = query.filter(DishModel.id > str(page.after))
+        if page.min_price is not None:
+            query = query.filter(discounted_price() >= page.min_price)
+        if page.max_price is not None:
+            query = query.filter(discounted_price() <= page.max_price)
+        if page.min_discount is not None:
+            query = query.filter(func.coalesce(DishModel.discount, 0) >= page.min_discount)
+        if page.max_discount is not None:
+            query = query.filter(func.coalesce(DishModel.discount, 0) <= page.max_discount)
 
         result = await self.db.execute(
-            select(
-                DishModel
-            )
-            .filter(DishModel.submenu_id == submenu_id)
+            query
+            .order_by(DishModel.id)
+            .limit(page.limit)
         )
 
         return result.scalars().fetchall()
@@ -85,12 +102,11 @@ class DishCRUD(DatabaseCRUD):
     ) -> DishModel:
         """Create dish instance in database."""
 
-        await self.check_menu_id(menu_id=menu_id)
-        await self.check_submenu_id(submenu_id=submenu_id)
+        await self.fetch_dish_path(menu_id, submenu_id)
 
         if dish_schema.id:
             new_dish = DishModel(
-                id=dish_schema.id,
+                id=str(dish_schema.id),
                 title=dish_schema.title,
                 description=dish_schema.description,
                 price=dish_schema.price,
@@ -118,14 +134,7 @@ class DishCRUD(DatabaseCRUD):
     ) -> DishModel | HTTPException:
         """Get specific dish from database."""
 
-        await self.check_menu_id(menu_id=menu_id)
-        await self.check_submenu_id(submenu_id=submenu_id)
-
-        dish = await self.fetch_dish(dish_id=dish_id)
-
-        if not dish:
-            return not_found_exception()
-        return dish
+        return await self.fetch_dish_path(menu_id, submenu_id, dish_id)
 
     async def update_dish(
         self,
@@ -136,13 +145,7 @@ class DishCRUD(DatabaseCRUD):
     ) -> DishModel | HTTPException:
         """Update specific dish in database."""
 
-        await self.check_menu_id(menu_id=menu_id)
-        await self.check_submenu_id(submenu_id=submenu_id)
-
-        dish_to_update = await self.fetch_dish(dish_id=dish_id)
-
-        if not dish_to_update:
-            return not_found_exception()
+        dish_to_update = await self.fetch_dish_path(menu_id, submenu_id, dish_id)
 
         for key, value in dish_schema.model_dump(exclude_unset=True).items():
             setattr(dish_to_update, key, value)
@@ -159,13 +162,7 @@ class DishCRUD(DatabaseCRUD):
     ) -> None | HTTPException:
         """Delete specific dish in database."""
 
-        await self.check_menu_id(menu_id=menu_id)
-        await self.check_submenu_id(submenu_id=submenu_id)
-
-        dish_to_delete = await self.fetch_dish(dish_id=dish_id)
-
-        if not dish_to_delete:
-            return not_found_exception()
+        dish_to_delete = await self.fetch_dish_path(menu_id, submenu_id, dish_id)
 
         await self.db.delete(dish_to_delete)
         await self.db.commit()
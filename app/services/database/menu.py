@@ -1,11 +1,18 @@
 from fastapi import HTTPException
-from sqlalchemy import distinct, func, select
+from sqlalchemy import Select, Text, cast, func, or_, select, update
 from sqlalchemy.orm import selectinload
 
 from app.models.dish import Dish as DishModel
 from app.models.menu import Menu as MenuModel
 from app.models.submenu import SubMenu as SubMenuModel
 from app.schemas.menu import MenuCreate, MenuUpdate
+from app.schemas.page import Page
+from app.schemas.projection import (
+    PREVIEW_MENU_FIELDS,
+    PREVIEW_SUBMENU_FIELDS,
+    Projection,
+)
+from app.services.database.projection import json_array, menu_object, projected_columns
 from app.services.main import DatabaseCRUD
 
 
@@ -15,18 +22,42 @@ def not_found_exception() -> HTTPException:
     raise HTTPException(status_code=404, detail='menu not found')
 
 
+def counted_menus() -> Select:
+    """
+    Query of menus with their submenus and dishes counters.
+    Counters are columns of the menu row kept by database triggers, so no child rows are read.
+    Rows already in the session are refreshed, as triggers change counters behind the ORM.
+    """
+
+    return (
+        select(MenuModel)
+        .execution_options(populate_existing=True)
+    )
+
+
+def paged_menus(query: Select, page: Page) -> Select:
+    """
+    Orders menus by their time ordered ids, so lists come in order of creation,
+    and limits them to the page, ids following `after` use the primary key index.
+    """
+
+    if page.after is not None:
+        query = query.where(MenuModel.id > str(page.after))
+    return query.order_by(MenuModel.id).limit(page.limit)
+
+
 class MenuCRUD(DatabaseCRUD):
     """Service for querying specific menu."""
 
-    async def get_preview(self) -> list[MenuModel]:
+    async def get_preview(self, page: Page = Page()) -> list[MenuModel]:
         """
-        Returns result of a PostgreSQl query:
+        Returns menus of the page, ordered by id, with their submenus and dishes, result of a PostgreSQl query:
             SELECT
                 menus.*,
                 submenus.*,
                 dishes.*
             FROM
-                menus
+                (SELECT * FROM menus WHERE id > :after ORDER BY id LIMIT :limit) AS menus
             LEFT JOIN
                 submenus ON menus.id = submenus.menu_id
             LEFT JOIN
@@ -34,15 +65,13 @@ class MenuCRUD(DatabaseCRUD):
         """
 
         query = (
-            select(MenuModel)
+            paged_menus(select(MenuModel), page)
             .options(
                 selectinload(
                     MenuModel.submenus
                 )
-                .options(
-                    selectinload(
-                        SubMenuModel.dishes
-                    )
+                .selectinload(
+                    SubMenuModel.dishes
                 )
             )
         )
@@ -52,43 +81,74 @@ class MenuCRUD(DatabaseCRUD):
 
         return all_data
 
-    async def get_menus(self) -> list[dict]:
-        """Query to get list of all menus."""
+    async def get_preview_document(self, page: Page = Page(), projection: Projection = Projection()) -> bytes:
+        """
+        Returns menus preview as JSON document built by PostgreSQL in one statement, see `get_menus_document`.
+        Fields and includes not given by the projection are the ones of `MenuPreview` schema.
+        """
 
-        menus = await (
-            self.db.execute(
-                select(
-                    MenuModel,
-                    func.count(distinct(SubMenuModel.id)).label('submenus_count'),
-                    func.count(distinct(DishModel.id)).label('dishes_count'),
-                )
-                .join(SubMenuModel, MenuModel.id == SubMenuModel.menu_id, isouter=True)
-                .join(DishModel, SubMenuModel.id == DishModel.submenu_id, isouter=True)
-                .group_by(MenuModel.id, MenuModel.title, MenuModel.description)
-            )
+        return await self.get_menus_document(
+            page,
+            projection.with_defaults(PREVIEW_MENU_FIELDS, PREVIEW_SUBMENU_FIELDS, ('submenus', 'submenus.dishes'))
+        )
+
+    async def get_menus_document(self, page: Page, projection: Projection) -> bytes:
+        """
+        Returns menus of the page as JSON document built by PostgreSQL in one statement:
+            SELECT
+                json_agg(json_build_object(
+                    'title', menus.title, ..., 'submenus', (
+                        SELECT json_agg(json_build_object(
+                            'title', submenus.title, ..., 'dishes', (
+                                SELECT json_agg(json_build_object(...) ORDER BY dishes.id)
+                                FROM dishes WHERE dishes.submenu_id = submenus.id
+                            )
+                        ) ORDER BY submenus.id)
+                        FROM submenus WHERE submenus.menu_id = menus.id
+                    )
+                ) ORDER BY menus.id)::text
+            FROM
+                (SELECT * FROM menus WHERE id > :after ORDER BY id LIMIT :limit) AS menus;
+        Only fields and nested resources of the projection are selected, see `menu_object`,
+        rows are ordered by their time ordered ids.
+        No instances are loaded, the text of the document is the response body.
+        """
+
+        menus = paged_menus(select(*projected_columns(MenuModel, projection.menu)), page).subquery().c
+        result = await self.db.execute(
+            select(cast(json_array(menu_object(menus, projection), menus.id), Text))
         )
 
-        all_data = menus.all()
+        return result.scalar_one().encode()
+
+    async def get_menu_document(self, menu_id: str, projection: Projection) -> bytes | HTTPException:
+        """Returns specific menu as JSON document with fields and nested resources of the projection."""
+
+        result = await self.db.execute(
+            select(cast(menu_object(MenuModel, projection), Text))
+            .where(MenuModel.id == menu_id)
+        )
 
-        result = []
-        for i in all_data:
-            menu, submenus_count, dishes_count = i
-            result.append({
-                'title': menu.title,
-                'description': menu.description,
-                'id': menu.id,
-                'submenus_count': submenus_count,
-                'dishes_count': dishes_count,
-            })
+        document = result.scalar()
 
-        return result
+        if document is None:
+            return not_found_exception()
+
+        return document.encode()
+
+    async def get_menus(self, page: Page = Page()) -> list[MenuModel]:
+        """Query to get menus of the page with their counters, see `counted_menus` and `paged_menus`."""
+
+        menus = await self.db.execute(paged_menus(counted_menus(), page))
+
+        return menus.scalars().fetchall()
 
     async def create_menu(self, menu_schema: MenuCreate) -> MenuModel:
         """Create menu instance in database."""
 
         if menu_schema.id:
             new_menu = MenuModel(
-                id=menu_schema.id,
+                id=str(menu_schema.id),
                 title=menu_schema.title,
                 description=menu_schema.description
             )
@@ -105,21 +165,11 @@ class MenuCRUD(DatabaseCRUD):
         return new_menu
 
     async def get_menu(self, menu_id: str) -> MenuModel | HTTPException:
-        """Get specific menu from database."""
+        """Get specific menu with its counters from database, see `counted_menus`."""
 
-        target_menu_query = await (
-            self.db.execute(
-                select(
-                    MenuModel
-                )
-                .where(MenuModel.id == menu_id)
-                .options(
-                    selectinload(MenuModel.submenus)
-                    .options(
-                        selectinload(SubMenuModel.dishes)
-                    )
-                )
-            )
+        target_menu_query = await self.db.execute(
+            counted_menus()
+            .where(MenuModel.id == menu_id)
         )
 
         target_menu = target_menu_query.scalar()
@@ -127,29 +177,55 @@ class MenuCRUD(DatabaseCRUD):
         if not target_menu:
             return not_found_exception()
 
-        submenus_count_query = await (
-            self.db.execute(
-                select(
-                    func.count(SubMenuModel.id)
-                )
-                .where(SubMenuModel.menu_id == menu_id)
-            )
+        return target_menu
+
+    async def recount_counters(self) -> list[str]:
+        """
+        Recounts counters of every submenu and menu from their rows, repairing drift of the stored ones.
+        Returns ids of menus whose own counters or counters of their submenus were wrong.
+        """
+
+        dishes_count = (
+            select(SubMenuModel.id, func.count(DishModel.id).label('dishes_count'))
+            .join(DishModel, DishModel.submenu_id == SubMenuModel.id, isouter=True)
+            .group_by(SubMenuModel.id)
+            .subquery()
+        )
+        fixed_submenus = await self.db.execute(
+            update(SubMenuModel)
+            .where(SubMenuModel.id == dishes_count.c.id)
+            .where(SubMenuModel.dishes_count != dishes_count.c.dishes_count)
+            .values(dishes_count=dishes_count.c.dishes_count)
+            .returning(SubMenuModel.menu_id)
+            .execution_options(synchronize_session=False)
         )
+        menu_ids = set(fixed_submenus.scalars().all())
 
-        dishes_count_query = await (
-            self.db.execute(
-                select(
-                    func.count(DishModel.id)
-                )
-                .join(SubMenuModel)
-                .where(SubMenuModel.menu_id == menu_id)
+        counters = (
+            select(
+                MenuModel.id,
+                func.count(SubMenuModel.id).label('submenus_count'),
+                func.coalesce(func.sum(SubMenuModel.dishes_count), 0).label('dishes_count'),
             )
+            .join(SubMenuModel, SubMenuModel.menu_id == MenuModel.id, isouter=True)
+            .group_by(MenuModel.id)
+            .subquery()
         )
+        fixed_menus = await self.db.execute(
+            update(MenuModel)
+            .where(MenuModel.id == counters.c.id)
+            .where(or_(
+                MenuModel.submenus_count != counters.c.submenus_count,
+                MenuModel.dishes_count != counters.c.dishes_count,
+            ))
+            .values(submenus_count=counters.c.submenus_count, dishes_count=counters.c.dishes_count)
+            .returning(MenuModel.id)
+            .execution_options(synchronize_session=False)
+        )
+        menu_ids.update(fixed_menus.scalars().all())
 
-        target_menu.submenus_count = submenus_count_query.scalar()
-        target_menu.dishes_count = dishes_count_query.scalar()
-
-        return target_menu
+        await self.db.commit()
+        return sorted(menu_ids)
 
     async def update_menu(
         self,
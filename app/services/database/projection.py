@@ -0,0 +1,113 @@
+from itertools import chain
+from typing import Any
+
+from sqlalchemy import (
+    ColumnElement,
+    Numeric,
+    Text,
+    case,
+    cast,
+    func,
+    literal_column,
+    select,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from app.models.dish import Dish as DishModel
+from app.models.submenu import SubMenu as SubMenuModel
+from app.schemas.projection import Projection
+
+
+def json_array(element: ColumnElement, order_by: ColumnElement) -> ColumnElement:
+    """JSON array of the element of every aggregated row ordered by `order_by`, empty array when there are no rows."""
+
+    return func.coalesce(
+        func.json_agg(aggregate_order_by(element, order_by)),
+        literal_column("'[]'::json"),
+    )
+
+
+def json_object(source: Any, fields: tuple[str, ...], **nested: ColumnElement) -> ColumnElement:
+    """
+    JSON object of given fields, in their order, taken from columns of `source`, a model or columns of a subquery,
+    followed by `nested` resources, so only columns of the fields are read.
+    """
+
+    return func.json_build_object(
+        *chain.from_iterable((field, getattr(source, field)) for field in fields),
+        *chain.from_iterable(nested.items()),
+    )
+
+
+def projected_columns(model: Any, fields: tuple[str, ...]) -> list[ColumnElement]:
+    """Id and columns of given fields of the model, for subqueries selecting rows to project."""
+
+    return [model.id, *(getattr(model, field) for field in fields if field != 'id')]
+
+
+def discounted_price() -> ColumnElement:
+    """
+    Price of the dish with its discount applied, rounded half up to cents.
+    Numeric math of Postgres gives the same prices as `apply_discount` of the `Dish` schema.
+    """
+
+    return case(
+        (
+            DishModel.discount > 0,
+            func.round(DishModel.price * (1 - cast(DishModel.discount, Numeric) / 100), 2)
+        ),
+        else_=DishModel.price,
+    )
+
+
+def dish_object(projection: Projection) -> ColumnElement:
+    """JSON object of the dish with fields of the projection, values as the `Dish` schema renders them."""
+
+    columns = {
+        # text keeps prices as strings with two decimals, as the schema renders them
+        'price': cast(discounted_price(), Text),
+        'discount': func.coalesce(DishModel.discount, 0),
+    }
+    return func.json_build_object(*chain.from_iterable(
+        (field, columns[field] if field in columns else getattr(DishModel, field))
+        for field in projection.dish
+    ))
+
+
+def submenu_object(submenus: Any, projection: Projection, dishes: bool) -> ColumnElement:
+    """
+    JSON object of the submenu with fields of the projection,
+    `submenus` being the model or columns of a subquery selecting them.
+    With `dishes` its dishes are nested, ordered by id.
+    """
+
+    nested = {}
+    if dishes:
+        nested['dishes'] = (
+            select(json_array(dish_object(projection), DishModel.id))
+            .where(DishModel.submenu_id == submenus.id)
+            .scalar_subquery()
+        )
+    return json_object(submenus, projection.submenu, **nested)
+
+
+def menu_object(menus: Any, projection: Projection) -> ColumnElement:
+    """
+    JSON object of the menu with fields of the projection,
+    `menus` being the model or columns of a subquery selecting them.
+    Submenus, and their dishes, are nested, ordered by id, if the projection includes them.
+    """
+
+    nested = {}
+    if projection.includes('submenus'):
+        nested['submenus'] = (
+            select(
+                json_array(
+                    submenu_object(SubMenuModel, projection, projection.includes('submenus.dishes')),
+                    SubMenuModel.id,
+                )
+            )
+            .where(SubMenuModel.menu_id == menus.id)
+            .scalar_subquery()
+        )
+    return json_object(menus, projection.menu, **nested)
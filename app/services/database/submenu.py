@@ -1,12 +1,17 @@
 from fastapi import HTTPException
-from sqlalchemy import distinct, func, select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Select, Text, cast, select
 
-from app.models.dish import Dish as DishModel
 from app.models.menu import Menu as MenuModel
 from app.models.submenu import SubMenu as SubMenuModel
+from app.schemas.page import Page
+from app.schemas.projection import Projection
 from app.schemas.submenu import SubMenuCreate, SubMenuUpdate
 from app.services.database.menu import not_found_exception as no_menu
+from app.services.database.projection import (
+    json_array,
+    projected_columns,
+    submenu_object,
+)
 from app.services.main import DatabaseCRUD
 
 
@@ -16,6 +21,23 @@ def not_found_exception() -> HTTPException:
     raise HTTPException(status_code=404, detail='submenu not found')
 
 
+def counted_submenus(submenu_condition) -> Select:
+    """
+    Query of the menu id with its submenus matching `submenu_condition` and their dishes counters in one statement.
+    The menu is outer joined first, so a row without submenu tells the menu exists while the submenu does not,
+    no rows tell the menu does not exist.
+    Counters are columns of the submenu row kept by database triggers, so dish rows are not read.
+    Rows already in the session are refreshed, as triggers change counters behind the ORM.
+    """
+
+    return (
+        select(MenuModel.id, SubMenuModel)
+        .select_from(MenuModel)
+        .join(SubMenuModel, submenu_condition, isouter=True)
+        .execution_options(populate_existing=True)
+    )
+
+
 class SubMenuCRUD(DatabaseCRUD):
     """Service for querying specific submenu."""
 
@@ -35,50 +57,52 @@ class SubMenuCRUD(DatabaseCRUD):
             return no_menu()
         return None
 
-    async def fetch_menus_submenu(self, submenu_id: str) -> SubMenuModel | None:
-        """Fetching specific submenu by its id for furter operations."""
+    async def fetch_submenu_path(self, menu_id: str, submenu_id: str) -> SubMenuModel | HTTPException:
+        """
+        Checks the menu given in endpoint exists and fetches the submenu of it with its counters in one statement,
+        see `counted_submenus`, raising not found of the first of them that does not exist.
+        """
 
-        query = await self.db.execute(
-            select(
-                SubMenuModel
-            )
-            .where(SubMenuModel.id == submenu_id)
+        target_submenu_query = await self.db.execute(
+            counted_submenus((SubMenuModel.menu_id == MenuModel.id) & (SubMenuModel.id == submenu_id))
+            .where(MenuModel.id == menu_id)
         )
 
-        query = query.scalar()
+        target_submenu_row = target_submenu_query.first()
 
-        return query
+        if not target_submenu_row:
+            return no_menu()
+
+        _, target_submenu = target_submenu_row
+
+        if not target_submenu:
+            return await self.not_found_in_path(SubMenuModel, submenu_id, not_found_exception)
 
-    async def get_submenus(self, menu_id: str) -> list[dict]:
-        """Query to get list of all submenus."""
+        return target_submenu
 
-        await self.check_menu_id(menu_id=menu_id)
+    async def get_submenus(self, menu_id: str, page: Page = Page()) -> list[SubMenuModel]:
+        """
+        Query to get submenus of the page of the menu with their counters, see `counted_submenus`.
+        Submenus are ordered by their time ordered ids, ids following `after` are part of the join condition,
+        so a page past the last submenu still tells the menu exists.
+        """
 
+        submenu_condition = SubMenuModel.menu_id == MenuModel.id
+        if page.after is not None:
+            submenu_condition &= SubMenuModel.id > str(page.after)
         all_submenus = await self.db.execute(
-            select(
-                SubMenuModel,
-                func.count(distinct(DishModel.id)).label('dishes_count')
-            )
-            .join(DishModel, SubMenuModel.id == DishModel.submenu_id, isouter=True)
-            .group_by(SubMenuModel.id)
-            .where(SubMenuModel.menu_id == menu_id)
+            counted_submenus(submenu_condition)
+            .where(MenuModel.id == menu_id)
+            .order_by(SubMenuModel.id)
+            .limit(page.limit)
         )
 
         all_submenus = all_submenus.all()
 
         if not all_submenus:
-            return []
-
-        result = []
-        for i in all_submenus:
-            submenu, count = i
-            result.append({
-                'title': submenu.title,
-                'description': submenu.description,
-                'id': submenu.id,
-                'dishes_count': count
-            })
-        return result
+            return no_menu()
+
+        return [submenu for _, submenu in all_submenus if submenu is not None]
 
     async def create_submenu(
         self,
@@ -91,7 +115,7 @@ class SubMenuCRUD(DatabaseCRUD):
 
         if submenu_schema.id:
             new_submenu = SubMenuModel(
-                id=submenu_schema.id,
+                id=str(submenu_schema.id),
                 title=submenu_schema.title,
                 description=submenu_schema.description,
                 menu_id=menu_id
@@ -113,40 +137,67 @@ class SubMenuCRUD(DatabaseCRUD):
         menu_id: str,
         submenu_id: str
     ) -> SubMenuModel | HTTPException:
-        """Get specific submenu from database."""
-
-        await self.check_menu_id(menu_id=menu_id)
-
-        target_submenu_query = await (
-            self.db.execute(
-                select(
-                    SubMenuModel
-                )
-                .where(SubMenuModel.id == submenu_id)
-                .options(
-                    selectinload(SubMenuModel.dishes)
-                )
-            )
+        """Get specific submenu with its counters from database, see `fetch_submenu_path`."""
+
+        return await self.fetch_submenu_path(menu_id, submenu_id)
+
+    async def get_submenus_document(self, menu_id: str, page: Page, projection: Projection) -> bytes | HTTPException:
+        """
+        Returns submenus of the page of the menu as JSON document built by PostgreSQL in one statement,
+        with fields and nested resources of the projection, see `submenu_object`.
+        The document is selected for the menu row, so no row tells the menu does not exist.
+        """
+
+        query = (
+            select(*projected_columns(SubMenuModel, projection.submenu))
+            .where(SubMenuModel.menu_id == menu_id)
+        )
+        if page.after is not None:
+            query = query.where(SubMenuModel.id > str(page.after))
+        submenus = query.order_by(SubMenuModel.id).limit(page.limit).subquery().c
+        documents = select(
+            json_array(submenu_object(submenus, projection, projection.includes('dishes')), submenus.id)
         )
 
-        target_submenu = target_submenu_query.scalar()
+        result = await self.db.execute(
+            select(cast(documents.scalar_subquery(), Text))
+            .where(MenuModel.id == menu_id)
+        )
 
-        if not target_submenu:
-            return not_found_exception()
-
-        dishes_count_query = await (
-            self.db.execute(
-                select(
-                    func.count(DishModel.id)
-                )
-                .join(SubMenuModel)
-                .where(SubMenuModel.id == submenu_id)
-            )
+        document = result.scalar()
+
+        if document is None:
+            return no_menu()
+
+        return document.encode()
+
+    async def get_submenu_document(self, menu_id: str, submenu_id: str, projection: Projection) -> bytes | HTTPException:
+        """
+        Returns specific submenu as JSON document with fields and nested resources of the projection.
+        Selected for the menu row as `counted_submenus` does, telling which of them does not exist.
+        """
+
+        document = (
+            select(submenu_object(SubMenuModel, projection, projection.includes('dishes')))
+            .where(SubMenuModel.id == submenu_id, SubMenuModel.menu_id == MenuModel.id)
         )
 
-        target_submenu.dishes_count = dishes_count_query.scalar()
+        result = await self.db.execute(
+            select(MenuModel.id, cast(document.scalar_subquery(), Text))
+            .where(MenuModel.id == menu_id)
+        )
 
-        return target_submenu
+        target_submenu_row = result.first()
+
+        if not target_submenu_row:
+            return no_menu()
+
+        _, target_submenu = target_submenu_row
+
+        if target_submenu is None:
+            return await self.not_found_in_path(SubMenuModel, submenu_id, not_found_exception)
+
+        return target_submenu.encode()
 
     async def update_submenu(
         self,
@@ -156,12 +207,7 @@ class SubMenuCRUD(DatabaseCRUD):
     ) -> SubMenuModel | HTTPException:
         """Update specific submenu in database."""
 
-        await self.check_menu_id(menu_id)
-
-        target_submenu_for_update = await self.fetch_menus_submenu(submenu_id=submenu_id)
-
-        if not target_submenu_for_update:
-            return not_found_exception()
+        target_submenu_for_update = await self.fetch_submenu_path(menu_id, submenu_id)
 
         for key, value in submenu_schema.model_dump(exclude_unset=True).items():
             setattr(target_submenu_for_update, key, value)
@@ -177,12 +223,7 @@ class SubMenuCRUD(DatabaseCRUD):
     ) -> None | HTTPException:
         """Delete specific menu in database."""
 
-        await self.check_menu_id(menu_id)
-
-        target_submenu_for_delete = await self.fetch_menus_submenu(submenu_id=submenu_id)
-
-        if not target_submenu_for_delete:
-            return not_found_exception()
+        target_submenu_for_delete = await self.fetch_submenu_path(menu_id, submenu_id)
 
         await self.db.delete(target_submenu_for_delete)
         await self.db.commit()
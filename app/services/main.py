@@ -1,21 +1,468 @@
-from fastapi import BackgroundTasks
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any
+from uuid import uuid4
+
+from fastapi import BackgroundTasks, HTTPException, Response
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.commands.core import AsyncScript
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.config.base import (
+    CACHE_INVALIDATION_CHANNEL,
+    DB_READ_AFTER_WRITE_WINDOW,
+    LEASE_KEY,
+    MENUS_PREVIEW_KEY,
+    NOT_FOUND_KEY,
+    PAGE_KEY,
+    SINGLE_FLIGHT_LEASE_MS,
+    SINGLE_FLIGHT_POLL_INTERVAL,
+    STALE_KEY,
+    VERSION_KEY,
+    VERSION_SEQUENCE_KEY,
+    VERSION_TTL,
+)
+from app.config.database import reading_replica, session_local
+from app.services.cache.entry import ENTRY_FIELD, VERSION_FIELD, CacheEntry, etag
+from app.services.cache.local import local_cache
+from app.services.cache.policy import (
+    NOT_FOUND_POLICY,
+    TAG_TTL,
+    CachePolicy,
+    write_frequency,
+)
+from app.services.cache.stats import cache_stats
+
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+SET_VERSIONED_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+local stored = current == tonumber(ARGV[2])
+for i = 3, #KEYS do
+    stored = stored and tonumber(redis.call('GET', KEYS[i]) or '0') <= tonumber(ARGV[6])
+end
+if stored then
+    if tonumber(ARGV[3]) > 0 then
+        redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    else
+        redis.call('SET', KEYS[1], ARGV[1])
+    end
+elseif ARGV[4] ~= '0' then
+    redis.call('DEL', KEYS[1])
+end
+if ARGV[4] ~= '0' then
+    redis.call('SET', KEYS[2], ARGV[4], 'EX', ARGV[5])
+end
+return stored and 1 or 0
+"""
+
+INIT_VERSIONS_SCRIPT = """
+local versions = {}
+for i = 2, #KEYS do
+    local version = redis.call('GET', KEYS[i])
+    if not version then
+        version = redis.call('INCR', KEYS[1])
+        redis.call('SET', KEYS[i], version, 'EX', ARGV[1])
+    end
+    versions[i - 1] = tonumber(version)
+end
+return versions
+"""
+
+BUMP_VERSIONS_SCRIPT = """
+for i = 2, #KEYS do
+    redis.call('SET', KEYS[i], redis.call('INCR', KEYS[1]), 'EX', ARGV[1])
+end
+return #KEYS - 1
+"""
+
+GET_ENTRY_SCRIPT = """
+if redis.call('TYPE', KEYS[1]).ok == 'hash' then
+    return redis.call('HGETALL', KEYS[1])
+end
+return redis.call('GET', KEYS[1])
+"""
+
+SET_COLLECTION_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[2]) or '0') ~= tonumber(ARGV[1]) then
+    return 0
+end
+for i = 3, #KEYS do
+    if tonumber(redis.call('GET', KEYS[i]) or '0') > tonumber(ARGV[3]) then
+        return 0
+    end
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], ARGV[4], ARGV[5], ARGV[6], ARGV[1], unpack(ARGV, 7))
+if tonumber(ARGV[2]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+SET_ITEM_SCRIPT = """
+local exists = redis.call('EXISTS', KEYS[1]) == 1
+if exists and ARGV[3] ~= '0' and tonumber(redis.call('GET', KEYS[4]) or '0') ~= tonumber(ARGV[3]) then
+    redis.call('DEL', KEYS[1])
+    exists = false
+end
+if exists then
+    if ARGV[2] == '' then
+        redis.call('HDEL', KEYS[1], ARGV[1])
+    else
+        redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    end
+end
+local version = redis.call('INCR', KEYS[3])
+redis.call('SET', KEYS[2], version, 'EX', ARGV[4])
+if exists then
+    redis.call('HSET', KEYS[1], ARGV[5], version)
+end
+return exists and 1 or 0
+"""
+
+in_flight: dict[str, asyncio.Future] = {}
+registered_scripts: dict[str, AsyncScript] = {}
+
+
+def script(cache: Redis, source: str) -> AsyncScript:
+    """
+    Lua script registered once per worker, called with `EVALSHA` sending its SHA instead of the whole script.
+    Redis missing the script, e.g. after a restart, gets it loaded by redis-py,
+    pipelines check their scripts before they are executed, so a transaction never runs partially.
+    Pass the client or pipeline of the call, the registering client may be gone.
+    """
+
+    if (registered := registered_scripts.get(source)) is None:
+        registered = registered_scripts[source] = cache.register_script(source)
+    return registered
+
+
+def tag_versions(tags: tuple[str, ...], since: int) -> list[str]:
+    """Version keys of the tags checked by writes against `since`, none without it."""
+
+    return [VERSION_KEY.format(key=tag) for tag in tags] if since else []
+
+
+def cached_response(entry: CacheEntry) -> Response:
+    """
+    Response with an already rendered JSON body, e.g. taken from cache, and ETag of its version.
+    Returned as is, so FastAPI skips `response_model` validation and JSON encoding.
+    """
+
+    return Response(content=entry.body, media_type='application/json', headers={'ETag': entry.etag})
+
+
+def built_soft_ttl(policy: CachePolicy) -> float | None:
+    """
+    Soft TTL of an entry built by the current request, at most `DB_READ_AFTER_WRITE_WINDOW` if it read from a replica,
+    so an entry built from rows the replica has not caught up with yet is refreshed after the lag tolerated.
+    """
+
+    if reading_replica.get():
+        return min(policy.soft_ttl or DB_READ_AFTER_WRITE_WINDOW, DB_READ_AFTER_WRITE_WINDOW)
+    return policy.soft_ttl
+
 
 class ServiceSessionContext:
-    """Context for database session and redis."""
+    """
+    Context for database session and redis.\n
+    With `sync_cache` set cache changes of writes are applied before the response is sent,
+    so the client reading right after its write gets the new data.
+    `if_none_match` is the header of conditional GET requests.
+    """
 
-    def __init__(self, db: Session, cache: Redis, tasks: BackgroundTasks) -> None:
+    def __init__(
+        self,
+        db: Session,
+        cache: Redis,
+        tasks: BackgroundTasks,
+        sync_cache: bool = False,
+        if_none_match: str | None = None,
+    ) -> None:
         """Initialization for session of connection to database and redis."""
 
         self.db = db
         self.cache = cache
         self.tasks = tasks
+        self.sync_cache = sync_cache
+        self.if_none_match = if_none_match
 
 
 class AppService(ServiceSessionContext):
-    pass
+    """
+    Base for services.\n
+    Concurrent cache misses of the same key are coalesced with `single_flight`,
+    so only one request per key queries the database and fills the cache.
+    Entries picked for refresh by `CacheEntry.should_refresh` are served while rebuilt in background.\n
+    Responses carry ETag of the version the body was built at,
+    conditional requests for the current version get `304 Not Modified` without reading the body.
+    """
+
+    async def cached(
+        self,
+        key: str,
+        read: Callable[[], Awaitable[CacheEntry | None]],
+        build: Callable[[Session], Awaitable[bytes]],
+        write: Callable[[bytes, int, float, int], Awaitable[None]],
+        path: dict[str, str] | None = None,
+    ) -> Response:
+        """
+        Returns response with the cache entry given by `read`, on miss builds it with `build` and stores with `write`.
+        Stale entries, or the ones picked for early refresh, are returned as they are
+        and a single background refresh rebuilds them.
+        `build` gets the session to read from, the one of the request or of the refresh, see `refresh`.\n
+        `path` maps not found details to keys of the rows looked up by `build`, see `not_found_cached`.
+        """
+
+        if self.if_none_match is not None:
+            version = await CacheCRUD(self.cache).get_version(key)
+            if version and self.etag_matches(etag(version)):
+                return self.not_modified(etag(version))
+
+        if (entry := await read()) is None:
+            request_build = partial(build, self.db)
+            if path:
+                request_build = await self.not_found_cached(request_build, path)
+            entry = await self.single_flight(key, request_build, write)
+        elif entry.should_refresh() and key not in in_flight:
+            self.tasks.add_task(self.refresh, key, build, write, entry)
+
+        if self.etag_matches(entry.etag, wildcard=True):
+            return self.not_modified(entry.etag)
+        return cached_response(entry)
+
+    async def cached_page(
+        self,
+        key: str,
+        page: str,
+        build: Callable[[Session], Awaitable[bytes]],
+        policy: CachePolicy,
+        tags: tuple[str, ...] = (),
+        nested: bool = False,
+        path: dict[str, str] | None = None,
+    ) -> Response:
+        """
+        Returns response with the page, or projection, of the entry cached under `key`,
+        `page` being its parameters, see `cached` and `CacheCRUD.page_key`.
+        Pages are registered in the tag sets of the entry and expire as set by `policy`.
+        With `nested` the page includes child rows, which change without the entry,
+        so it is scoped to the version of the preview, changed by every write, instead.
+        """
+
+        cache = CacheCRUD(self.cache)
+        page_key = await cache.page_key(key, page, MENUS_PREVIEW_KEY if nested else None)
+        return await self.cached(
+            page_key,
+            read=partial(cache.get_key, page_key),
+            build=build,
+            write=partial(cache.set_page, page_key, policy, tags),
+            path=path,
+        )
+
+    async def refresh(
+        self,
+        key: str,
+        build: Callable[[Session], Awaitable[bytes]],
+        write: Callable[[bytes, int, float, int], Awaitable[None]],
+        entry: CacheEntry,
+    ) -> None:
+        """
+        Background refresh of the entry, see `single_flight`.
+        Background tasks run after the session of the request is closed,
+        so the refresh reads with its own session, of the database the request read from, closed when it is done.
+        """
+
+        async with session_local(reading_replica.get())() as db:
+            await self.single_flight(key, partial(build, db), write, entry)
+
+    def etag_matches(self, current: str, wildcard: bool = False) -> bool:
+        """
+        Whether `If-None-Match` header of the request lists given ETag.
+        `*` matches only with `wildcard` set, by callers holding an entry of the resource,
+        a version alone does not tell the row exists.
+        """
+
+        if self.if_none_match is None:
+            return False
+        return any(
+            tag.strip().removeprefix('W/') in ((current, '*') if wildcard else (current,))
+            for tag in self.if_none_match.split(',')
+        )
+
+    @staticmethod
+    def not_modified(current: str) -> Response:
+        """Response to a conditional request for the body client already has."""
+
+        return Response(status_code=304, headers={'ETag': current})
+
+    async def not_found_cached(
+        self,
+        build: Callable[[], Awaitable[bytes]],
+        path: dict[str, str],
+    ) -> Callable[[], Awaitable[bytes]]:
+        """
+        Raises 404 if any row of `path` is cached as not existing,
+        otherwise returns `build` that caches the row it did not find as set by `NOT_FOUND_POLICY`.
+        `path` maps not found details to keys of the rows, from parent to child as they are looked up.
+        """
+
+        missing = await CacheCRUD(self.cache).get_not_found(*path.values())
+        for detail, _ in missing:
+            if detail is not None:
+                raise HTTPException(status_code=404, detail=detail)
+        versions = {detail: version for detail, (_, version) in zip(path, missing)}
+
+        async def build_or_not_found() -> bytes:
+            try:
+                return await build()
+            except HTTPException as error:
+                # a replica may not have the row yet, only the primary tells it does not exist,
+                # a row of another parent exists and is found under its own path
+                cacheable = not reading_replica.get() and not isinstance(error, NotInPath)
+                if error.status_code == 404 and error.detail in path and cacheable:
+                    await CacheCRUD(self.cache).set_not_found(
+                        path[error.detail],
+                        error.detail,
+                        versions[error.detail]
+                    )
+                raise
+
+        return build_or_not_found
+
+    async def single_flight(
+        self,
+        key: str,
+        build: Callable[[], Awaitable[bytes]],
+        write: Callable[[bytes, int, float, int], Awaitable[None]],
+        refresh_of: CacheEntry | None = None,
+    ) -> CacheEntry | None:
+        """
+        Returns entry built by `build` for the cache key and stores it with `write`.\n
+        Within the worker only the first caller runs `build`, the rest await its result or exception.
+        Across workers the caller holding a short Redis lease runs `build`, the rest poll cache for its result.
+        While the key is rebuilt its previous entry, kept by invalidation, is returned instead of waiting.\n
+        With `refresh_of` it is a background refresh of that entry, skipped when somebody else rebuilds the key.
+        """
+
+        while (future := in_flight.get(key)) is not None:
+            if refresh_of is not None:
+                return None
+            if (stale := await self.get_stale(key)) is not None:
+                return stale
+            try:
+                if (entry := await asyncio.shield(future)) is not None:
+                    return entry
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # the request that was building the key was cancelled, take over the build
+
+        future = asyncio.get_running_loop().create_future()
+        in_flight[key] = future
+        try:
+            entry = await self.leased_build(key, build, write, refresh_of)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # mark exception retrieved, nobody else may be waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(entry)
+            return entry
+        finally:
+            del in_flight[key]
+
+    async def leased_build(
+        self,
+        key: str,
+        build: Callable[[], Awaitable[bytes]],
+        write: Callable[[bytes, int, float, int], Awaitable[None]],
+        refresh_of: CacheEntry | None = None,
+    ) -> CacheEntry | None:
+        """Runs `build` under Redis lease of the key or waits for the worker that holds the lease."""
+
+        lease_key = LEASE_KEY.format(key=key)
+        token = uuid4().hex
+        deadline = asyncio.get_running_loop().time() + SINGLE_FLIGHT_LEASE_MS / 1000
+
+        if not await self.cache.set(lease_key, token, nx=True, px=SINGLE_FLIGHT_LEASE_MS):
+            if refresh_of is not None:
+                return None
+            if (stale := await self.get_stale(key)) is not None:
+                return stale
+
+            while not await self.cache.set(lease_key, token, nx=True, px=SINGLE_FLIGHT_LEASE_MS):
+                await asyncio.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+                if (entry := await CacheCRUD(self.cache).get_key(key, count=False)) is not None:
+                    return entry
+                if asyncio.get_running_loop().time() > deadline:
+                    # lease holder is too slow or gone, build without the lease
+                    return await self.timed_build(key, build, write)
+
+        try:
+            entry = await CacheCRUD(self.cache).get_key(key, count=False)
+            if entry is not None and (refresh_of is None or entry.built_at > refresh_of.built_at):
+                # built by another worker while the lease was taken
+                return entry
+            return await self.timed_build(key, build, write)
+        finally:
+            await script(self.cache, RELEASE_LEASE_SCRIPT)([lease_key], [token], client=self.cache)
+
+    async def get_stale(self, key: str) -> CacheEntry | None:
+        """Previous entry of an invalidated key, kept for callers that would otherwise wait for its rebuild."""
+
+        return await CacheCRUD(self.cache).get_key(STALE_KEY.format(key=key), count=False)
+
+    async def write_cache(self, cache: 'CacheCRUD', *writes: Callable[[], Awaitable[None]]) -> None:
+        """
+        Applies cache changes of a write in one Redis transaction,
+        before the response with `sync_cache` set, in background otherwise.
+        """
+
+        if self.sync_cache:
+            await cache.run_batch(*writes)
+        else:
+            self.tasks.add_task(cache.run_batch, *writes)
+
+    async def timed_build(
+        self,
+        key: str,
+        build: Callable[[], Awaitable[bytes]],
+        write: Callable[[bytes, int, float, int], Awaitable[None]],
+    ) -> CacheEntry:
+        """
+        Builds the body and stores it together with the time the build took.
+        Version of the key is read before the build, so the body is not stored if the key changed meanwhile,
+        or if any of its tags was invalidated meanwhile, see `CacheCRUD.start_build`.
+        """
+
+        version, since = await CacheCRUD(self.cache).start_build(key)
+        started = time.monotonic()
+        body = await build()
+        delta = time.monotonic() - started
+        await write(body, version, delta, since)
+        return CacheEntry.new(body, delta, version=version, replica=reading_replica.get())
+
+
+class NotInPath(HTTPException):
+    """Not found of a row that exists under another parent than the one given in endpoint."""
+
+    def __init__(self, detail: str) -> None:
+        super().__init__(status_code=404, detail=detail)
 
 
 class DBSessionContext:
@@ -28,7 +475,25 @@ class DBSessionContext:
 
 
 class DatabaseCRUD(DBSessionContext):
-    pass
+    """
+    Base for database services.\n
+    Relationships are loaded only by queries that ask for them with loader options,
+    otherwise they are left empty, or raise on access with `DB_RELATIONSHIP_LOADING` set to `raise` as in tests.
+    """
+
+    async def not_found_in_path(self, model: Any, row_id: str, not_found: Callable[[], HTTPException]) -> HTTPException:
+        """
+        Raises not found of a row missing under the parent given in endpoint, by `not_found`.
+        A row existing under another parent raises `NotInPath` with the same detail instead,
+        so it is not cached as missing, see `AppService.not_found_cached`.
+        """
+
+        try:
+            return not_found()
+        except HTTPException as error:
+            if await self.db.scalar(select(model.id).where(model.id == row_id)) is None:
+                raise
+            raise NotInPath(error.detail) from None
 
 
 class CacheSessionContext:
@@ -41,4 +506,313 @@ class CacheSessionContext:
 
 
 class CacheCRUD(CacheSessionContext):
-    pass
+    """
+    Base for caching services with tag based invalidation.\n
+    Every cached entry is registered in Redis sets (tags) of the rows it depends on,
+    so a write can drop exactly the entries related to the changed row.\n
+    With `CACHE_LOCAL_ENABLED` reads go through in-process cache first,
+    every change of a key is published so other workers evict it as well.\n
+    Writes made inside `batch` are queued into one transaction and sent in a single round trip.\n
+    Every key has a version changed by each change of it, entries are stored only if the version
+    they were built at is still current, so a slow build can not bring back invalidated data.
+    Versions are taken from one sequence, so a version is never reused, even after its key expired.
+    Tag sets have versions of their own, changed by invalidation of the tag, so an entry is not stored
+    if any of its tags was invalidated after its build started, even if the entry was not in the tag set yet.\n
+    Lua scripts are registered once per worker and called by their SHA, see `script`.
+    """
+
+    pipe: Pipeline | None = None
+
+    async def get_key(self, key: str, count: bool = True) -> CacheEntry | None:
+        """
+        Returns cached entry looking into in-process cache first and Redis after it.
+        Collection entries, stored as hashes, are read in the same round trip as the rest.
+        Lookups with `count` unset, e.g. repeated checks while waiting for a rebuild, are not counted in stats.
+        """
+
+        if local_cache is not None:
+            if (entry := local_cache.get(key)) is not None:
+                return entry
+            version = local_cache.version
+
+        value = await script(self.cache, GET_ENTRY_SCRIPT)([key], client=self.cache)
+        if count:
+            cache_stats['redis'].count(bool(value))
+        if not value:
+            return None
+
+        entry = CacheEntry.from_fields(value) if isinstance(value, list) else CacheEntry.unpack(value)
+        if local_cache is not None:
+            local_cache.set(key, entry, version)
+        return entry
+
+    async def get_version(self, key: str) -> int:
+        """Current version of the key, `0` if it has none."""
+
+        return int(await self.cache.get(VERSION_KEY.format(key=key)) or 0)
+
+    async def init_versions(self, *keys: str) -> list[int]:
+        """Current versions of given keys, keys without one get a new version. Read before querying the data."""
+
+        return await script(self.cache, INIT_VERSIONS_SCRIPT)(
+            [VERSION_SEQUENCE_KEY, *(VERSION_KEY.format(key=key) for key in keys)], [VERSION_TTL], client=self.cache
+        )
+
+    async def start_build(self, key: str) -> tuple[int, int]:
+        """
+        Current version of the key and the last version taken from the sequence, in one round trip.
+        Read before querying the data, the latter is passed as `since` to writes of the built entry.
+        """
+
+        async with self.cache.pipeline(transaction=False) as pipe:
+            await script(self.cache, INIT_VERSIONS_SCRIPT)(
+                [VERSION_SEQUENCE_KEY, VERSION_KEY.format(key=key)], [VERSION_TTL], client=pipe
+            )
+            pipe.get(VERSION_SEQUENCE_KEY)
+            (version,), since = await pipe.execute()
+        return version, int(since)
+
+    async def reserve_version(self, key: str) -> tuple[int, int]:
+        """
+        Current version of the key and a new one for the change of its row, in one round trip.
+        Tags invalidated after the new version was taken reject the write of the changed row, see `set_key`.
+        """
+
+        async with self.cache.pipeline(transaction=False) as pipe:
+            await script(self.cache, INIT_VERSIONS_SCRIPT)(
+                [VERSION_SEQUENCE_KEY, VERSION_KEY.format(key=key)], [VERSION_TTL], client=pipe
+            )
+            pipe.incr(VERSION_SEQUENCE_KEY)
+            (version,), new_version = await pipe.execute()
+        return version, new_version
+
+    async def set_key(
+        self,
+        key: str,
+        body: bytes,
+        *tags: str,
+        policy: CachePolicy,
+        version: int,
+        delta: float = 0.0,
+        since: int = 0,
+        new_version: int = 0,
+    ) -> None:
+        """
+        Sets the rendered body in cache if the key is still at `version`, expiring as set by `policy`,
+        and registers it in given tag sets.
+        With `since`, see `start_build`, or `new_version` the body is not stored if any of the tags
+        was invalidated after it, e.g. the parent was deleted while the entry was built.
+        Tags are ordered from parent to child, every child tag is registered in its parents
+        so invalidation of a parent also removes the sets of its children.
+        Tag sets expire after `TAG_TTL`, longer than any entry registered in them.\n
+        With `new_version`, see `reserve_version`, the entry comes from a change of the row and moves the key
+        to the new version, so builds started before the change are rejected. If the key changed concurrently
+        it is deleted instead, as either of the changes may be the latest one.
+        The row exists then, so its not found entry is deleted as well.
+        """
+
+        entry = CacheEntry.new(body, delta, built_soft_ttl(policy), new_version or version, reading_replica.get())
+        if new_version:
+            write_frequency.observe(key)
+        since = since or new_version
+        async with self.write_pipeline() as pipe:
+            await script(self.cache, SET_VERSIONED_SCRIPT)(
+                [key, VERSION_KEY.format(key=key), *tag_versions(tags, since)],
+                [entry.pack(), version, policy.ttl_for(key), new_version, VERSION_TTL, since],
+                client=pipe
+            )
+            if new_version:
+                pipe.delete(NOT_FOUND_KEY.format(key=key))
+            for position, tag in enumerate(tags):
+                pipe.sadd(tag, key, *tags[position + 1:])
+                if TAG_TTL:
+                    pipe.expire(tag, TAG_TTL)
+            self.publish_eviction(pipe, key)
+
+    async def page_key(self, key: str, page: str, scope: str | None = None) -> str:
+        """
+        Key of a page of the list cached under `key`, scoped to the current version of the list, or of `scope`.
+        Every change of the list moves it to a new version, so pages of the previous one are not read anymore
+        and expire as set by their policy, instead of being looked up and deleted one by one.
+        """
+
+        version, = await self.init_versions(scope or key)
+        return PAGE_KEY.format(key=key, version=version, page=page)
+
+    async def set_page(
+        self,
+        key: str,
+        policy: CachePolicy,
+        tags: tuple[str, ...],
+        body: bytes,
+        version: int,
+        delta: float = 0.0,
+        since: int = 0,
+    ) -> None:
+        """Sets rendered page of a list under its key from `page_key`, see `set_key`."""
+
+        await self.set_key(key, body, *tags, policy=policy, version=version, delta=delta, since=since)
+
+    async def set_collection(
+        self,
+        key: str,
+        items: dict[str, bytes],
+        *tags: str,
+        policy: CachePolicy,
+        version: int,
+        delta: float = 0.0,
+        since: int = 0,
+    ) -> None:
+        """
+        Sets rendered bodies of a list of rows as a hash with one field per row, if the key is still at `version`,
+        so a change of one row is applied with `set_item` or `delete_item` instead of rebuilding the list.
+        Checks tags, expires and registers in tag sets as `set_key` does.
+        """
+
+        entry = CacheEntry.new(b'', delta, built_soft_ttl(policy), version, reading_replica.get())
+        async with self.write_pipeline() as pipe:
+            await script(self.cache, SET_COLLECTION_SCRIPT)(
+                [key, VERSION_KEY.format(key=key), *tag_versions(tags, since)],
+                [
+                    version, policy.ttl_for(key), since, ENTRY_FIELD, entry.pack(), VERSION_FIELD,
+                    *(value for item in items.items() for value in item)
+                ],
+                client=pipe
+            )
+            for position, tag in enumerate(tags):
+                pipe.sadd(tag, key, *tags[position + 1:])
+                if TAG_TTL:
+                    pipe.expire(tag, TAG_TTL)
+            self.publish_eviction(pipe, key)
+
+    async def set_item(self, key: str, item_id: str, body: bytes, row_key: str, row_version: int) -> None:
+        """
+        Sets rendered body of a created or changed row in the collection, if the collection is cached,
+        and moves the collection to a new version.
+        `row_version` is the version of the row's own key before the change, see `reserve_version`.
+        If the row changed concurrently the collection is deleted, as either of the changes may be the latest one,
+        so queue it before the write of the row's own key.
+        """
+
+        async with self.write_pipeline() as pipe:
+            await script(self.cache, SET_ITEM_SCRIPT)(
+                [key, VERSION_KEY.format(key=key), VERSION_SEQUENCE_KEY, VERSION_KEY.format(key=row_key)],
+                [item_id, body, row_version, VERSION_TTL, VERSION_FIELD],
+                client=pipe
+            )
+            self.publish_eviction(pipe, key)
+
+    async def delete_item(self, key: str, item_id: str) -> None:
+        """Deletes a deleted row from the collection, if the collection is cached, and moves it to a new version."""
+
+        async with self.write_pipeline() as pipe:
+            await script(self.cache, SET_ITEM_SCRIPT)(
+                [key, VERSION_KEY.format(key=key), VERSION_SEQUENCE_KEY, VERSION_KEY.format(key=key)],
+                [item_id, '', 0, VERSION_TTL, VERSION_FIELD],
+                client=pipe
+            )
+            self.publish_eviction(pipe, key)
+
+    async def get_not_found(self, *keys: str) -> list[tuple[str | None, int]]:
+        """Not found details cached for rows of given keys together with versions of the keys, in one round trip."""
+
+        async with self.cache.pipeline(transaction=False) as pipe:
+            pipe.mget(*(NOT_FOUND_KEY.format(key=key) for key in keys))
+            await script(self.cache, INIT_VERSIONS_SCRIPT)(
+                [VERSION_SEQUENCE_KEY, *(VERSION_KEY.format(key=key) for key in keys)], [VERSION_TTL], client=pipe
+            )
+            details, versions = await pipe.execute()
+        return [
+            (detail.decode() if detail is not None else None, version)
+            for detail, version in zip(details, versions)
+        ]
+
+    async def set_not_found(self, key: str, detail: str, version: int) -> None:
+        """Caches that the row of the key does not exist, unless the key changed since `version`."""
+
+        await script(self.cache, SET_VERSIONED_SCRIPT)(
+            [NOT_FOUND_KEY.format(key=key), VERSION_KEY.format(key=key)],
+            [detail, version, NOT_FOUND_POLICY.ttl_for(key), 0, VERSION_TTL],
+            client=self.cache
+        )
+
+    async def invalidate(
+        self,
+        *keys: str,
+        tags: tuple[str, ...] = (),
+        keep_stale: tuple[str, ...] = (),
+    ) -> None:
+        """
+        Deletes given keys, every key registered in given tag sets and the tag sets themselves.
+        Entries of `keep_stale` keys are deleted as well, but their copies are kept under `stale:{key}`
+        for requests that come while they are rebuilt.
+        All deleted keys and tags get new versions, so entries of the tags built meanwhile are not stored.
+        """
+
+        tagged_keys: set[str] = set()
+        if tags:
+            async with self.cache.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.smembers(tag)
+                for members in await pipe.execute():
+                    tagged_keys.update(member.decode() for member in members)
+
+        stale_keys = [STALE_KEY.format(key=key) for key in keep_stale]
+
+        changed_keys = (*keys, *keep_stale, *tagged_keys)
+        write_frequency.observe(*changed_keys)
+
+        async with self.write_pipeline() as pipe:
+            if stale_keys:
+                # a copy left by an earlier invalidation is older than anything rebuilt since
+                pipe.delete(*stale_keys)
+            for key, stale_key in zip(keep_stale, stale_keys):
+                pipe.copy(key, stale_key)
+            pipe.delete(*changed_keys, *tags)
+            await script(self.cache, BUMP_VERSIONS_SCRIPT)(
+                [VERSION_SEQUENCE_KEY, *(VERSION_KEY.format(key=key) for key in (*changed_keys, *tags))],
+                [VERSION_TTL],
+                client=pipe
+            )
+            self.publish_eviction(pipe, *changed_keys, *stale_keys)
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator[None]:
+        """Queues writes made inside the block into one transaction executed when it ends."""
+
+        async with self.cache.pipeline(transaction=True) as pipe:
+            self.pipe = pipe
+            try:
+                yield
+            finally:
+                self.pipe = None
+            await pipe.execute()
+
+    async def run_batch(self, *writes: Callable[[], Awaitable[None]]) -> None:
+        """Runs given writes of this cache service in one batch."""
+
+        async with self.batch():
+            for write in writes:
+                await write()
+
+    @asynccontextmanager
+    async def write_pipeline(self) -> AsyncIterator[Pipeline]:
+        """Pipeline of the current batch, or a new transaction executed right after the block."""
+
+        if self.pipe is not None:
+            yield self.pipe
+            return
+
+        async with self.cache.pipeline(transaction=True) as pipe:
+            yield pipe
+            await pipe.execute()
+
+    @staticmethod
+    def publish_eviction(pipe: Pipeline, *keys: str) -> None:
+        """Evicts keys from in-process cache of current worker and queues eviction message for the rest."""
+
+        if local_cache is None:
+            return
+
+        local_cache.delete(*keys)
+        pipe.publish(CACHE_INVALIDATION_CHANNEL, '\n'.join(keys))
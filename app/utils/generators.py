@@ -1,7 +1,46 @@
+import base64
+import binascii
+import os
+import time
 import uuid
 
 
 def generate_uuid() -> str:
-    """Generates new uuid for new models instances."""
+    """
+    Generates new uuid for new models instances.
+    Laid out as version 7: milliseconds of unix time followed by random bits,
+    so ids of new rows are ordered by creation and inserted at the end of indexes.
+    """
 
-    return str(uuid.uuid4())
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return str(uuid.UUID(int=value))
+
+
+def compact_id(value: str) -> str:
+    """Encodes uuid as 22 characters of url safe base64 instead of 36 hex ones, other values are kept as they are."""
+
+    try:
+        raw = uuid.UUID(value).bytes
+    except ValueError:
+        return value
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def expand_id(value: str) -> str:
+    """Uuid encoded by `compact_id` in its usual form, ordered as uuids are by the database, other values are kept."""
+
+    if len(value) != 22:
+        return value
+    try:
+        return str(uuid.UUID(bytes=base64.urlsafe_b64decode(value + '==')))
+    except (ValueError, binascii.Error):
+        return value
+
+
+class CacheKey(str):
+    """Template of cache keys that formats ids in compact form, see `compact_id`."""
+
+    def format(self, *args, **ids: str) -> str:
+        return super().format(*args, **{name: compact_id(str(value)) for name, value in ids.items()})
@@ -0,0 +1,4 @@
+import os
+
+# relationships loaded without being requested by the query fail tests, set before any model is imported
+os.environ['DB_RELATIONSHIP_LOADING'] = 'raise'
@@ -7,6 +7,8 @@ from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import sessionmaker
 
+from app.config import cache as cache_config
+from app.config.cache import create_redis
 from app.config.database import Base, async_engine, get_async_db
 from app.main import app
 from app.models.dish import Dish
@@ -20,6 +22,17 @@ def event_loop(request) -> Generator:  # noqa: indirect usage
     yield loop
     loop.close()
 
+
+async def flush_cache() -> None:
+    """
+    Fixtures fill database bypassing the API, so cached responses of previous tests must be dropped.
+    Module scoped fixtures run in their own event loop, so pooled connections of other loops are dropped as well.
+    """
+
+    cache_config.redis_pool = None
+    async for cache in create_redis():
+        await cache.flushdb()
+
 # unit tests
 
 
@@ -32,6 +45,7 @@ async def async_session() -> AsyncSession:
     async with session() as s:
         async with async_engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+        await flush_cache()
 
         yield s
 
@@ -71,6 +85,7 @@ async def scenario_session() -> AsyncSession:
     async with session() as s:
         async with async_engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+        await flush_cache()
 
         yield s
 
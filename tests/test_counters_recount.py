@@ -0,0 +1,63 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.dish import Dish
+from app.models.menu import Menu
+from app.models.submenu import SubMenu
+from app.routers.admin import recount_counters
+from app.routers.menu import get_menu
+from app.utils.pathfinder import reverse
+
+
+async def make_menu(async_session: AsyncSession) -> Menu:
+    menu = Menu(title='Menu', description='Menu')
+    menu.submenus = [
+        SubMenu(
+            title='SubMenu',
+            description='SubMenu',
+            dishes=[Dish(title='Dish', description='Dish', price='1.00') for _ in range(3)]
+        )
+        for _ in range(2)
+    ]
+    async_session.add(menu)
+    await async_session.commit()
+    return menu
+
+
+@pytest.mark.asyncio
+async def test_counters_kept_by_database(async_client: AsyncClient, async_session: AsyncSession):
+    # given: menu with 2 submenus, 3 dishes each
+    menu = await make_menu(async_session)
+    dish_id, submenu_id = menu.submenus[0].dishes[0].id, menu.submenus[1].id
+    url = reverse(get_menu, target_menu_id=menu.id)
+    response = await async_client.get(url)
+    assert (response.json()['submenus_count'], response.json()['dishes_count']) == (2, 6)
+    # when: deleting a dish and, with database cascade, a whole submenu bypassing the API
+    await async_session.execute(delete(Dish).where(Dish.id == dish_id))
+    await async_session.execute(delete(SubMenu).where(SubMenu.id == submenu_id))
+    await async_session.commit()
+    counters = await async_session.execute(select(Menu.submenus_count, Menu.dishes_count).where(Menu.id == menu.id))
+    await async_session.close()
+    # then: expecting counters changed in the same transactions, nothing left to repair
+    assert counters.one() == (1, 2)
+    assert (await async_client.post(reverse(recount_counters))).json() == {'menus': []}
+
+
+@pytest.mark.asyncio
+async def test_recount_repairs_drifted_counters(async_client: AsyncClient, async_session: AsyncSession):
+    # given: cached menu whose stored counters drifted from its rows
+    menu = await make_menu(async_session)
+    url = reverse(get_menu, target_menu_id=menu.id)
+    await async_client.get(url)
+    await async_session.execute(update(Menu).where(Menu.id == menu.id).values(submenus_count=5, dishes_count=0))
+    await async_session.commit()
+    await async_session.close()
+    # when: running the recount
+    response = await async_client.post(reverse(recount_counters))
+    # then: expecting the menu repaired and its cached entry dropped
+    assert response.json() == {'menus': [menu.id]}
+    response = await async_client.get(url)
+    assert (response.json()['submenus_count'], response.json()['dishes_count']) == (2, 6)
+    assert (await async_client.post(reverse(recount_counters))).json() == {'menus': []}
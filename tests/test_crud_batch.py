@@ -0,0 +1,133 @@
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.database import async_engine
+from app.models.menu import Menu
+from app.models.submenu import SubMenu
+from app.routers.batch import apply_batch
+from app.routers.dish import get_dish
+from app.routers.menu import get_menu, get_menus
+from app.utils.generators import generate_uuid
+from app.utils.pathfinder import reverse
+
+
+def statuses(items: list[dict]) -> dict[str, str]:
+    return {item['id']: item['detail'] or item['status'] for item in items}
+
+
+@pytest.mark.asyncio
+async def test_batch_creates_updates_and_deletes(async_client: AsyncClient, async_session: AsyncSession):
+    # given: a cached menu with a submenu, and ids of rows created by the batch
+    menu = Menu(title='Menu', description='Menu', submenus=[SubMenu(title='SubMenu', description='SubMenu')])
+    async_session.add(menu)
+    await async_session.commit()
+    submenu_id = menu.submenus[0].id
+    new_menu_id, new_submenu_id, dish_id = generate_uuid(), generate_uuid(), generate_uuid()
+    assert (await async_client.get(reverse(get_menu, target_menu_id=menu.id))).json()['dishes_count'] == 0
+    # when: creating a menu with a submenu and adding a dish to both submenus, then renaming the menu,
+    # moving the dish to the new submenu and deleting the old submenu
+    created = await async_client.post(reverse(apply_batch), json={
+        'menus': [{'id': new_menu_id, 'title': 'New', 'description': 'New'}],
+        'submenus': [{'id': new_submenu_id, 'title': 'New', 'description': 'New', 'menu_id': new_menu_id}],
+        'dishes': [
+            {'id': dish_id, 'title': 'Dish', 'description': 'Dish', 'price': '10.00', 'submenu_id': submenu_id},
+            {'title': 'Other', 'description': 'Other', 'price': '5.00', 'submenu_id': new_submenu_id},
+        ],
+    })
+    cached_count = (await async_client.get(reverse(get_menu, target_menu_id=menu.id))).json()['dishes_count']
+    changed = await async_client.post(reverse(apply_batch), json={
+        'menus': [{'id': menu.id, 'title': 'Renamed', 'description': 'Menu'}],
+        'dishes': [
+            {'id': dish_id, 'title': 'Dish', 'description': 'Dish', 'price': '20.00', 'submenu_id': new_submenu_id},
+        ],
+        'delete': {'submenus': [submenu_id]},
+    })
+    # then: expecting results of every row and responses, cached before, showing the changes and counters
+    assert created.status_code == 200
+    assert statuses(created.json()['menus']) == {new_menu_id: 'created'}
+    assert statuses(created.json()['submenus']) == {new_submenu_id: 'created'}
+    assert [item['status'] for item in created.json()['dishes']] == ['created', 'created']
+    assert cached_count == 1
+    assert changed.json() == {
+        'menus': [{'id': menu.id, 'status': 'updated', 'detail': None}],
+        'submenus': [{'id': submenu_id, 'status': 'deleted', 'detail': None}],
+        'dishes': [{'id': dish_id, 'status': 'updated', 'detail': None}],
+    }
+    menus = {item['id']: item for item in (await async_client.get(reverse(get_menus))).json()}
+    assert (menus[menu.id]['title'], menus[menu.id]['submenus_count'], menus[menu.id]['dishes_count']) == ('Renamed', 0, 0)
+    assert (menus[new_menu_id]['submenus_count'], menus[new_menu_id]['dishes_count']) == (1, 2)
+    dish = await async_client.get(
+        reverse(get_dish, target_menu_id=new_menu_id, target_submenu_id=new_submenu_id, target_dish_id=dish_id)
+    )
+    assert dish.json()['price'] == '20.00'
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_missing_rows(async_client: AsyncClient, async_session: AsyncSession):
+    # given: a menu, ids of missing rows, and a not found response of a dish cached before it is created
+    menu = Menu(title='Menu', description='Menu', submenus=[SubMenu(title='SubMenu', description='SubMenu')])
+    async_session.add(menu)
+    await async_session.commit()
+    submenu_id = menu.submenus[0].id
+    missing_id, dish_id = str(uuid4()), generate_uuid()
+    dish_url = reverse(get_dish, target_menu_id=menu.id, target_submenu_id=submenu_id, target_dish_id=dish_id)
+    assert (await async_client.get(dish_url)).status_code == 404
+    # when: adding rows to missing parents and deleting missing rows together with a new dish
+    response = await async_client.post(reverse(apply_batch), json={
+        'submenus': [{'id': missing_id, 'title': 'SubMenu', 'description': 'SubMenu', 'menu_id': missing_id}],
+        'dishes': [
+            {'id': dish_id, 'title': 'Dish', 'description': 'Dish', 'price': '1.00', 'submenu_id': submenu_id},
+            {'id': missing_id, 'title': 'Dish', 'description': 'Dish', 'price': '1.00', 'submenu_id': missing_id},
+        ],
+        'delete': {'menus': [missing_id], 'dishes': [missing_id]},
+    })
+    duplicated = await async_client.post(reverse(apply_batch), json={
+        'menus': [{'id': menu.id, 'title': 'Menu', 'description': 'Menu'}] * 2,
+    })
+    # then: expecting the rows of missing parents and missing rows not found, the rest applied, duplicates rejected
+    assert statuses(response.json()['menus']) == {missing_id: 'menu not found'}
+    assert statuses(response.json()['submenus']) == {missing_id: 'menu not found'}
+    assert response.json()['dishes'] == [
+        {'id': dish_id, 'status': 'created', 'detail': None},
+        {'id': missing_id, 'status': 'not found', 'detail': 'submenu not found'},
+        {'id': missing_id, 'status': 'not found', 'detail': 'dish not found'},
+    ]
+    assert (await async_client.get(dish_url)).status_code == 200
+    assert duplicated.status_code == 422
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('size', [1, 200])
+async def test_batch_statements_do_not_grow_with_size(async_client: AsyncClient, async_session: AsyncSession, size):
+    # given: a menu with a submenu
+    menu = Menu(title='Menu', description='Menu', submenus=[SubMenu(title='SubMenu', description='SubMenu')])
+    async_session.add(menu)
+    await async_session.commit()
+    submenu_id = menu.submenus[0].id
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args) -> None:
+        statements.append(statement)
+
+    # when: creating given number of submenus and dishes, and deleting as many missing dishes
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = await async_client.post(reverse(apply_batch), json={
+            'submenus': [
+                {'title': f'SubMenu {number}', 'description': 'SubMenu', 'menu_id': menu.id} for number in range(size)
+            ],
+            'dishes': [
+                {'title': f'Dish {number}', 'description': 'Dish', 'price': '1.00', 'submenu_id': submenu_id}
+                for number in range(size)
+            ],
+            'delete': {'dishes': [str(uuid4()) for _ in range(size)]},
+        })
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    # then: expecting the rows looked up, upserted and deleted in one statement each
+    assert [item['status'] for item in response.json()['dishes']] == ['created'] * size + ['not found'] * size
+    assert len(statements) == 4
@@ -2,6 +2,7 @@ import pytest
 from httpx import AsyncClient
 
 from app.routers.dish import create_dish, delete_dish, get_dish, get_dishes, update_dish
+from app.services.database.dish import DishCRUD
 from app.utils.pathfinder import reverse
 
 
@@ -105,3 +106,97 @@ async def test_dish_delete_target_id(async_client: AsyncClient, create_menu, cre
     # then: expecting to get 404 status code and not found message
     assert response.status_code == 404
     assert response.json() == {'detail': 'dish not found'}
+
+
+@pytest.mark.asyncio
+async def test_dish_get_list_scoped_by_submenu(async_client: AsyncClient, create_menu, create_submenu, create_dish):
+    # given: available menu with two submenus holding different amount of dishes
+    menu = create_menu
+    submenu1 = await create_submenu(menu.id)
+    submenu2 = await create_submenu(menu.id)
+    await create_dish(submenu1.id)
+    await create_dish(submenu2.id)
+    await create_dish(submenu2.id)
+    url1 = reverse(get_dishes, target_menu_id=menu.id, target_submenu_id=submenu1.id)
+    url2 = reverse(get_dishes, target_menu_id=menu.id, target_submenu_id=submenu2.id)
+    # when: executing CRUD operation get on both lists one after another
+    response1 = await async_client.get(url1)
+    response2 = await async_client.get(url2)
+    # then: expecting every submenu to get its own cached list of dishes
+    assert response1.status_code == 200
+    assert len(response1.json()) == 1
+    assert response2.status_code == 200
+    assert len(response2.json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_dish_not_found_under_other_submenu(async_client: AsyncClient, create_menu, create_submenu, create_dish):
+    # given: available menu with two submenus and a dish of the first one
+    menu = create_menu
+    submenu1 = await create_submenu(menu.id)
+    submenu2 = await create_submenu(menu.id)
+    dish = await create_dish(submenu1.id)
+    wrong_url = reverse(get_dish, target_menu_id=menu.id, target_submenu_id=submenu2.id, target_dish_id=dish.id)
+    # when: executing CRUD operations get and patch through the path of the second submenu
+    response = await async_client.get(wrong_url)
+    patch_response = await async_client.patch(wrong_url, json={'title': 'Moved'})
+    # then: expecting 404, while the dish is still found, unchanged, under its own submenu
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'dish not found'}
+    assert patch_response.status_code == 404
+    url = reverse(get_dish, target_menu_id=menu.id, target_submenu_id=submenu1.id, target_dish_id=dish.id)
+    response = await async_client.get(url)
+    assert response.status_code == 200
+    assert response.json()['title'] == dish.title
+
+
+@pytest.mark.asyncio
+async def test_dish_discount_same_from_db_and_cache(async_client: AsyncClient, create_menu, create_submenu, create_dish):
+    # given: available menu, submenu and dish with a discount
+    menu = create_menu
+    submenu = await create_submenu(menu.id)
+    dish = await create_dish(submenu.id)
+    url = reverse(update_dish, target_menu_id=menu.id, target_submenu_id=submenu.id, target_dish_id=dish.id)
+    response = await async_client.patch(url, json={'price': '20.00', 'discount': 10})
+    assert response.json()['price'] == '18.00'
+    # when: executing CRUD operation get twice, from cache written by update and from database
+    url = reverse(get_dish, target_menu_id=menu.id, target_submenu_id=submenu.id, target_dish_id=dish.id)
+    cached_response = await async_client.get(url)
+    list_url = reverse(get_dishes, target_menu_id=menu.id, target_submenu_id=submenu.id)
+    db_response = await async_client.get(list_url)
+    cached_list_response = await async_client.get(list_url)
+    # then: expecting discount to be applied exactly once
+    assert cached_response.status_code == 200
+    assert cached_response.json()['price'] == '18.00'
+    assert db_response.json()[0]['price'] == '18.00'
+    assert cached_list_response.content == db_response.content
+
+
+@pytest.mark.asyncio
+async def test_dish_writes_update_cached_list(async_client: AsyncClient, create_menu, create_submenu, monkeypatch):
+    # given: cached list of dishes and counted database queries of the list
+    menu = create_menu
+    submenu = await create_submenu(menu.id)
+    url = reverse(create_dish, target_menu_id=menu.id, target_submenu_id=submenu.id)
+    dish = (await async_client.post(url, json={'title': 'Old', 'description': 'Old', 'price': '1.00'})).json()
+    list_url = reverse(get_dishes, target_menu_id=menu.id, target_submenu_id=submenu.id)
+    await async_client.get(list_url)
+    calls = []
+    original_get_dishes = DishCRUD.get_dishes
+
+    async def counted_get_dishes(self, *args, **kwargs):
+        calls.append(kwargs)
+        return await original_get_dishes(self, *args, **kwargs)
+
+    monkeypatch.setattr(DishCRUD, 'get_dishes', counted_get_dishes)
+    # when: creating, updating and deleting dishes
+    url = reverse(create_dish, target_menu_id=menu.id, target_submenu_id=submenu.id)
+    created = (await async_client.post(url, json={'title': 'New', 'description': 'New', 'price': '5.00'})).json()
+    url = reverse(update_dish, target_menu_id=menu.id, target_submenu_id=submenu.id, target_dish_id=created['id'])
+    await async_client.patch(url, json={'title': 'Updated', 'price': '10.00', 'discount': 10})
+    url = reverse(delete_dish, target_menu_id=menu.id, target_submenu_id=submenu.id, target_dish_id=dish['id'])
+    await async_client.delete(url)
+    response = await async_client.get(list_url)
+    # then: expecting the list changed in cache without querying the database, discount applied once
+    assert calls == []
+    assert response.json() == [{**created, 'title': 'Updated', 'price': '9.00', 'discount': 10}]
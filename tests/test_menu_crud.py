@@ -1,9 +1,17 @@
 import uuid
 
 import pytest
+from fastapi import BackgroundTasks
 from httpx import AsyncClient
 
+from app.config.base import MENU_KEY
+from app.config.cache import create_redis
+from app.routers.dish import get_dish
 from app.routers.menu import create_menu, delete_menu, get_menu, get_menus, update_menu
+from app.schemas.menu import MenuUpdate
+from app.services.api.menu import MenuService
+from app.services.cache.menu import MenuCacheCRUD
+from app.services.database.menu import MenuCRUD
 from app.utils.pathfinder import reverse
 
 
@@ -125,3 +133,106 @@ async def test_menu_delete_target_id(async_client: AsyncClient, create_menu):
     # then: expecting to get status code 404 and not found detail
     assert response.status_code == 404
     assert response.json() == {'detail': 'menu not found'}
+
+
+@pytest.mark.asyncio
+async def test_menu_wildcard_not_modified_only_if_exists(async_client: AsyncClient, create_menu):
+    # given: an instance of menu obj fetched once, so its key has a version
+    url = reverse(get_menu, target_menu_id=create_menu.id)
+    await async_client.get(url)
+    # when: executing conditional GET operation with `If-None-Match: *`
+    response = await async_client.get(url, headers={'If-None-Match': '*'})
+    # then: expecting 304 with ETag of the cached menu
+    assert response.status_code == 304
+    assert response.headers['ETag']
+    # when: the menu is deleted and the same conditional GET is executed
+    await async_client.delete(reverse(delete_menu, target_menu_id=create_menu.id))
+    response = await async_client.get(url, headers={'If-None-Match': '*'})
+    # then: expecting 404, the version left by the delete does not tell the menu exists
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'menu not found'}
+
+
+@pytest.mark.asyncio
+async def test_menu_delete_invalidates_cached_children(async_client: AsyncClient, create_menu, create_submenu, create_dish):
+    # given: an instance of menu with submenu and dish, dish being cached by a previous request
+    menu = create_menu
+    submenu = await create_submenu(menu.id)
+    dish = await create_dish(submenu.id)
+    dish_url = reverse(get_dish, target_menu_id=menu.id, target_submenu_id=submenu.id, target_dish_id=dish.id)
+    response = await async_client.get(dish_url)
+    assert response.status_code == 200
+    # when: executing CRUD operation delete on target menu
+    response = await async_client.delete(reverse(delete_menu, target_menu_id=menu.id))
+    assert response.status_code == 200
+    # then: expecting cascaded dish to be gone from cache as well
+    response = await async_client.get(dish_url)
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'menu not found'}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('sync_cache', [False, True])
+async def test_menu_patch_cache_writes_batched(async_session, create_menu, sync_cache):
+    # given: menu service with background tasks that were not run yet
+    tasks = BackgroundTasks()
+    async for cache in create_redis():
+        service = MenuService(async_session, cache, tasks, sync_cache)
+        # when: updating the menu
+        await service.update_menu(
+            menu_id=create_menu.id,
+            menu_schema=MenuUpdate(title='updated title', description='updated description')
+        )
+        cached = await MenuCacheCRUD(cache).get_menu(menu_id=create_menu.id)
+        # then: expecting cache changes in one batch, applied before returning only with `sync_cache`
+        if sync_cache:
+            assert tasks.tasks == []
+            assert b'updated title' in cached.body
+        else:
+            assert len(tasks.tasks) == 1
+            assert cached is None
+
+
+@pytest.mark.asyncio
+async def test_menu_not_found_cached_until_created(async_client: AsyncClient, monkeypatch):
+    # given: an id of menu that does not exist yet and counted database lookups
+    menu_id = str(uuid.uuid4())
+    calls = []
+    original_get_menu = MenuCRUD.get_menu
+
+    async def counted_get_menu(self, menu_id):
+        calls.append(menu_id)
+        return await original_get_menu(self, menu_id=menu_id)
+
+    monkeypatch.setattr(MenuCRUD, 'get_menu', counted_get_menu)
+    url = reverse(get_menu, target_menu_id=menu_id)
+    # when: executing GET operation twice
+    responses = [await async_client.get(url) for _ in range(2)]
+    # then: expecting 404 for both and database queried once
+    assert [response.status_code for response in responses] == [404, 404]
+    assert responses[1].json()['detail'] == 'menu not found'
+    assert len(calls) == 1
+    # when: creating the menu with this id
+    await async_client.post(reverse(create_menu), json={'id': menu_id, 'title': 'Menu', 'description': 'Menu'})
+    response = await async_client.get(url)
+    # then: expecting it to be found
+    assert response.status_code == 200
+    assert response.json()['id'] == menu_id
+
+
+@pytest.mark.asyncio
+async def test_menu_ids_time_ordered_uuids(async_client: AsyncClient):
+    # given: client supplied id in upper case and a malformed one
+    client_id = uuid.uuid4()
+    url = reverse(create_menu)
+    # when: creating menus with and without ids
+    first = (await async_client.post(url, json={'title': 'First', 'description': 'First'})).json()
+    second = (await async_client.post(url, json={'title': 'Second', 'description': 'Second'})).json()
+    supplied = await async_client.post(url, json={'id': str(client_id).upper(), 'title': 'Menu', 'description': 'Menu'})
+    malformed = await async_client.get(reverse(get_menu, target_menu_id='not-an-uuid'))
+    # then: expecting generated ids of version 7 in order of creation, supplied id kept and malformed one not found
+    assert uuid.UUID(first['id']).version == 7
+    assert uuid.UUID(first['id']).bytes[:6] <= uuid.UUID(second['id']).bytes[:6]
+    assert supplied.json()['id'] == str(client_id)
+    assert malformed.status_code == 404
+    assert len(MENU_KEY.format(menu_id=first['id'])) == len('menu_id_') + 22
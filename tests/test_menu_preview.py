@@ -1,7 +1,21 @@
+import asyncio
+import json
+
 import pytest
 from httpx import AsyncClient
 
+from app.config.base import MENUS_PREVIEW_KEY
+from app.config.cache import create_redis
+from app.config.database import async_engine
+from app.models.dish import Dish
+from app.models.menu import Menu
+from app.models.submenu import SubMenu
+from app.routers.dish import get_dishes
+from app.routers.menu import create_menu as create_menu_route
 from app.routers.menu import get_menus_preview
+from app.services.cache.entry import CacheEntry
+from app.services.cache.menu import MenuCacheCRUD
+from app.services.database.menu import MenuCRUD
 from app.utils.pathfinder import reverse
 
 
@@ -28,3 +42,159 @@ async def test_menu_preview_with_menu(async_client: AsyncClient, create_menu):
     assert response.json()[0]['id'] == create_menu.id
     assert response.json()[0]['title'] == create_menu.title
     assert response.json()[0]['description'] == create_menu.description
+
+
+@pytest.mark.asyncio
+async def test_menu_preview_concurrent_misses_query_once(async_client: AsyncClient, create_menu, monkeypatch):
+    # given: a db with menu instance, no cached preview and a slow preview query
+    calls = []
+    original_get_preview = MenuCRUD.get_preview_document
+
+    async def slow_get_preview(self, *args):
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return await original_get_preview(self, *args)
+
+    monkeypatch.setattr(MenuCRUD, 'get_preview_document', slow_get_preview)
+    url = reverse(get_menus_preview)
+    # when: executing concurrent GET operations on endpoint
+    responses = await asyncio.gather(*(async_client.get(url) for _ in range(5)))
+    # then: expecting every request to get the menu while database was queried once
+    assert len(calls) == 1
+    for response in responses:
+        assert response.status_code == 200
+        assert response.json()[0]['id'] == create_menu.id
+
+
+@pytest.mark.asyncio
+async def test_menu_preview_stale_served_and_refreshed(async_client: AsyncClient, async_session, create_menu):
+    # given: a cached preview that became stale and a menu added after it was built
+    url = reverse(get_menus_preview)
+    await async_client.get(url)
+    async for cache in create_redis():
+        entry = CacheEntry.unpack(await cache.get(MENUS_PREVIEW_KEY))
+        entry.stale_at = 1.0
+        await cache.set(MENUS_PREVIEW_KEY, entry.pack())
+    async_session.add(Menu(title='testMenu2', description='testMenu2Description'))
+    await async_session.commit()
+    # when: executing GET operation on endpoint
+    stale_response = await async_client.get(url)
+    # then: expecting the stale preview to be returned and refreshed in background for next request
+    assert len(stale_response.json()) == 1
+    fresh_response = await async_client.get(url)
+    assert len(fresh_response.json()) == 2
+
+
+@pytest.mark.asyncio
+async def test_menu_preview_refresh_returns_its_connection(async_client: AsyncClient, async_session, create_menu):
+    # given: a cached preview that became stale and a menu added after it was built
+    url = reverse(get_menus_preview)
+    await async_client.get(url)
+    async for cache in create_redis():
+        entry = CacheEntry.unpack(await cache.get(MENUS_PREVIEW_KEY))
+        entry.stale_at = 1.0
+        await cache.set(MENUS_PREVIEW_KEY, entry.pack())
+    async_session.add(Menu(title='testMenu2', description='testMenu2Description'))
+    await async_session.commit()
+    await async_session.close()
+    # when: executing GET operation refreshing the preview in background
+    await async_client.get(url)
+    # then: expecting the refresh to read with its own session and to return its connection to the pool
+    assert len((await async_client.get(url)).json()) == 2
+    await async_session.close()
+    assert async_engine.pool.stats()['checked_out'] == 0
+
+
+@pytest.mark.asyncio
+async def test_menu_preview_not_modified_until_changed(async_client: AsyncClient, create_menu, monkeypatch):
+    # given: a preview fetched once
+    url = reverse(get_menus_preview)
+    response = await async_client.get(url)
+    etag = response.headers['ETag']
+    calls = []
+    original_get_preview = MenuCRUD.get_preview_document
+
+    async def counted_get_preview(self, *args):
+        calls.append(1)
+        return await original_get_preview(self, *args)
+
+    monkeypatch.setattr(MenuCRUD, 'get_preview_document', counted_get_preview)
+    # when: executing conditional GET operation with its ETag
+    not_modified = await async_client.get(url, headers={'If-None-Match': etag})
+    # then: expecting 304 without body and without database query
+    assert not_modified.status_code == 304
+    assert not_modified.content == b''
+    assert not_modified.headers['ETag'] == etag
+    assert calls == []
+    # when: a menu is created and the same conditional GET is executed
+    await async_client.post(reverse(create_menu_route), json={'title': 'Menu 2', 'description': 'Menu 2'})
+    modified = await async_client.get(url, headers={'If-None-Match': etag})
+    # then: expecting the new preview with a new ETag
+    assert modified.status_code == 200
+    assert len(modified.json()) == 2
+    assert modified.headers['ETag'] != etag
+
+
+def sorted_preview(body: bytes) -> list[dict]:
+    """Preview with menus, submenus and dishes sorted by id, as rendered instances come unordered."""
+
+    menus = sorted(json.loads(body), key=lambda menu: menu['id'])
+    for menu in menus:
+        menu['submenus'].sort(key=lambda submenu: submenu['id'])
+        for submenu in menu['submenus']:
+            submenu['dishes'].sort(key=lambda dish: dish['id'])
+    return menus
+
+
+@pytest.mark.asyncio
+async def test_menu_preview_document_same_as_rendered(async_session):
+    # given: menus with and without submenus, dishes with and without discounts
+    menu = Menu(title='Menu', description='Menu')
+    menu.submenus = [
+        SubMenu(
+            title='SubMenu',
+            description='SubMenu',
+            dishes=[
+                Dish(title='Dish 1', description='Dish 1', price='182.99', discount=0),
+                Dish(title='Dish 2', description='Dish 2', price='182.99', discount=17),
+                Dish(title='Dish 3', description='Dish 3', price='10.05', discount=5),
+            ]
+        ),
+        SubMenu(title='Empty SubMenu', description='Empty SubMenu'),
+    ]
+    async_session.add_all([menu, Menu(title='Empty Menu', description='Empty Menu')])
+    await async_session.commit()
+    async_session.expunge_all()
+    # when: building the preview by Postgres and by rendering loaded instances
+    document = await MenuCRUD(async_session).get_preview_document()
+    rendered = MenuCacheCRUD.render_preview(await MenuCRUD(async_session).get_preview())
+    # then: expecting the same menus, submenus, dishes and discounted prices
+    assert json.loads(document) == sorted_preview(document)
+    assert sorted_preview(document) == sorted_preview(rendered)
+    prices = {
+        dish['title']: dish['price']
+        for menu in json.loads(document) for submenu in menu['submenus'] for dish in submenu['dishes']
+    }
+    assert prices == {'Dish 1': '182.99', 'Dish 2': '151.88', 'Dish 3': '9.55'}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('price, discount, shown', [('0.50', 7, '0.47'), ('0.50', 1, '0.50'), ('0.50', 33, '0.34')])
+async def test_discounted_price_same_in_document_and_schema(
+    async_client: AsyncClient, async_session, price, discount, shown
+):
+    # given: a dish whose discounted price ends on half a cent
+    menu = Menu(title='Menu', description='Menu')
+    menu.submenus = [SubMenu(
+        title='SubMenu',
+        description='SubMenu',
+        dishes=[Dish(title='Dish', description='Dish', price=price, discount=discount)]
+    )]
+    async_session.add(menu)
+    await async_session.commit()
+    # when: building the preview by Postgres and listing the dishes validated by the schema
+    document = await MenuCRUD(async_session).get_preview_document()
+    dishes = await async_client.get(reverse(get_dishes, target_menu_id=menu.id, target_submenu_id=menu.submenus[0].id))
+    # then: expecting both to round half up to the same price
+    assert json.loads(document)[0]['submenus'][0]['dishes'][0]['price'] == shown
+    assert dishes.json()[0]['price'] == shown
@@ -0,0 +1,42 @@
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.database import (
+    Base,
+    async_engine,
+    check_schema_version,
+    migrations_config,
+)
+
+
+def migrate(connection, revision: str) -> None:
+    config = migrations_config()
+    config.attributes['connection'] = connection
+    if revision == 'base':
+        command.downgrade(config, revision)
+    else:
+        command.upgrade(config, revision)
+
+
+@pytest.mark.asyncio
+async def test_migrations_build_schema_of_models(async_session: AsyncSession):
+    # given: empty database
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    with pytest.raises(RuntimeError):
+        await check_schema_version()
+    # when: applying every migration
+    async with async_engine.begin() as conn:
+        await conn.run_sync(migrate, 'head')
+    # then: expecting the schema version accepted and tables, columns and indexes same as declared by models
+    await check_schema_version()
+    async with async_engine.connect() as conn:
+        diff = await conn.run_sync(lambda sync_conn: compare_metadata(MigrationContext.configure(sync_conn), Base.metadata))
+    assert diff == []
+    async with async_engine.begin() as conn:
+        await conn.run_sync(migrate, 'base')
+        await conn.execute(text('DROP TABLE alembic_version'))
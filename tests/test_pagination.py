@@ -0,0 +1,118 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.dish import Dish
+from app.models.menu import Menu
+from app.models.submenu import SubMenu
+from app.routers.dish import get_dishes
+from app.routers.menu import create_menu as create_menu_route
+from app.routers.menu import get_menus, get_menus_preview
+from app.routers.submenu import get_submenus
+from app.utils.pathfinder import reverse
+
+
+async def make_menus(async_session: AsyncSession, count: int) -> list[str]:
+    menus = [Menu(title=f'Menu {number}', description='Menu') for number in range(count)]
+    async_session.add_all(menus)
+    await async_session.commit()
+    return sorted(menu.id for menu in menus)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('get_list', [get_menus, get_menus_preview])
+async def test_pages_follow_each_other(async_client: AsyncClient, async_session: AsyncSession, get_list):
+    # given: 5 menus
+    menu_ids = await make_menus(async_session, 5)
+    url = reverse(get_list)
+    # when: requesting pages of 2 menus, each after the last menu of the previous one
+    pages, after = [], None
+    while True:
+        params = {'limit': 2} if after is None else {'limit': 2, 'after': after}
+        page = [menu['id'] for menu in (await async_client.get(url, params=params)).json()]
+        if not page:
+            break
+        pages.append(page)
+        after = page[-1]
+    # then: expecting every menu once, ordered by id, same as the whole list
+    assert pages == [menu_ids[:2], menu_ids[2:4], menu_ids[4:]]
+    assert [menu['id'] for menu in (await async_client.get(url)).json()] == menu_ids
+
+
+@pytest.mark.asyncio
+async def test_cached_page_changes_with_list(async_client: AsyncClient, async_session: AsyncSession):
+    # given: a cached page after the first of 2 menus
+    menu_ids = await make_menus(async_session, 2)
+    url = reverse(get_menus)
+    params = {'limit': 10, 'after': menu_ids[0]}
+    assert [menu['id'] for menu in (await async_client.get(url, params=params)).json()] == menu_ids[1:]
+    # when: a menu is created through the API
+    response = await async_client.post(reverse(create_menu_route), json={'title': 'Menu', 'description': 'Menu'})
+    # then: expecting the same page to show it
+    page = await async_client.get(url, params=params)
+    assert [menu['id'] for menu in page.json()] == [menu_ids[1], response.json()['id']]
+
+
+@pytest.mark.asyncio
+async def test_submenus_page_past_the_end(async_client: AsyncClient, async_session: AsyncSession):
+    # given: a menu with one submenu
+    menu = Menu(title='Menu', description='Menu', submenus=[SubMenu(title='SubMenu', description='SubMenu')])
+    async_session.add(menu)
+    await async_session.commit()
+    submenu_id = menu.submenus[0].id
+    # when: requesting the page after its only submenu, and a page of a menu that does not exist
+    page = await async_client.get(reverse(get_submenus, target_menu_id=menu.id), params={'after': submenu_id})
+    missing = await async_client.get(
+        reverse(get_submenus, target_menu_id=submenu_id),
+        params={'after': submenu_id}
+    )
+    # then: expecting an empty page and not found menu
+    assert page.status_code == 200
+    assert page.json() == []
+    assert missing.status_code == 404
+    assert missing.json()['detail'] == 'menu not found'
+
+
+@pytest.mark.asyncio
+async def test_dishes_filtered_by_shown_price_and_discount(async_client: AsyncClient, async_session: AsyncSession):
+    # given: dishes priced 100.00 with discounts of 0, 10 and 50 percent
+    menu = Menu(title='Menu', description='Menu')
+    menu.submenus = [SubMenu(
+        title='SubMenu',
+        description='SubMenu',
+        dishes=[
+            Dish(title=f'Dish {discount}', description='Dish', price='100.00', discount=discount)
+            for discount in (0, 10, 50)
+        ]
+    )]
+    async_session.add(menu)
+    await async_session.commit()
+    url = reverse(get_dishes, target_menu_id=menu.id, target_submenu_id=menu.submenus[0].id)
+    # when: filtering them by price after discount and by discount
+    cheap = await async_client.get(url, params={'max_price': '90.00'})
+    discounted = await async_client.get(url, params={'min_discount': 1, 'max_price': '95'})
+    invalid = await async_client.get(url, params={'limit': 0})
+    # then: expecting the matching dishes with their shown prices, and invalid limit rejected
+    assert sorted((dish['title'], dish['price']) for dish in cheap.json()) == [('Dish 10', '90.00'), ('Dish 50', '50.00')]
+    assert sorted(dish['title'] for dish in discounted.json()) == ['Dish 10', 'Dish 50']
+    assert invalid.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_dishes_price_filter_bound_on_half_cent(async_client: AsyncClient, async_session: AsyncSession):
+    # given: a dish of 0.50 with 7 percent discount, shown as 0.47 after rounding half a cent up
+    menu = Menu(title='Menu', description='Menu')
+    menu.submenus = [SubMenu(
+        title='SubMenu',
+        description='SubMenu',
+        dishes=[Dish(title='Dish', description='Dish', price='0.50', discount=7)]
+    )]
+    async_session.add(menu)
+    await async_session.commit()
+    url = reverse(get_dishes, target_menu_id=menu.id, target_submenu_id=menu.submenus[0].id)
+    # when: filtering with bounds on either side of the shown price
+    at_bound = await async_client.get(url, params={'min_price': '0.47', 'max_price': '0.47'})
+    below = await async_client.get(url, params={'max_price': '0.46'})
+    # then: expecting the filters to agree with the shown price
+    assert [dish['price'] for dish in at_bound.json()] == ['0.47']
+    assert below.json() == []
@@ -0,0 +1,117 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.database import async_engine
+from app.models.dish import Dish
+from app.models.menu import Menu
+from app.models.submenu import SubMenu
+from app.routers.menu import get_menu, get_menus, get_menus_preview
+from app.routers.submenu import get_submenu, update_submenu
+from app.utils.pathfinder import reverse
+
+
+async def make_menu(async_session: AsyncSession) -> Menu:
+    menu = Menu(title='Menu', description='Menu')
+    menu.submenus = [
+        SubMenu(
+            title='SubMenu',
+            description='SubMenu',
+            dishes=[Dish(title='Dish', description='Dish', price='10.00', discount=10)]
+        )
+    ]
+    async_session.add(menu)
+    await async_session.commit()
+    return menu
+
+
+@pytest.mark.asyncio
+async def test_preview_shows_only_requested_fields(async_client: AsyncClient, async_session: AsyncSession):
+    # given: menu with a submenu and a discounted dish
+    menu = await make_menu(async_session)
+    submenu, dish = menu.submenus[0], menu.submenus[0].dishes[0]
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args) -> None:
+        statements.append(statement)
+
+    # when: requesting preview with ids, titles and prices only
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = await async_client.get(
+            reverse(get_menus_preview),
+            params={'fields[menu]': 'id,title', 'fields[submenu]': 'id', 'fields[dish]': 'price,id'}
+        )
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    # then: expecting only those fields, in order of the schema, and no other column read in a single statement
+    assert response.json() == [{
+        'title': 'Menu',
+        'id': menu.id,
+        'submenus': [{'id': submenu.id, 'dishes': [{'price': '9.00', 'id': dish.id}]}],
+    }]
+    assert len(statements) == 1
+    assert 'description' not in statements[0]
+
+
+@pytest.mark.asyncio
+async def test_includes_nest_resources(async_client: AsyncClient, async_session: AsyncSession):
+    # given: menu with a submenu and a dish
+    menu = await make_menu(async_session)
+    submenu = menu.submenus[0]
+    # when: requesting routes with and without nested resources
+    preview = await async_client.get(reverse(get_menus_preview), params={'include': ''})
+    menus = await async_client.get(reverse(get_menus), params={'include': 'submenus', 'fields[submenu]': 'title'})
+    menu_response = await async_client.get(reverse(get_menu, target_menu_id=menu.id), params={'fields[menu]': 'dishes_count'})
+    submenu_response = await async_client.get(
+        reverse(get_submenu, target_menu_id=menu.id, target_submenu_id=submenu.id),
+        params={'include': 'dishes', 'fields[submenu]': 'id', 'fields[dish]': 'title'}
+    )
+    # then: expecting nested resources only where included, each with its fields
+    assert preview.json() == [{'title': 'Menu', 'description': 'Menu', 'id': menu.id}]
+    assert menus.json() == [{
+        'title': 'Menu',
+        'description': 'Menu',
+        'id': menu.id,
+        'submenus_count': 1,
+        'dishes_count': 1,
+        'submenus': [{'title': 'SubMenu'}],
+    }]
+    assert menu_response.json() == {'dishes_count': 1}
+    assert submenu_response.json() == {'id': submenu.id, 'dishes': [{'title': 'Dish'}]}
+
+
+@pytest.mark.asyncio
+async def test_projection_errors(async_client: AsyncClient, async_session: AsyncSession):
+    # given: menu with a submenu
+    menu = await make_menu(async_session)
+    # when: requesting unknown fields and includes, and a projection of a missing submenu
+    unknown_field = await async_client.get(reverse(get_menus), params={'fields[menu]': 'id,price'})
+    unknown_include = await async_client.get(reverse(get_menus), params={'include': 'dishes'})
+    missing = await async_client.get(
+        reverse(get_submenu, target_menu_id=menu.id, target_submenu_id=menu.id),
+        params={'fields[submenu]': 'id'}
+    )
+    # then: expecting them rejected and not found submenu
+    assert unknown_field.status_code == 422
+    assert unknown_include.status_code == 422
+    assert missing.status_code == 404
+    assert missing.json()['detail'] == 'submenu not found'
+
+
+@pytest.mark.asyncio
+async def test_cached_projection_follows_nested_changes(async_client: AsyncClient, async_session: AsyncSession):
+    # given: a cached projection of the menu with its submenus
+    menu = await make_menu(async_session)
+    submenu_id = menu.submenus[0].id
+    url = reverse(get_menu, target_menu_id=menu.id)
+    params = {'include': 'submenus', 'fields[menu]': 'id', 'fields[submenu]': 'title'}
+    assert (await async_client.get(url, params=params)).json()['submenus'] == [{'title': 'SubMenu'}]
+    # when: the submenu is renamed through the API
+    await async_client.patch(
+        reverse(update_submenu, target_menu_id=menu.id, target_submenu_id=submenu_id),
+        json={'title': 'Renamed'}
+    )
+    # then: expecting the projection to show the new title
+    assert (await async_client.get(url, params=params)).json()['submenus'] == [{'title': 'Renamed'}]
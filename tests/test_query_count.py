@@ -0,0 +1,123 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.cache import create_redis
+from app.config.database import async_engine
+from app.models.dish import Dish
+from app.models.menu import Menu
+from app.models.submenu import SubMenu
+from app.routers.dish import delete_dish, get_dish, update_dish
+from app.routers.menu import get_menu, get_menus, get_menus_preview
+from app.routers.submenu import get_submenu, get_submenus, update_submenu
+from app.utils.pathfinder import reverse
+
+
+async def count_queries(async_client: AsyncClient, url: str, method: str = 'GET', **kwargs) -> int:
+    """Number of SQL statements an uncached request of the url runs, GET by default."""
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args) -> None:
+        statements.append(statement)
+
+    async for cache in create_redis():
+        await cache.flushdb()
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = await async_client.request(method, url, **kwargs)
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('submenus', [1, 20])
+async def test_reads_run_one_query_regardless_of_size(async_client: AsyncClient, async_session: AsyncSession, submenus):
+    # given: menu with given number of submenus, 10 dishes each
+    menu = Menu(title='Menu', description='Menu')
+    menu.submenus = [
+        SubMenu(
+            title='SubMenu',
+            description='SubMenu',
+            dishes=[Dish(title='Dish', description='Dish', price='1.00') for _ in range(10)]
+        )
+        for _ in range(submenus)
+    ]
+    async_session.add(menu)
+    await async_session.commit()
+    submenu_id = menu.submenus[0].id
+    await async_session.close()
+    urls = [
+        reverse(get_menus),
+        reverse(get_menu, target_menu_id=menu.id),
+        reverse(get_submenus, target_menu_id=menu.id),
+        reverse(get_submenu, target_menu_id=menu.id, target_submenu_id=submenu_id),
+    ]
+    # when: executing every GET operation with empty cache
+    counts = [await count_queries(async_client, url) for url in urls]
+    preview_count = await count_queries(async_client, reverse(get_menus_preview))
+    # then: expecting each to run a single statement, preview built by Postgres in one as well
+    assert counts == [1, 1, 1, 1]
+    assert preview_count == 1
+
+
+@pytest.mark.asyncio
+async def test_dish_path_checked_in_one_query(async_client: AsyncClient, async_session: AsyncSession):
+    # given: menu with a submenu and a dish
+    menu = Menu(title='Menu', description='Menu')
+    menu.submenus = [SubMenu(title='SubMenu', description='SubMenu', dishes=[Dish(title='Dish', description='Dish', price='1.00')])]
+    async_session.add(menu)
+    await async_session.commit()
+    submenu_id, dish_id = menu.submenus[0].id, menu.submenus[0].dishes[0].id
+    await async_session.close()
+    dish_url = reverse(get_dish, target_menu_id=menu.id, target_submenu_id=submenu_id, target_dish_id=dish_id)
+    # when: reading, updating and deleting the dish and updating the submenu with empty cache
+    read_count = await count_queries(async_client, dish_url)
+    update_count = await count_queries(async_client, dish_url, 'PATCH', json={'title': 'Renamed'})
+    submenu_update_count = await count_queries(
+        async_client,
+        reverse(update_submenu, target_menu_id=menu.id, target_submenu_id=submenu_id),
+        'PATCH',
+        json={'title': 'Renamed'}
+    )
+    delete_count = await count_queries(async_client, dish_url, 'DELETE')
+    # then: expecting the path checked together with fetching the row, followed by the change and its reload
+    assert read_count == 1
+    assert update_count == 3
+    assert submenu_update_count == 3
+    assert delete_count == 2
+
+
+@pytest.mark.asyncio
+async def test_dish_path_tells_what_is_not_found(async_client: AsyncClient, async_session: AsyncSession):
+    # given: menu with a submenu and a dish
+    menu = Menu(title='Menu', description='Menu')
+    menu.submenus = [SubMenu(title='SubMenu', description='SubMenu', dishes=[Dish(title='Dish', description='Dish', price='1.00')])]
+    async_session.add(menu)
+    await async_session.commit()
+    submenu_id, dish_id = menu.submenus[0].id, menu.submenus[0].dishes[0].id
+    # when: changing the dish through paths with a missing menu, submenu and dish
+    missing = {
+        'menu not found': (dish_id, submenu_id, dish_id),
+        'submenu not found': (menu.id, dish_id, dish_id),
+        'dish not found': (menu.id, submenu_id, submenu_id),
+    }
+    responses = {
+        detail: await async_client.patch(
+            reverse(update_dish, target_menu_id=menu_id, target_submenu_id=path_submenu_id, target_dish_id=path_dish_id),
+            json={'title': 'Renamed'}
+        )
+        for detail, (menu_id, path_submenu_id, path_dish_id) in missing.items()
+    }
+    deleted = await async_client.delete(
+        reverse(delete_dish, target_menu_id=menu.id, target_submenu_id=dish_id, target_dish_id=dish_id)
+    )
+    # then: expecting not found of the first missing row of the path
+    assert {detail: response.json()['detail'] for detail, response in responses.items()} == {
+        detail: detail for detail in missing
+    }
+    assert deleted.status_code == 404
+    assert deleted.json()['detail'] == 'submenu not found'
@@ -0,0 +1,118 @@
+import time
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy import make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import database
+from app.config.base import (
+    DB_READ_AFTER_WRITE_WINDOW,
+    MENUS_KEY,
+    PRIMARY_READS_COOKIE,
+    db_url,
+)
+from app.config.cache import create_redis
+from app.config.database import (
+    Base,
+    async_engine,
+    create_engine,
+    create_sessionmaker,
+    get_async_db,
+)
+from app.main import app
+from app.models.menu import Menu
+from app.routers.menu import create_menu, get_menu, get_menus
+from app.utils.pathfinder import reverse
+
+
+@pytest_asyncio.fixture
+async def replica(async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch):
+    """
+    Second local database standing in for a replica that has not caught up with the primary,
+    requests are routed by `get_async_db` instead of the session of the test.
+    """
+
+    url = make_url(db_url).set(database=f'{make_url(db_url).database}_replica')
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+        exists = await conn.scalar(text('SELECT 1 FROM pg_database WHERE datname = :name'), {'name': url.database})
+        if not exists:
+            await conn.execute(text(f'CREATE DATABASE "{url.database}"'))
+
+    engine = create_engine(url.render_as_string(hide_password=False))
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(database, 'ReplicaSessionsLocal', [create_sessionmaker(engine, replica=True)])
+    app.dependency_overrides.pop(get_async_db)
+
+    yield
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+def primary_reads_cookie(response) -> dict[str, str]:
+    return {'Cookie': response.headers['set-cookie'].split(';')[0]}
+
+
+@pytest.mark.asyncio
+async def test_reads_stay_on_primary_after_own_write(async_client: AsyncClient, async_session: AsyncSession, replica):
+    # given: a menu on the primary only
+    async_session.add(Menu(title='Menu', description='Menu'))
+    await async_session.commit()
+    # when: listing menus, then creating a menu and listing them with the cookie of the write
+    read = await async_client.get(reverse(get_menus))
+    write = await async_client.post(reverse(create_menu), json={'title': 'New', 'description': 'New'})
+    read_own_write = await async_client.get(reverse(get_menus), headers=primary_reads_cookie(write))
+    # then: expecting the read served by the replica, and the read after the write by the primary
+    assert read.json() == []
+    assert f'{PRIMARY_READS_COOKIE}=' in write.headers['set-cookie']
+    assert f'Max-Age={int(DB_READ_AFTER_WRITE_WINDOW)}' in write.headers['set-cookie']
+    assert sorted(menu['title'] for menu in read_own_write.json()) == ['Menu', 'New']
+
+
+@pytest.mark.asyncio
+async def test_replica_not_found_is_not_cached(async_client: AsyncClient, async_session: AsyncSession, replica):
+    # given: a menu on the primary only
+    menu = Menu(title='Menu', description='Menu')
+    async_session.add(menu)
+    await async_session.commit()
+    url = reverse(get_menu, target_menu_id=menu.id)
+    # when: requesting it from the replica, then from the primary after an expired and a fresh write cookie
+    from_replica = await async_client.get(url)
+    expired = await async_client.get(url, headers={'Cookie': f'{PRIMARY_READS_COOKIE}=0'})
+    write = await async_client.post(reverse(create_menu), json={'title': 'New', 'description': 'New'})
+    from_primary = await async_client.get(url, headers=primary_reads_cookie(write))
+    # then: expecting it missing on the replica only, as the primary has it
+    assert from_replica.status_code == 404
+    assert expired.status_code == 404
+    assert from_primary.status_code == 200
+    assert from_primary.json()['id'] == menu.id
+
+
+@pytest.mark.asyncio
+async def test_replica_body_not_matched_by_primary_rebuild(
+    async_client: AsyncClient, async_session: AsyncSession, replica
+):
+    # given: a menu on the primary only and the list of menus built from the replica
+    async_session.add(Menu(title='Menu', description='Menu'))
+    await async_session.commit()
+    from_replica = await async_client.get(reverse(get_menus))
+    # when: the entry is rebuilt by the primary at the same version and requested with the ETag of the replica body
+    async for cache in create_redis():
+        await cache.delete(MENUS_KEY)
+    from_primary = await async_client.get(
+        reverse(get_menus),
+        headers={
+            'Cookie': f'{PRIMARY_READS_COOKIE}={time.time() + DB_READ_AFTER_WRITE_WINDOW}',
+            'If-None-Match': from_replica.headers['ETag'],
+        }
+    )
+    # then: expecting the body of the primary instead of 304, with a different ETag
+    assert from_replica.json() == []
+    assert from_primary.status_code == 200
+    assert [menu['title'] for menu in from_primary.json()] == ['Menu']
+    assert from_primary.headers['ETag'] != from_replica.headers['ETag']
@@ -0,0 +1,158 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.config.base import db_url
+from app.config.database import DatabasePool
+from app.routers.menu import get_menus
+from app.routers.stats import get_cache_stats, get_database_stats
+from app.services.cache.entry import HEADER, RAW, CacheEntry
+from app.services.cache.local import LocalCache
+from app.services.cache.policy import CachePolicy, WriteFrequency
+from app.services.cache.stats import compression_stats
+from app.utils.pathfinder import reverse
+
+
+@pytest.mark.asyncio
+async def test_cache_stats_count_redis_lookups(async_client: AsyncClient):
+    # given: counters before requests
+    url = reverse(get_cache_stats)
+    before = (await async_client.get(url)).json()['redis']
+    # when: executing the same GET operation twice, first one fills the cache
+    await async_client.get(reverse(get_menus))
+    await async_client.get(reverse(get_menus))
+    response = await async_client.get(url)
+    # then: expecting one miss and one hit more in redis tier
+    assert response.status_code == 200
+    after = response.json()['redis']
+    assert after['misses'] == before['misses'] + 1
+    assert after['hits'] == before['hits'] + 1
+
+
+@pytest.mark.asyncio
+async def test_cache_stats_redis_pool_reuses_connections(async_client: AsyncClient):
+    # given: pool counters before requests
+    url = reverse(get_cache_stats)
+    before = (await async_client.get(url)).json()['redis_pool']
+    # when: executing several GET operations
+    for _ in range(3):
+        await async_client.get(reverse(get_menus))
+    response = await async_client.get(url)
+    # then: expecting connections to be borrowed and returned to the pool
+    after = response.json()['redis_pool']
+    assert after['acquired'] > before['acquired']
+    assert after['in_use'] == 0
+    assert 1 <= after['idle'] <= after['max_connections']
+
+
+def test_local_cache_admission_and_size_limit():
+    # given: local cache for two entries admitting keys on second request
+    local = LocalCache(max_size=2, ttl=60, admission_hits=2)
+    # when: key is requested once
+    local.get('a')
+    local.set('a', CacheEntry.new(b'a'), local.version)
+    # then: expecting it not to be admitted
+    assert 'a' not in local.entries
+    # when: keys are requested twice and set, exceeding the size
+    for key in ('a', 'b', 'c'):
+        local.get(key)
+        local.get(key)
+        local.set(key, CacheEntry.new(key.encode()), local.version)
+    # then: expecting least recently used key to be evicted
+    assert local.get('a') is None
+    assert local.get('b').body == b'b'
+    assert local.get('c').body == b'c'
+
+
+def test_local_cache_drops_values_read_before_invalidation():
+    # given: admitted key in local cache
+    local = LocalCache(max_size=2, ttl=60, admission_hits=0)
+    version = local.version
+    # when: eviction message arrives between Redis read and local set
+    local.delete('a')
+    local.set('a', CacheEntry.new(b'stale'), version)
+    # then: expecting stale value not to be stored
+    assert local.get('a') is None
+
+
+def test_cache_entry_refresh_decision():
+    # given: entries without soft ttl, fresh one and one past its soft ttl
+    entity = CacheEntry.new(b'{}')
+    fresh = CacheEntry.new(b'[]', delta=0.01, soft_ttl=60)
+    stale = CacheEntry(b'[]', built_at=1.0, delta=0.01, stale_at=2.0)
+    # then: expecting only the stale one to be refreshed, packing to keep the metadata
+    assert not entity.should_refresh()
+    assert not fresh.should_refresh()
+    assert stale.should_refresh()
+    unpacked = CacheEntry.unpack(fresh.pack())
+    assert (unpacked.body, unpacked.built_at, unpacked.stale_at) == (fresh.body, fresh.built_at, fresh.stale_at)
+
+
+def test_cache_entry_compression_above_threshold():
+    # given: small and large bodies
+    small = CacheEntry.new(b'[]')
+    large = CacheEntry.new(b'[' + b'{"title": "dish", "price": "10.00"},' * 200 + b'{}]')
+    compressed_before = compression_stats.compressed
+    # when: packing them for cache
+    small_raw, large_raw = small.pack(), large.pack()
+    # then: expecting only the large one compressed, both read back unchanged
+    assert small_raw[0] == RAW
+    assert large_raw[0] != RAW
+    assert len(large_raw) - HEADER.size < len(large.body)
+    assert compression_stats.compressed == compressed_before + 1
+    assert CacheEntry.unpack(small_raw).body == small.body
+    assert CacheEntry.unpack(large_raw).body == large.body
+
+
+def test_cache_policy_ttl_jitter_and_adaptive(monkeypatch):
+    # given: policy with jitter, adaptive one and a key changed every 10 seconds
+    jittered = CachePolicy(100, jitter=0.1)
+    adaptive = CachePolicy(3600, adaptive=True)
+    frequency = WriteFrequency(max_size=1)
+    ticks = iter((0.0, 10.0, 20.0, 30.0))
+    monkeypatch.setattr('app.services.cache.policy.time.monotonic', lambda: next(ticks))
+    monkeypatch.setattr('app.services.cache.policy.write_frequency', frequency)
+    # when: the key changes three times
+    frequency.observe('a')
+    frequency.observe('a')
+    frequency.observe('a')
+    # then: expecting TTL within the jitter, shortened for the changed key only, unknown keys keep the full one
+    assert all(90 <= jittered.ttl_for('a') <= 110 for _ in range(100))
+    assert frequency.interval('a') == 10.0
+    assert adaptive.ttl_for('a') < 3600
+    assert adaptive.ttl_for('b') == 3600
+    frequency.observe('b')
+    assert frequency.interval('a') is None
+
+
+@pytest.mark.asyncio
+async def test_database_stats_measure_pool(async_client: AsyncClient, async_session: AsyncSession):
+    # given: pool counters before requests
+    url = reverse(get_database_stats)
+    before = (await async_client.get(url)).json()['pool']
+    # when: executing GET operation reading the database
+    await async_client.get(reverse(get_menus))
+    after = (await async_client.get(url)).json()['pool']
+    # then: expecting checkouts counted and sessions limited by the configured statement timeout
+    assert after['acquired'] > before['acquired']
+    assert after['checked_out'] + after['idle'] <= after['pool_size'] + after['max_overflow']
+    assert (await async_session.execute(text('SHOW statement_timeout'))).scalar() == '30s'
+
+
+@pytest.mark.asyncio
+async def test_database_pool_counts_overflow_and_timeouts():
+    # given: engine with pool of one connection and one more allowed over it
+    engine = create_async_engine(db_url, poolclass=DatabasePool, pool_size=1, max_overflow=1, pool_timeout=0.1)
+    # when: checking out three connections at once
+    first = await engine.connect()
+    second = await engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        await engine.connect()
+    # then: expecting the second opened over the pool size and the third timed out after waiting
+    stats = engine.pool.stats()
+    assert (stats['checked_out'], stats['overflow'], stats['overflow_events'], stats['timeouts']) == (2, 1, 1, 1)
+    assert stats['wait_time_max'] >= 0.1
+    await first.close()
+    await second.close()
+    await engine.dispose()
@@ -1,6 +1,7 @@
 import pytest
 from httpx import AsyncClient
 
+from app.models.menu import Menu
 from app.routers.submenu import (
     create_submenu,
     delete_submenu,
@@ -105,3 +106,22 @@ async def test_submenu_delete_taget_id(async_client: AsyncClient, create_menu, c
     # then: expecting status code 404 and not found details
     assert response.status_code == 404
     assert response.json() == {'detail': 'submenu not found'}
+
+
+@pytest.mark.asyncio
+async def test_submenu_not_found_under_other_menu(async_client: AsyncClient, async_session, create_menu, create_submenu):
+    # given: two menus and a submenu of the first one
+    menu = create_menu
+    submenu = await create_submenu(menu.id)
+    other_menu = Menu(title='testMenu2', description='testMenu2Description')
+    async_session.add(other_menu)
+    await async_session.commit()
+    # when: executing CRUD operation get through the path of the second menu, then through its own
+    response = await async_client.get(
+        reverse(get_submenu, target_menu_id=other_menu.id, target_submenu_id=submenu.id)
+    )
+    own_response = await async_client.get(reverse(get_submenu, target_menu_id=menu.id, target_submenu_id=submenu.id))
+    # then: expecting 404 under the second menu only
+    assert response.status_code == 404
+    assert response.json() == {'detail': 'submenu not found'}
+    assert own_response.status_code == 200
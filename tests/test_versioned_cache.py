@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from app.config.base import DISH_KEY, DISHES_KEY, MENU_KEY, MENU_TAG
+from app.config.cache import create_redis
+from app.services.cache.dish import DishCacheCRUD
+from app.services.cache.menu import MenuCacheCRUD
+
+
+@pytest.mark.asyncio
+async def test_build_started_before_invalidation_is_not_stored():
+    async for cache in create_redis():
+        await cache.flushdb()
+        menu_cache = MenuCacheCRUD(cache)
+        key = MENU_KEY.format(menu_id='menu')
+        # given: a build that read the version and the database before the menu was deleted
+        version, = await menu_cache.init_versions(key)
+        await menu_cache.delete('menu')
+        # when: the build stores its outdated body
+        await menu_cache.set_menu('menu', b'{"title": "old"}', version)
+        # then: expecting it to be rejected, while a build started after the change is stored
+        assert await menu_cache.get_menu('menu') is None
+        await menu_cache.set_menu('menu', b'{"title": "new"}', *await menu_cache.init_versions(key))
+        assert (await menu_cache.get_menu('menu')).body == b'{"title": "new"}'
+
+
+@pytest.mark.asyncio
+async def test_build_started_before_parent_delete_is_not_stored():
+    async for cache in create_redis():
+        await cache.flushdb()
+        menu_cache = MenuCacheCRUD(cache)
+        dish_cache = DishCacheCRUD(cache)
+        key = DISH_KEY.format(dish_id='dish')
+        # given: a dish build that read the database before its menu was deleted,
+        # the dish is not cached yet, so it is not in the tag set of the menu either
+        version, since = await dish_cache.start_build(key)
+        await menu_cache.delete('menu')
+        # when: the build stores its outdated body
+        await dish_cache.set_dish('menu', 'submenu', 'dish', b'{"title": "old"}', version, since=since)
+        # then: expecting it to be rejected, while a build started after the delete is stored
+        assert await dish_cache.get_dish('dish') is None
+        version, since = await dish_cache.start_build(key)
+        await dish_cache.set_dish('menu', 'submenu', 'dish', b'{"title": "new"}', version, since=since)
+        assert (await dish_cache.get_dish('dish')).body == b'{"title": "new"}'
+
+
+@pytest.mark.asyncio
+async def test_concurrent_row_changes_drop_the_entry():
+    async for cache in create_redis():
+        await cache.flushdb()
+        menu_cache = MenuCacheCRUD(cache)
+        key = MENU_KEY.format(menu_id='menu')
+        # given: two updates that read the same version before changing the row
+        first_version, first_new_version = await menu_cache.reserve_version(key)
+        second_version, second_new_version = await menu_cache.reserve_version(key)
+        assert first_version == second_version
+        # when: both store their bodies
+        await menu_cache.set_menu('menu', b'{"title": "first"}', first_version, new_version=first_new_version)
+        await menu_cache.set_menu('menu', b'{"title": "second"}', second_version, new_version=second_new_version)
+        # then: expecting the first one stored and dropped by the second, since either may be the latest
+        assert await menu_cache.get_menu('menu') is None
+        assert await menu_cache.get_version(key) == second_new_version
+
+
+@pytest.mark.asyncio
+async def test_entities_and_tags_expire():
+    async for cache in create_redis():
+        await cache.flushdb()
+        menu_cache = MenuCacheCRUD(cache)
+        key = MENU_KEY.format(menu_id='menu')
+        # when: caching a menu instance
+        await menu_cache.set_menu('menu', b'{"title": "menu"}', *await menu_cache.init_versions(key))
+        # then: expecting both the entry and its tag set to expire, the tag set not before the entry
+        ttl = await cache.ttl(key)
+        assert ttl > 0
+        assert await cache.ttl(MENU_TAG.format(menu_id='menu')) >= ttl
+
+
+@pytest.mark.asyncio
+async def test_cached_dishes_ordered_by_id():
+    async for cache in create_redis():
+        await cache.flushdb()
+        dish_cache = DishCacheCRUD(cache)
+        ids = [f'0190a000-0000-7000-8000-00000000000{number}' for number in range(4)]
+        # given: a cached list of two dishes stored out of id order
+        body = json.dumps([{'id': ids[3], 'title': 'Dish 3'}, {'id': ids[1], 'title': 'Dish 1'}]).encode()
+        await dish_cache.set_dishes('menu', 'submenu', body, *await dish_cache.init_versions(DISHES_KEY.format(submenu_id='submenu')))
+        # when: dishes with lower ids are added after them
+        for dish_id in (ids[2], ids[0]):
+            version, _ = await dish_cache.reserve_version(DISH_KEY.format(dish_id=dish_id))
+            await dish_cache.set_listed_dish('submenu', dish_id, json.dumps({'id': dish_id}).encode(), version)
+        # then: expecting the cached list ordered by id, as the database returns it
+        assert [dish['id'] for dish in json.loads((await dish_cache.get_dishes('submenu')).body)] == ids